@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Summary, GuestUsage
+from .models import Summary, GuestUsage, GuestUsageDaily, SummaryJob, ChunkSummary
 
 # Register your models here.
 
@@ -9,3 +9,26 @@ class GuestUsageAdmin(admin.ModelAdmin):
     list_filter = ('timestamp',)
     search_fields = ('ip_address',)
     ordering = ('-timestamp',)
+
+
+@admin.register(GuestUsageDaily)
+class GuestUsageDailyAdmin(admin.ModelAdmin):
+    list_display = ('ip_address', 'day', 'count')
+    list_filter = ('day',)
+    search_fields = ('ip_address',)
+    ordering = ('-day',)
+
+
+@admin.register(SummaryJob)
+class SummaryJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    ordering = ('-created_at',)
+
+
+@admin.register(ChunkSummary)
+class ChunkSummaryAdmin(admin.ModelAdmin):
+    list_display = ('key', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('key',)
+    ordering = ('-created_at',)
@@ -0,0 +1,203 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import FALLBACKS
+from .usage import guest_usage
+
+# Rough model tokens per whitespace separated word for the mBART tokenizer,
+# used so admission never has to load or run the tokenizer itself
+TOKENS_PER_WORD = 1.4
+# Rough bytes per word of an uploaded file, markup included
+BYTES_PER_WORD = 7
+
+
+class Rejected(Exception):
+    """Raised when a summarization request is not admitted."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimited(Rejected):
+    """The client has used up its token budget."""
+
+
+class Overloaded(Rejected):
+    """Every generation slot of this worker is busy."""
+
+
+def estimate_tokens(text):
+    """Estimate the number of model input tokens of a text."""
+    return max(1, int(len(text.split()) * TOKENS_PER_WORD))
+
+
+def estimate_file_tokens(size):
+    """Estimate the number of model input tokens of a file of ``size`` bytes."""
+    return max(1, int(size / BYTES_PER_WORD * TOKENS_PER_WORD))
+
+
+def client_key(request):
+    """Return the key a request is rate limited under: its user or its IP address."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.id}'
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+class Ticket:
+    """An admitted request. Leaving it, or calling ``release``, frees its slot."""
+
+    def __init__(self, controller, engine, slot):
+        self.controller = controller
+        self.engine = engine
+        self.degraded = False
+        self._slot = slot
+
+    def release(self):
+        if self._slot:
+            self._slot = False
+            self.controller.slots.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Admission control in front of model inference.
+
+    Every client has a token bucket holding up to ``capacity`` input tokens
+    that refills at ``capacity / window`` tokens per second; a request costs
+    the estimated token count of its text. A request larger than the
+    capacity is let through when the bucket is full and leaves it in debt;
+    an uploaded file costs at most the capacity (``file_cost``).
+    At most ``max_concurrency`` model generations run at once in this worker;
+    a request waits up to ``max_wait_ms`` for a slot and is then either
+    rejected or, with ``degrade``, served by the extractive engine instead.
+    Extractive requests are cheap and always admitted.
+    With a ``usage`` buffer (see ``core.usage``), a guest IP address that
+    made ``guest_requests`` requests in its sliding window is rate limited
+    too, whatever its bucket holds.
+    """
+
+    def __init__(self, guest_capacity=2000, user_capacity=8000, window=60,
+                 max_concurrency=4, max_wait_ms=100, degrade=True, max_clients=10000,
+                 usage=None, guest_requests=0):
+        self.guest_capacity = guest_capacity
+        self.user_capacity = user_capacity
+        self.window = window
+        self.max_wait = max_wait_ms / 1000.0
+        self.degrade = degrade
+        self.max_clients = max_clients
+        self.usage = usage
+        self.guest_requests = guest_requests
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.lock = threading.Lock()
+        # key -> [tokens, time of the last refill]
+        self.buckets = {}
+        self.counters = {'admitted': 0, 'rate_limited': 0, 'overloaded': 0, 'degraded': 0}
+
+    def capacity(self, key):
+        return self.user_capacity if key.startswith('user:') else self.guest_capacity
+
+    def file_cost(self, key, size):
+        """Return what summarizing an uploaded file of ``size`` bytes costs a client.
+
+        The size only bounds the text of a file, which may be mostly markup
+        or cut at SUMMARIZER_UPLOAD_MAX_CHARS, so a large file costs at most
+        a full bucket instead of leaving it in debt for hours.
+        """
+        return min(estimate_file_tokens(size), self.capacity(key))
+
+    def admit(self, key, text, engine='transformer', cost=None):
+        """Admit a request or raise ``RateLimited``/``Overloaded``.
+
+        Returns a ``Ticket`` whose ``engine`` is the one to summarize with,
+        which is the extractive engine when the request was degraded. A
+        request for several texts passes its total ``cost`` in tokens
+        instead of a ``text``.
+        """
+        from .inference import EXTRACTIVE_ENGINE_NAMES
+
+        if engine in EXTRACTIVE_ENGINE_NAMES:
+            return Ticket(self, engine, slot=False)
+
+        if cost is None:
+            cost = estimate_tokens(text)
+        self.take(key, cost)
+        if self.slots.acquire(timeout=self.max_wait):
+            self._count('admitted')
+            return Ticket(self, engine, slot=True)
+
+        # Saturated: the request doesn't use the model, so give its tokens back
+        self.refund(key, cost)
+        if self.degrade:
+            self._count('degraded')
+            FALLBACKS.inc('degraded')
+            ticket = Ticket(self, 'nltk', slot=False)
+            ticket.degraded = True
+            return ticket
+        self._count('overloaded')
+        raise Overloaded('The server is busy', retry_after=1)
+
+    def take(self, key, cost):
+        """Take ``cost`` tokens from a client's bucket or raise ``RateLimited``."""
+        if self.usage is not None and self.guest_requests and key.startswith('ip:'):
+            if self.usage.count(key[3:]) >= self.guest_requests:
+                self._count('rate_limited')
+                window = self.usage.window
+                raise RateLimited('Too many requests', retry_after=window - time.time() % window)
+        capacity = self.capacity(key)
+        refill_rate = capacity / self.window
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= self.max_clients:
+                    self._prune(now)
+                bucket = self.buckets[key] = [capacity, now]
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            bucket[1] = now
+
+            needed = min(cost, capacity)
+            if bucket[0] < needed:
+                self.counters['rate_limited'] += 1
+                raise RateLimited('Too many requests', retry_after=(needed - bucket[0]) / refill_rate)
+            bucket[0] -= cost
+
+    def refund(self, key, cost):
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(self.capacity(key), bucket[0] + cost)
+
+    def _prune(self, now):
+        """Forget the clients whose bucket has refilled completely."""
+        for key in [key for key, (tokens, updated) in self.buckets.items()
+                    if tokens + (now - updated) * self.capacity(key) / self.window >= self.capacity(key)]:
+            del self.buckets[key]
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, clients=len(self.buckets))
+
+
+admission = AdmissionController(
+    guest_capacity=settings.RATE_LIMIT_GUEST_TOKENS,
+    user_capacity=settings.RATE_LIMIT_USER_TOKENS,
+    window=settings.RATE_LIMIT_WINDOW,
+    max_concurrency=settings.SUMMARIZER_MAX_CONCURRENCY,
+    max_wait_ms=settings.SUMMARIZER_ADMISSION_WAIT_MS,
+    degrade=settings.SUMMARIZER_DEGRADE,
+    usage=guest_usage,
+    guest_requests=settings.RATE_LIMIT_GUEST_REQUESTS,
+)
@@ -1,6 +1,24 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        if not settings.SUMMARIZER_PRELOAD:
+            return
+        # The runserver autoreloader parent never serves requests
+        if 'runserver' in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+            return
+        # Under gunicorn the hooks in gunicorn.conf.py preload in each worker.
+        # With preload_app this runs in the master, where warming up would
+        # start torch thread pools and could hold the model lock at the fork.
+        if 'gunicorn.arbiter' in sys.modules:
+            return
+        from .inference import preload_model
+        preload_model()
@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SchedulerFull(Exception):
+    """Raised when the scheduler queue is at its maximum depth."""
+
+
+class _Job:
+    __slots__ = ('text', 'future', 'key')
+
+    def __init__(self, text, key):
+        self.text = text
+        self.key = key
+        self.future = Future()
+
+
+def length_bucket(text):
+    """Bucket texts by length in powers of two so batches pad little."""
+    return len(text).bit_length()
+
+
+class BatchScheduler:
+    """Queue summarization jobs and run them as padded, length-bucketed batches.
+
+    Jobs with the same generation options and length bucket are grouped
+    together. A group is flushed as soon as it reaches ``max_batch_size`` or
+    when its oldest job has waited ``max_wait_ms``. Every caller gets a
+    ``Future`` that resolves to its own result; ``map`` waits at most
+    ``timeout`` seconds for each of them.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=20, max_queue_size=64, timeout=300):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='summarizer-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, text, **generate_kwargs):
+        """Queue one text for summarization and return a Future for its result."""
+        key = (tuple(sorted(generate_kwargs.items())), length_bucket(text))
+        job = _Job(text, key)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            raise SchedulerFull('Summarization queue is full')
+        return job.future
+
+    def map(self, texts, **generate_kwargs):
+        """Summarize several texts through the scheduler and wait for all of them.
+
+        Texts are queued at most ``max_batch_size`` at a time, so a long
+        document never needs more room in the queue than one batch. When a
+        text fails, times out or can't be queued, the ones still queued are
+        cancelled.
+        """
+        results = []
+        for start in range(0, len(texts), self.max_batch_size):
+            futures = []
+            try:
+                for text in texts[start:start + self.max_batch_size]:
+                    futures.append(self.submit(text, **generate_kwargs))
+                results.extend(future.result(timeout=self.timeout) for future in futures)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+
+    def _run(self):
+        groups = {}
+        deadlines = {}
+        while True:
+            # Sleep until the next group deadline or until a new job arrives
+            timeout = None
+            if deadlines:
+                timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+            try:
+                job = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                job = None
+
+            if job is not None:
+                group = groups.setdefault(job.key, [])
+                if not group:
+                    deadlines[job.key] = time.monotonic() + self.max_wait
+                group.append(job)
+                if len(group) >= self.max_batch_size:
+                    self._flush(job.key, groups, deadlines)
+
+            now = time.monotonic()
+            for key in [key for key, deadline in deadlines.items() if deadline <= now]:
+                self._flush(key, groups, deadlines)
+
+    def _flush(self, key, groups, deadlines):
+        jobs = [job for job in groups.pop(key) if job.future.set_running_or_notify_cancel()]
+        deadlines.pop(key, None)
+        if not jobs:
+            return
+
+        generate_kwargs = dict(key[0])
+        try:
+            results = self.run_batch([job.text for job in jobs], **generate_kwargs)
+        except Exception as e:
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+
+        if len(results) != len(jobs):
+            # Which result belongs to which text is unknown, so fail them all
+            error = RuntimeError(f'run_batch returned {len(results)} results for {len(jobs)} texts')
+            for job in jobs:
+                job.future.set_exception(error)
+            return
+
+        for job, result in zip(jobs, results):
+            job.future.set_result(result)
@@ -0,0 +1,220 @@
+"""Helpers shared by the benchmark and measurement management commands."""
+import random
+import time
+from collections import Counter
+
+from .resources import WORD_RE
+
+# A small fixed corpus with hand-written reference summaries, used to compare
+# summarizer configurations on quality as well as speed.
+CORPUS = [
+    {
+        'id': 'en-ai',
+        'language': 'en',
+        'text': (
+            "Artificial Intelligence (AI) is revolutionizing the way we live and work in the modern world. "
+            "Machine learning, a subset of AI, enables computers to learn from data and improve their "
+            "performance over time. Deep learning, which uses neural networks inspired by the human brain, "
+            "has achieved remarkable success in tasks like image recognition and natural language processing. "
+            "Companies use these systems to recommend products, detect fraud and translate text between "
+            "languages. At the same time, researchers warn that models trained on biased data can repeat "
+            "that bias, and regulators are debating how automated decisions should be audited."
+        ),
+        'reference': (
+            "Machine learning and deep learning let computers learn from data and power products from "
+            "recommendations to translation, while concerns about bias drive calls for auditing."
+        ),
+    },
+    {
+        'id': 'en-climate',
+        'language': 'en',
+        'text': (
+            "Global average temperatures have risen by more than one degree Celsius since the pre-industrial "
+            "era, mainly because of carbon dioxide released by burning coal, oil and gas. The warming is not "
+            "evenly distributed: the Arctic is heating up several times faster than the rest of the planet. "
+            "Higher temperatures intensify heat waves, droughts and heavy rainfall, and rising seas threaten "
+            "coastal cities. Many countries have pledged to reach net zero emissions by the middle of the "
+            "century, relying on renewable electricity, electric vehicles and more efficient buildings. "
+            "Scientists say current policies are still not enough to limit warming to 1.5 degrees."
+        ),
+        'reference': (
+            "Fossil fuel emissions have warmed the planet by over one degree, worsening extreme weather and "
+            "sea level rise, and current net zero pledges are not yet enough to meet the 1.5 degree goal."
+        ),
+    },
+    {
+        'id': 'tr-teknoloji',
+        'language': 'tr',
+        'text': (
+            "Yapay zeka, günümüzde yaşam ve çalışma biçimimizi köklü bir şekilde değiştiriyor. Makine "
+            "öğrenmesi, bilgisayarların verilerden öğrenmesini ve performanslarını zamanla geliştirmesini "
+            "sağlıyor. Derin öğrenme ise insan beyninden esinlenen sinir ağlarıyla görüntü tanıma ve doğal "
+            "dil işleme gibi alanlarda büyük başarılar elde etti. Şirketler bu sistemleri ürün önermek, "
+            "dolandırıcılığı tespit etmek ve metin çevirmek için kullanıyor. Ancak uzmanlar, önyargılı "
+            "verilerle eğitilen modellerin bu önyargıları tekrarlayabileceği konusunda uyarıyor."
+        ),
+        'reference': (
+            "Makine öğrenmesi ve derin öğrenme birçok alanda başarılı olsa da önyargılı verilerle eğitilen "
+            "modeller risk oluşturuyor."
+        ),
+    },
+    {
+        'id': 'tr-sehir',
+        'language': 'tr',
+        'text': (
+            "İstanbul, iki kıtaya yayılan konumu ve binlerce yıllık tarihiyle dünyanın en önemli "
+            "şehirlerinden biridir. Boğaz, Avrupa ve Asya yakalarını birbirinden ayırırken şehir "
+            "köprüler, tüneller ve vapurlarla birbirine bağlanır. Nüfusun hızla artması trafik ve konut "
+            "sorunlarını da beraberinde getirdi. Belediye, raylı sistem hatlarını genişleterek ve deniz "
+            "ulaşımını güçlendirerek bu sorunlara çözüm bulmaya çalışıyor. Turizm ise şehir ekonomisinin "
+            "en önemli gelir kaynaklarından biri olmaya devam ediyor."
+        ),
+        'reference': (
+            "İki kıtaya yayılan İstanbul, hızlı nüfus artışının getirdiği trafik ve konut sorunlarını "
+            "raylı sistem ve deniz ulaşımıyla çözmeye çalışıyor."
+        ),
+    },
+]
+
+
+SYNTHETIC_WORDS = {
+    'en': (
+        'model data system report market growth energy city policy research team result '
+        'company product network value risk change water health school science price '
+        'increase develop improve analyse support reduce measure build study produce'
+    ).split(),
+    'tr': (
+        'model veri sistem rapor piyasa büyüme enerji şehir politika araştırma ekip sonuç '
+        'şirket ürün ağ değer risk değişim su sağlık okul bilim fiyat artış geliştirmek '
+        'iyileştirmek incelemek desteklemek azaltmak ölçmek kurmak çalışmak üretmek'
+    ).split(),
+}
+SYNTHETIC_FILLERS = {
+    'en': 'the a of and in to for with on is was'.split(),
+    'tr': 've bir bu için ile da de çok daha gibi'.split(),
+}
+
+
+def synthetic_sentences(count, language='en', seed=0):
+    """Return ``count`` deterministic pseudo-random sentences in English or Turkish."""
+    rng = random.Random(seed)
+    words = SYNTHETIC_WORDS[language]
+    fillers = SYNTHETIC_FILLERS[language]
+    sentences = []
+    for i in range(count):
+        length = rng.randint(8, 20)
+        tokens = [rng.choice(fillers) if rng.random() < 0.35 else rng.choice(words) for _ in range(length)]
+        # Number the sentences so that every one of them is distinct
+        tokens.append(str(i))
+        sentences.append(' '.join(tokens).capitalize() + '.')
+    return sentences
+
+
+def synthetic_text(count, language='en', seed=0):
+    """Return a synthetic document of ``count`` sentences."""
+    return ' '.join(synthetic_sentences(count, language, seed))
+
+
+def read_memory(pid='self'):
+    """Return the Rss, Pss and private/shared totals of a process in MB (Linux only)."""
+    memory = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                memory[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': memory.get('Rss', 0),
+        'pss': memory.get('Pss', 0),
+        'private': memory.get('Private_Clean', 0) + memory.get('Private_Dirty', 0),
+        'shared': memory.get('Shared_Clean', 0) + memory.get('Shared_Dirty', 0),
+    }
+
+
+def _tokens(text):
+    return WORD_RE.findall(text.lower())
+
+
+def _f1(overlap, candidate_total, reference_total):
+    if not overlap:
+        return 0.0
+    precision = overlap / candidate_total
+    recall = overlap / reference_total
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(candidate, reference, n=1):
+    """ROUGE-N F1 between two texts."""
+    def ngrams(tokens):
+        return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    candidate_ngrams = ngrams(_tokens(candidate))
+    reference_ngrams = ngrams(_tokens(reference))
+    overlap = sum((candidate_ngrams & reference_ngrams).values())
+    return _f1(overlap, sum(candidate_ngrams.values()), sum(reference_ngrams.values()))
+
+
+def rouge_l(candidate, reference):
+    """ROUGE-L F1 (longest common subsequence) between two texts."""
+    candidate_tokens = _tokens(candidate)
+    reference_tokens = _tokens(reference)
+    previous = [0] * (len(reference_tokens) + 1)
+    for token in candidate_tokens:
+        current = [0]
+        for j, reference_token in enumerate(reference_tokens):
+            if token == reference_token:
+                current.append(previous[j] + 1)
+            else:
+                current.append(max(previous[j + 1], current[j]))
+        previous = current
+    return _f1(previous[-1], len(candidate_tokens), len(reference_tokens))
+
+
+def rouge_scores(candidate, reference):
+    return {
+        'rouge1': rouge_n(candidate, reference, 1),
+        'rouge2': rouge_n(candidate, reference, 2),
+        'rougeL': rouge_l(candidate, reference),
+    }
+
+
+class StubTokenizer:
+    """A whitespace tokenizer with the parts of the Hugging Face API the app uses."""
+    model_max_length = 1024
+
+    def __call__(self, texts, add_special_tokens=True, **kwargs):
+        single = isinstance(texts, str)
+        ids = [[len(word) for word in text.split()] for text in ([texts] if single else texts)]
+        return {'input_ids': ids[0] if single else ids}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return ' '.join('x' * i for i in ids)
+
+
+class StubSummarizer:
+    """Stands in for the summarization pipeline so benchmarks run offline.
+
+    Returns the first words of every text and sleeps ``ms_per_token`` per
+    input word, so that latency still grows with input length and batch size
+    like a real model's would.
+    """
+
+    def __init__(self, ms_per_token=0.05):
+        self.ms_per_token = ms_per_token
+        self.tokenizer = StubTokenizer()
+
+    def __call__(self, texts, max_length=100, min_length=30, **kwargs):
+        if isinstance(texts, str):
+            texts = [texts]
+        time.sleep(sum(len(text.split()) for text in texts) * self.ms_per_token / 1000)
+        return [{'summary_text': ' '.join(text.split()[:max_length // 2])} for text in texts]
+
+
+def install_stub_model(ms_per_token=0.05):
+    """Replace the model of this process with a ``StubSummarizer``."""
+    from core import inference
+
+    stub = StubSummarizer(ms_per_token)
+    inference.tokenizer = stub.tokenizer
+    inference.summarizer = stub
+    inference.model_state.update(status='ready', precision='stub', load_seconds=0.0, error=None)
+    return stub
@@ -0,0 +1,161 @@
+"""Compression of stored original texts.
+
+Texts are compressed with zlib, or with zstd when ``SUMMARIZER_TEXT_CODEC``
+is 'zstd' and the ``zstandard`` package is installed. The codec is stored
+with each blob, so blobs written with either can always be read back, and
+they are decompressed in pieces so a long text can be streamed.
+"""
+import codecs
+import hashlib
+import io
+import zlib
+
+from django.db import transaction
+from django.db.models.functions import Length
+
+CODECS = ('zlib', 'zstd')
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+# Characters decompressed at a time when a text is streamed
+CHUNK_SIZE = 64 * 1024
+
+
+def compress(text, codec='zlib'):
+    """Compress a text as UTF-8 with a codec from CODECS."""
+    data = text.encode('utf-8')
+    if codec == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec != 'zlib':
+        raise ValueError(f'Unknown codec {codec}')
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+class StreamCompressor:
+    """Compress a text written in pieces, hashing it as it goes.
+
+    ``digest`` and ``size`` match those ``TextBlob.store`` computes for the
+    whole text, so both end up in the same blob.
+    """
+
+    def __init__(self, codec='zlib'):
+        if codec == 'zstd':
+            import zstandard
+
+            self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        elif codec == 'zlib':
+            self.compressor = zlib.compressobj(ZLIB_LEVEL)
+        else:
+            raise ValueError(f'Unknown codec {codec}')
+        self.codec = codec
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.parts = []
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.hash.update(data)
+        self.size += len(text)
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.parts.append(compressed)
+
+    def finish(self):
+        """Return the compressed text."""
+        self.parts.append(self.compressor.flush())
+        return b''.join(self.parts)
+
+
+def _iter_bytes(data, codec, chunk_size):
+    if codec == 'zstd':
+        import zstandard
+
+        reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data))
+        while True:
+            piece = reader.read(chunk_size)
+            if not piece:
+                return
+            yield piece
+    if codec != 'zlib':
+        raise ValueError(f'Unknown codec {codec}')
+    decompressor = zlib.decompressobj()
+    while data:
+        yield decompressor.decompress(data, chunk_size)
+        data = decompressor.unconsumed_tail
+    yield decompressor.flush()
+
+
+def iter_decompressed(data, codec='zlib', chunk_size=CHUNK_SIZE):
+    """Decompress a text in pieces of at most about ``chunk_size`` bytes of UTF-8."""
+    # A piece may end inside a multi-byte character
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for piece in _iter_bytes(data, codec, chunk_size):
+        text = decoder.decode(piece)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def decompress(data, codec='zlib'):
+    """Decompress a whole text."""
+    return ''.join(iter_decompressed(data, codec))
+
+
+def compress_rows(Summary, TextBlob, codec='zlib', min_chars=1024, batch_size=500):
+    """Move long original texts of saved summaries into compressed blobs, in batches.
+
+    Takes the model classes, so that migrations can pass their historical
+    models. Each batch is committed on its own; yields the number of rows
+    compressed by each.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Summary.objects.annotate(text_length=Length('original_text'))
+                .filter(id__gt=last_id, original_blob__isnull=True, text_length__gte=min_chars)
+                .order_by('id')
+                .only('id', 'original_text')[:batch_size]
+            )
+            if not batch:
+                return
+            digests = [hashlib.sha256(summary.original_text.encode('utf-8')).hexdigest() for summary in batch]
+            existing = set(TextBlob.objects.filter(digest__in=digests).values_list('digest', flat=True))
+            new = {digest: summary.original_text for digest, summary in zip(digests, batch) if digest not in existing}
+            TextBlob.objects.bulk_create([
+                TextBlob(digest=digest, codec=codec, size=len(text), data=compress(text, codec))
+                for digest, text in new.items()
+            ], ignore_conflicts=True)
+            blob_ids = dict(TextBlob.objects.filter(digest__in=digests).values_list('digest', 'id'))
+            for digest, summary in zip(digests, batch):
+                summary.original_blob_id = blob_ids[digest]
+                summary.original_text = ''
+            Summary.objects.bulk_update(batch, ['original_blob', 'original_text'])
+        last_id = batch[-1].id
+        yield len(batch)
+
+
+def recompress_blobs(TextBlob, codec='zlib', batch_size=500):
+    """Compress blobs written with another codec again with ``codec``, in batches.
+
+    Each batch is committed on its own; yields the number of blobs
+    recompressed by each.
+    """
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                TextBlob.objects.filter(id__gt=last_id).exclude(codec=codec)
+                .order_by('id')[:batch_size]
+            )
+            if not batch:
+                return
+            for blob in batch:
+                blob.data = compress(decompress(bytes(blob.data), blob.codec), codec)
+                blob.codec = codec
+            TextBlob.objects.bulk_update(batch, ['data', 'codec'])
+        last_id = batch[-1].id
+        yield len(batch)
@@ -0,0 +1,184 @@
+"""Near-duplicate lookup of stored summaries with MinHash and LSH.
+
+The text of every saved Summary gets a MinHash signature of its word
+shingles, stored on the row, and the signature is split into bands whose
+hashes go into the ``SummaryBand`` index. Two texts share a band with a
+probability that rises steeply with their Jaccard similarity, so a lookup
+only fetches the rows that share a band and compares their signatures.
+Changing NUM_PERM, BANDS or SHINGLE_WORDS needs ``python manage.py
+index_summaries --reindex``.
+"""
+import re
+import zlib
+from collections import Counter
+
+from django.conf import settings
+
+WORD_RE = re.compile(r'\w+')
+
+SHINGLE_WORDS = 5
+BANDS = 16
+ROWS = 8
+NUM_PERM = BANDS * ROWS
+# Candidates compared per lookup, most shared bands first
+MAX_CANDIDATES = 20
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+_permutations = None
+
+
+def get_permutations():
+    """Return the fixed ``(a, b)`` coefficients of the hash permutations."""
+    global _permutations
+    if _permutations is None:
+        import numpy as np
+
+        rng = np.random.RandomState(1)
+        _permutations = (
+            rng.randint(1, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64),
+            rng.randint(0, MERSENNE_PRIME, NUM_PERM, dtype=np.uint64),
+        )
+    return _permutations
+
+
+class MinHasher:
+    """Compute the MinHash signature of a text fed in pieces.
+
+    The signature is that of the whole text: words split between pieces
+    are joined and shingles span pieces. Texts of fewer than SHINGLE_WORDS
+    words are a single shingle.
+    """
+
+    def __init__(self):
+        import numpy as np
+
+        self.mins = np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+        self.hashed = False
+        # The last words, which start the shingles of the next piece
+        self.tail = []
+        # A word the last piece may have ended inside of
+        self.partial = ''
+
+    def update(self, text):
+        text = self.partial + text.lower()
+        words = WORD_RE.findall(text)
+        self.partial = words.pop() if words and WORD_RE.match(text[-1]) else ''
+        self._add(words)
+
+    def _add(self, words):
+        words = self.tail + words
+        if len(words) < SHINGLE_WORDS:
+            self.tail = words
+            return
+        self._hash({' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)})
+        self.tail = words[1 - SHINGLE_WORDS:]
+
+    def _hash(self, shingles):
+        import numpy as np
+
+        hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64)
+        a, b = get_permutations()
+        # (a * h + b) mod p, wrapping in 64 bits, as one row per permutation
+        with np.errstate(over='ignore'):
+            permuted = (np.outer(a, hashes) + b[:, None]) % MERSENNE_PRIME & MAX_HASH
+        np.minimum(self.mins, permuted.min(axis=1), out=self.mins)
+        self.hashed = True
+
+    def signature(self):
+        """Return the signature as bytes, or None if the text has no words."""
+        import numpy as np
+
+        if self.partial:
+            self._add([self.partial])
+            self.partial = ''
+        if not self.hashed:
+            if not self.tail:
+                return None
+            self._hash({' '.join(self.tail)})
+        return self.mins.astype(np.uint32).tobytes()
+
+
+def minhash_signature(text):
+    """Return the MinHash signature of a text as bytes, or None if it has no words."""
+    hasher = MinHasher()
+    hasher.update(text)
+    return hasher.signature()
+
+
+def band_keys(signature):
+    """Return the LSH key of each band of a signature, as signed 64-bit integers."""
+    row_bytes = 4 * ROWS
+    return [
+        int.from_bytes(
+            zlib.crc32(signature[i * row_bytes:(i + 1) * row_bytes]).to_bytes(4, 'little')
+            + i.to_bytes(4, 'little'),
+            'little', signed=True,
+        )
+        for i in range(BANDS)
+    ]
+
+
+def similarity(signature, other):
+    """Estimate the Jaccard similarity of two texts from their signatures."""
+    import numpy as np
+
+    return float(np.mean(np.frombuffer(signature, np.uint32) == np.frombuffer(other, np.uint32)))
+
+
+def index_summaries(summaries):
+    """Add saved summaries to the LSH index, computing missing signatures."""
+    from .models import Summary, SummaryBand
+
+    missing = [summary for summary in summaries if summary.minhash is None]
+    for summary in missing:
+        summary.minhash = minhash_signature(summary.get_original_text())
+    if missing:
+        Summary.objects.bulk_update(missing, ['minhash'], batch_size=500)
+    SummaryBand.objects.bulk_create([
+        SummaryBand(summary=summary, key=key)
+        for summary in summaries if summary.minhash
+        for key in band_keys(bytes(summary.minhash))
+    ], batch_size=1000)
+
+
+def find_near_duplicate(text, summary_length, bullet_points, model_name, user_id):
+    """Return the stored Summary of the text most similar to ``text``, or None.
+
+    Only model summaries of the user ``user_id`` made by the model route
+    ``model_name`` with the same ``summary_length`` and ``bullet_points``
+    are considered, so one user is never served the summary of another
+    user's text. Their estimated Jaccard similarity has to reach
+    ``SUMMARIZER_DEDUP_THRESHOLD``; it is set on the returned row as
+    ``similarity``.
+    """
+    from .models import Summary, SummaryBand
+
+    if not settings.SUMMARIZER_DEDUP or user_id is None:
+        return None
+    signature = minhash_signature(text)
+    if signature is None:
+        return None
+
+    shared = Counter(SummaryBand.objects.filter(
+        key__in=band_keys(signature),
+        summary__user_id=user_id,
+        summary__engine='transformer',
+        summary__model_name=model_name,
+        summary__summary_length=summary_length,
+        summary__bullet_points=bullet_points,
+    ).values_list('summary_id', flat=True))
+    if not shared:
+        return None
+    candidates = Summary.objects.filter(
+        id__in=[summary_id for summary_id, _ in shared.most_common(MAX_CANDIDATES)],
+    ).only('id', 'summary_text', 'minhash')
+
+    best = None
+    for candidate in candidates:
+        candidate.similarity = similarity(signature, bytes(candidate.minhash))
+        if candidate.similarity >= settings.SUMMARIZER_DEDUP_THRESHOLD and (
+                best is None or candidate.similarity > best.similarity):
+            best = candidate
+    return best
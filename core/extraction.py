@@ -0,0 +1,191 @@
+"""Streaming text extraction from uploaded files.
+
+Plain text and Markdown are decoded, and HTML parsed, a block at a time;
+PDFs are read a page at a time with ``pypdf`` when it is installed. Each
+yields the text in pieces, so a file never has to be in memory as a whole.
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+from importlib.util import find_spec
+
+# Bytes read from a file at a time
+BLOCK_SIZE = 64 * 1024
+
+FILE_KINDS = {
+    '.txt': 'text',
+    '.text': 'text',
+    '.md': 'markdown',
+    '.markdown': 'markdown',
+    '.html': 'html',
+    '.htm': 'html',
+    '.pdf': 'pdf',
+}
+
+MARKDOWN_FENCE_RE = re.compile(r'^\s*(```|~~~)')
+MARKDOWN_PREFIX_RE = re.compile(r'^\s{0,3}(#{1,6}\s+|>\s?|[-*+]\s+|\d+[.)]\s+)')
+MARKDOWN_IMAGE_RE = re.compile(r'!\[([^\]]*)\]\([^)]*\)')
+MARKDOWN_LINK_RE = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+MARKDOWN_EMPHASIS_RE = re.compile(r'(\*{1,3}|_{1,3}|`+|~~)(?=\S)(.+?)(?<=\S)\1')
+MARKDOWN_RULE_RE = re.compile(r'^\s{0,3}([-*_])(\s*\1){2,}\s*$')
+
+# Tags whose content is not text, and tags that end a block of text
+HTML_SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'head', 'svg'}
+HTML_BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'tr', 'ul',
+}
+
+
+def pdf_supported():
+    """Whether PDFs can be read, i.e. ``pypdf`` is installed."""
+    return find_spec('pypdf') is not None
+
+
+def file_kind(name):
+    """Return the kind of file a file name is for, or None if it can't be read."""
+    extension = '.' + name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+    kind = FILE_KINDS.get(extension)
+    if kind == 'pdf' and not pdf_supported():
+        return None
+    return kind
+
+
+def iter_decoded(f, progress=None):
+    """Decode a binary file as UTF-8 a block at a time, replacing invalid bytes."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if progress is not None:
+            progress(f.tell())
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_lines(pieces):
+    """Regroup pieces of text into whole lines, keeping their line ends."""
+    rest = ''
+    for piece in pieces:
+        lines = (rest + piece).splitlines(keepends=True)
+        rest = lines.pop() if lines and not lines[-1].endswith(('\n', '\r')) else ''
+        if lines:
+            yield lines
+    if rest:
+        yield [rest]
+
+
+def strip_markdown(line):
+    """Return the text of a line of Markdown without its markup."""
+    if MARKDOWN_RULE_RE.match(line):
+        return '\n'
+    line = MARKDOWN_PREFIX_RE.sub('', line)
+    line = MARKDOWN_IMAGE_RE.sub(r'\1', line)
+    line = MARKDOWN_LINK_RE.sub(r'\1', line)
+    return MARKDOWN_EMPHASIS_RE.sub(r'\2', line)
+
+
+def iter_markdown(pieces):
+    """Yield the text of Markdown given in pieces, leaving out code blocks."""
+    in_code = False
+    for lines in iter_lines(pieces):
+        text = []
+        for line in lines:
+            if MARKDOWN_FENCE_RE.match(line):
+                in_code = not in_code
+                text.append('\n')
+            elif not in_code:
+                text.append(strip_markdown(line))
+        yield ''.join(text)
+
+
+class HTMLTextParser(HTMLParser):
+    """Collect the visible text of an HTML document fed in pieces."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skipping = 0
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HTML_SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in HTML_BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in HTML_BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in HTML_SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in HTML_BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def take_text(self):
+        """Return the text collected since the last call."""
+        text = ''.join(self.parts)
+        self.parts = []
+        return text
+
+
+def iter_html(pieces):
+    """Yield the visible text of HTML given in pieces."""
+    parser = HTMLTextParser()
+    for piece in pieces:
+        parser.feed(piece)
+        text = parser.take_text()
+        if text:
+            yield text
+    parser.close()
+    text = parser.take_text()
+    if text:
+        yield text
+
+
+def iter_pdf(f, progress=None):
+    """Yield the text of a PDF a page at a time."""
+    from pypdf import PdfReader
+
+    pages = PdfReader(f).pages
+    for number, page in enumerate(pages, 1):
+        text = page.extract_text() or ''
+        if progress is not None:
+            progress(number / len(pages))
+        if text:
+            yield text + '\n'
+
+
+def iter_file_text(f, kind, progress=None):
+    """Yield the text of a file opened in binary mode, in pieces.
+
+    ``kind`` is one of the values of FILE_KINDS. ``progress`` is called now
+    and then with the fraction of the file read so far.
+    """
+    if kind == 'pdf':
+        return iter_pdf(f, progress)
+
+    size = f.seek(0, 2)
+    f.seek(0)
+
+    def report(position):
+        if progress is not None and size:
+            progress(position / size)
+
+    pieces = iter_decoded(f, report)
+    if kind == 'markdown':
+        return iter_markdown(pieces)
+    if kind == 'html':
+        return iter_html(pieces)
+    return pieces
@@ -0,0 +1,233 @@
+"""Model-free extractive summarization engines."""
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+from nltk.tokenize.destructive import NLTKWordTokenizer
+from scipy import sparse
+
+from .language import get_language_route
+from .resources import NON_WORD_RE, get_stop_words, sent_tokenize
+
+
+def get_summary_size(num_sentences, summary_length):
+    """Return how many sentences an extractive summary keeps."""
+    if summary_length == 'short':
+        return max(1, num_sentences // 4)
+    elif summary_length == 'long':
+        return max(2, num_sentences // 2)
+    return max(1, num_sentences // 3)  # medium
+
+
+# Treebank only splits the period off the very end of its input
+FINAL_PERIOD_RE = re.compile(r'([^\.])(\.)([\]\)}>"\']*)\s*$')
+# A private use character that the tokenizer keeps as a token of its own
+SENTENCE_SEPARATOR = '\ue000'
+
+word_tokenizer = NLTKWordTokenizer()
+
+
+def build_term_matrix(sentences):
+    """Tokenize every sentence once into a sparse sentence x term count matrix.
+
+    All sentences are lowercased and tokenized in a single pass of the
+    Treebank tokenizer that ``word_tokenize`` uses, with a separator token
+    between them, which gives the same tokens as tokenizing them one by one.
+    Returns the CSR matrix and the list of terms indexing its columns.
+    """
+    joined = (' %s ' % SENTENCE_SEPARATOR).join(
+        FINAL_PERIOD_RE.sub(r'\1 \2\3 ', sentence.lower()) for sentence in sentences
+    )
+
+    vocabulary = {}
+    indices = []
+    indptr = [0]
+    for token in word_tokenizer.tokenize(joined):
+        if token == SENTENCE_SEPARATOR:
+            indptr.append(len(indices))
+        else:
+            indices.append(vocabulary.setdefault(token, len(vocabulary)))
+    indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.float64)
+    matrix = sparse.csr_matrix(
+        (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+        shape=(len(sentences), len(vocabulary)),
+    )
+    matrix.sum_duplicates()
+    return matrix, list(vocabulary)
+
+
+def count_words(sentences):
+    """Count the words of a document the way the original scorer did.
+
+    It stripped the punctuation off the whole text before tokenizing it, so
+    "city's" is one word "citys", not "city" and "'s". Without punctuation
+    the Treebank tokenizer only splits on whitespace and a few contractions
+    such as "cannot", so that is all that is done here.
+    """
+    counts = Counter(NON_WORD_RE.sub('', ' '.join(sentences).lower()).split())
+    # The contractions never span words, so each distinct word is split once
+    for word in list(counts):
+        split = ' %s ' % word
+        for regexp in word_tokenizer.CONTRACTIONS2:
+            split = regexp.sub(r' \1 \2 ', split)
+        if split.split() != [word]:
+            count = counts.pop(word)
+            for part in split.split():
+                counts[part] += count
+    return counts
+
+
+def term_weights(matrix, terms, word_counts, stop_words, weighting='frequency'):
+    """Weight every term by how often it occurs in the document.
+
+    As in the original scorer, a term weighs the number of times it occurs
+    as a word of the punctuation-stripped text (``count_words``), and stop
+    words weigh nothing. With ``weighting='tfidf'`` the frequencies are
+    scaled by the smoothed inverse sentence frequency of each term.
+    """
+    weights = np.array([
+        0 if term in stop_words else word_counts.get(term, 0) for term in terms
+    ], dtype=np.float64)
+
+    if weighting == 'tfidf':
+        sentence_frequency = np.bincount(matrix.indices, minlength=len(terms))
+        weights *= np.log((1 + matrix.shape[0]) / (1 + sentence_frequency)) + 1
+    return weights
+
+
+def select_top_sentences(scores, count):
+    """Return the positions of the ``count`` best scoring sentences in document order.
+
+    Sentences without any score are never selected. Ties are broken in favour
+    of the earlier sentence, so the selection is deterministic.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) <= count:
+        return candidates
+
+    candidate_scores = scores[candidates]
+    # Value of the count-th best score, found in linear time
+    threshold = candidate_scores[np.argpartition(-candidate_scores, count - 1)[count - 1]]
+    above = candidates[candidate_scores > threshold]
+    ties = candidates[candidate_scores == threshold][:count - len(above)]
+    return np.sort(np.concatenate([above, ties]))
+
+
+def summarize_sentences(sentences, summary_length='medium', stop_words=None, weighting='frequency'):
+    """Pick the summary sentences of an already segmented document."""
+    if not sentences:
+        return []
+    if stop_words is None:
+        stop_words = get_stop_words()
+
+    matrix, terms = build_term_matrix(sentences)
+    scores = matrix @ term_weights(matrix, terms, count_words(sentences), stop_words, weighting)
+    selected = select_top_sentences(scores, get_summary_size(len(sentences), summary_length))
+    return [sentences[i] for i in selected]
+
+
+def summarize_text_nltk(text, bullet_points=False, summary_length='medium', weighting=None, language=None):
+    """Generate a summary using NLTK as fallback.
+
+    ``language`` picks the sentence tokenizer and stop words of its route.
+    """
+    route = get_language_route(language)
+    # Tokenize the text into sentences
+    sentences = sent_tokenize(text, route['sentence_tokenizer'])
+    summary_sentences = summarize_sentences(
+        sentences, summary_length, get_stop_words(route['stop_words']),
+        weighting=weighting or settings.EXTRACTIVE_WEIGHTING,
+    )
+
+    # Format as bullet points if requested
+    if bullet_points:
+        return '\n'.join(['• ' + sentence for sentence in summary_sentences])
+    else:
+        return ' '.join(summary_sentences)
+
+
+def sentence_graph(matrix, terms, stop_words, max_postings=200, threshold=0.1):
+    """Build the sparse cosine similarity graph between sentences.
+
+    Sentences are TF-IDF vectors over their content words. Multiplying the
+    matrix by its transpose walks the inverted index of every term, so only
+    pairs of sentences that share a term are ever compared. Terms that occur
+    in more than ``max_postings`` sentences carry almost no weight but would
+    connect everything to everything, so they are left out, which bounds
+    the cost by ``max_postings`` comparisons per term occurrence. Edges
+    weaker than ``threshold`` are dropped as in LexRank.
+    """
+    sentence_frequency = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    keep = np.array([any(c.isalnum() for c in term) and term not in stop_words for term in terms], dtype=bool)
+    keep &= sentence_frequency <= max_postings
+    vectors = matrix[:, np.flatnonzero(keep)].tocsr()
+
+    idf = np.log((1 + matrix.shape[0]) / (1 + sentence_frequency[keep])) + 1
+    vectors = vectors @ sparse.diags(idf)
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    vectors = sparse.diags(1 / norms) @ vectors
+
+    graph = (vectors @ vectors.T).tocsr()
+    graph.setdiag(0)
+    graph.data[graph.data < threshold] = 0
+    graph.eliminate_zeros()
+    return graph
+
+
+def rank_sentences(graph, damping=0.85, tolerance=1e-6, max_iterations=100):
+    """Score graph nodes with PageRank power iteration.
+
+    Every iteration costs one sparse product, O(nnz). Iteration stops as
+    soon as the scores move less than ``tolerance`` (L1), which usually
+    takes a few dozen iterations.
+    """
+    n = graph.shape[0]
+    out_weight = np.asarray(graph.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    out_weight[dangling] = 1
+    transition = (sparse.diags(1 / out_weight) @ graph).T.tocsr()
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        # Sentences without edges spread their score evenly
+        updated = damping * (transition @ scores + scores[dangling].sum() / n) + (1 - damping) / n
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+
+def summarize_text_textrank(text, bullet_points=False, summary_length='medium', language=None):
+    """Generate a summary by ranking sentences on their similarity graph (LexRank)."""
+    route = get_language_route(language)
+    sentences = sent_tokenize(text, route['sentence_tokenizer'])
+    if not sentences:
+        return ''
+
+    matrix, terms = build_term_matrix(sentences)
+    graph = sentence_graph(
+        matrix, terms, get_stop_words(route['stop_words']),
+        max_postings=settings.TEXTRANK_MAX_POSTINGS,
+        threshold=settings.TEXTRANK_THRESHOLD,
+    )
+    scores = rank_sentences(graph, tolerance=settings.TEXTRANK_TOLERANCE)
+    selected = select_top_sentences(scores, get_summary_size(len(sentences), summary_length))
+    summary_sentences = [sentences[i] for i in selected]
+
+    # Format as bullet points if requested
+    if bullet_points:
+        return '\n'.join(['• ' + sentence for sentence in summary_sentences])
+    else:
+        return ' '.join(summary_sentences)
+
+
+# Extractive engines that can be picked per request, by name
+EXTRACTIVE_ENGINES = {
+    'nltk': summarize_text_nltk,
+    'textrank': summarize_text_textrank,
+}
@@ -21,6 +21,18 @@ class TextForm(forms.Form):
         }),
         label='Summary Length:'
     )
+    engine = forms.ChoiceField(
+        choices=[
+            ('transformer', 'AI model'),
+            ('textrank', 'TextRank (fast, extractive)'),
+            ('nltk', 'Word frequency (fastest, extractive)')
+        ],
+        initial='transformer',
+        widget=forms.Select(attrs={
+            'class': 'form-select'
+        }),
+        label='Summarizer:'
+    )
     bullet_points = forms.BooleanField(
         required=False,
         widget=forms.CheckboxInput(attrs={
@@ -0,0 +1,931 @@
+"""Model loading and summarization.
+
+Importing this module is cheap: torch, transformers and the NLTK based
+extractive engines are only imported when a summary is first generated or
+the model is loaded, so management commands and the pages that never
+summarize don't pay for them.
+"""
+import copy
+import gc
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+import weakref
+import zlib
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.utils import timezone
+
+from . import resources
+from .batching import BatchScheduler
+from .language import SAMPLE_CHARS as LANGUAGE_SAMPLE_CHARS, detect_language, get_language_route
+from .metrics import ERRORS, FALLBACKS, NEAR_DUPLICATES, observe_summary, record_stage, stage
+from .resources import SENTENCE_END_RE, normalize_whitespace, sent_tokenize
+from .model_registry import ModelRegistry
+from .summary_cache import SummaryCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = settings.SUMMARIZER_MODEL_NAME
+
+# Names of the engines in core.extractive.EXTRACTIVE_ENGINES, known without
+# importing it
+EXTRACTIVE_ENGINE_NAMES = ('nltk', 'textrank')
+
+# Characters of a streamed text split into sentences at a time
+SEGMENT_CHARS = 16 * 1024
+
+# Initialize the model and tokenizer
+tokenizer = None
+model = None
+summarizer = None
+scheduler = None
+
+summary_cache = SummaryCache(
+    max_entries=settings.SUMMARY_CACHE_SIZE,
+    ttl=settings.SUMMARY_CACHE_TTL,
+    shared_alias=settings.SUMMARY_CACHE_ALIAS,
+    lock_timeout=settings.SUMMARY_CACHE_LOCK_TIMEOUT,
+)
+
+# Model lifecycle: unloaded -> loading -> ready, or failed until retry_at
+model_state = {
+    'status': 'unloaded',
+    'load_seconds': None,
+    'loaded_at': None,
+    'error': None,
+    'failures': 0,
+    'retry_at': None,
+    'warmed_up_pid': None,
+    'precision': None,
+}
+model_lock = threading.Lock()
+
+# Models of language routes other than MODEL_NAME
+model_registry = ModelRegistry(
+    lambda name: load_pretrained(name, resolve_precision(settings.SUMMARIZER_PRECISION)),
+    budget_mb=settings.SUMMARIZER_MODEL_MEMORY_MB,
+    retry_backoff=settings.SUMMARIZER_RETRY_BACKOFF,
+)
+
+# pipeline -> {src_lang: pipeline sharing its model}; dropped with the pipeline
+_language_pipelines = weakref.WeakKeyDictionary()
+_language_lock = threading.Lock()
+
+WARM_UP_TEXT = (
+    "The model is being warmed up. This short text is summarized once when "
+    "the worker starts so that the first user request does not pay for it."
+)
+
+def cpu_supports_bf16():
+    """Check whether the CPU has native bfloat16 instructions."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            flags = f.read()
+    except OSError:
+        return False
+    import torch
+    return torch.backends.mkldnn.is_available() and ('avx512_bf16' in flags or 'amx_bf16' in flags)
+
+def resolve_precision(precision):
+    """Return the precision to load the model in, given the configured one."""
+    import torch
+
+    if precision not in ('fp32', 'bf16', 'int8'):
+        logger.warning("Unknown SUMMARIZER_PRECISION %r, using fp32", precision)
+        return 'fp32'
+    if precision == 'bf16' and not torch.cuda.is_available() and not cpu_supports_bf16():
+        logger.warning("This CPU has no bfloat16 support, using fp32")
+        return 'fp32'
+    return precision
+
+def load_pretrained(name, precision):
+    """Load a model and its tokenizer for inference; return their summarization pipeline."""
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+
+    loaded_tokenizer = AutoTokenizer.from_pretrained(name)
+    loaded_model = AutoModelForSeq2SeqLM.from_pretrained(
+        name,
+        device_map='auto',
+        low_cpu_mem_usage=True,
+        torch_dtype=torch.bfloat16 if precision == 'bf16' else None,
+    )
+    if precision == 'int8':
+        # Dynamic quantization: int8 weights for the linear layers,
+        # activations quantized on the fly
+        loaded_model = torch.quantization.quantize_dynamic(loaded_model, {torch.nn.Linear}, dtype=torch.qint8)
+    # Inference only: never write to the weights so forked workers
+    # keep sharing their pages
+    loaded_model.eval()
+    loaded_model.requires_grad_(False)
+    return pipeline("summarization", model=loaded_model, tokenizer=loaded_tokenizer)
+
+def load_model(wait=False, warm_up=True):
+    """Load the model only when needed.
+
+    Returns False without blocking while another thread is loading the model
+    (unless ``wait`` is set) and while a failed load is backing off, so
+    callers can fall back to NLTK instead of waiting for the cold start.
+    Pass ``warm_up=False`` when loading in a process that will fork workers:
+    running inference there would start torch thread pools that do not
+    survive the fork.
+    """
+    global tokenizer, model, summarizer
+    if summarizer is not None:
+        return True
+    if model_state['status'] == 'failed' and time.monotonic() < model_state['retry_at']:
+        return False
+    if not model_lock.acquire(blocking=wait):
+        return False
+
+    try:
+        if summarizer is not None:
+            return True
+        if model_state['status'] == 'failed' and time.monotonic() < model_state['retry_at']:
+            return False
+
+        model_state['status'] = 'loading'
+        started = time.monotonic()
+        try:
+            precision = resolve_precision(settings.SUMMARIZER_PRECISION)
+            loaded = load_pretrained(MODEL_NAME, precision)
+            tokenizer, model = loaded.tokenizer, loaded.model
+            if warm_up:
+                warm_up_model(loaded)
+        except Exception as e:
+            logger.exception("Model loading error")
+            ERRORS.inc('model_load')
+            tokenizer = model = None
+            failures = model_state['failures'] + 1
+            backoff = min(
+                settings.SUMMARIZER_RETRY_BACKOFF * 2 ** (failures - 1),
+                settings.SUMMARIZER_RETRY_BACKOFF_MAX,
+            )
+            model_state.update(
+                status='failed',
+                error=str(e),
+                failures=failures,
+                retry_at=time.monotonic() + backoff,
+            )
+            return False
+
+        summarizer = loaded
+        load_seconds = time.monotonic() - started
+        record_stage('model_load', load_seconds)
+        model_state.update(
+            status='ready',
+            precision=precision,
+            load_seconds=round(load_seconds, 3),
+            loaded_at=timezone.now().isoformat(),
+            error=None,
+            failures=0,
+            retry_at=None,
+        )
+        return True
+    finally:
+        model_lock.release()
+
+def warm_up_model(pipe=None):
+    """Run one dummy generate so the first request is not slower."""
+    import torch
+
+    pipe = pipe or summarizer
+    with torch.inference_mode():
+        pipe(WARM_UP_TEXT, max_length=20, min_length=5, do_sample=False)
+    model_state['warmed_up_pid'] = os.getpid()
+
+def _preload():
+    resources.preload()
+    if load_model(wait=True) and model_state['warmed_up_pid'] != os.getpid():
+        # Loaded in the gunicorn master before the fork; warm up here
+        warm_up_model()
+
+def preload_model():
+    """Load and warm up the model in a background thread."""
+    thread = threading.Thread(target=_preload, name='model-preload', daemon=True)
+    thread.start()
+    return thread
+
+def share_model_before_fork():
+    """Load the model in the gunicorn master so forked workers share its weights.
+
+    The weights are only ever read, so the forked workers keep sharing the
+    master's pages copy-on-write. Freezing the garbage collector keeps it
+    from touching the objects loaded so far, which would copy their pages
+    into every worker.
+    """
+    resources.preload()
+    loaded = load_model(wait=True, warm_up=False)
+    gc.collect()
+    gc.freeze()
+    return loaded
+
+def configure_torch_threads():
+    """Size torch's thread pools for this worker; call after fork, before inference."""
+    threads = settings.SUMMARIZER_TORCH_THREADS
+    if not threads:
+        return
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Inter-op threads were already started in this process
+        pass
+
+def get_model_status():
+    """Return a JSON-serializable snapshot of the model lifecycle state."""
+    status = dict(model_state, model=MODEL_NAME, language_models=model_registry.stats())
+    if status['retry_at'] is not None:
+        status['retry_in'] = max(0.0, round(status.pop('retry_at') - time.monotonic(), 1))
+    else:
+        status.pop('retry_at')
+    return status
+
+def model_available(language=None, wait=False):
+    """Start loading the model of a language's route if needed; return whether it can be used now.
+
+    Models other than MODEL_NAME load in the background meanwhile; commands
+    pass ``wait`` to wait for them instead.
+    """
+    name = get_language_route(language)['model']
+    if name == MODEL_NAME:
+        return load_model(wait=wait) and summarizer is not None
+    return model_registry.load(name, wait=wait)
+
+def get_pipeline(language=None):
+    """Return the summarization pipeline of a language's route, or None if its model isn't loaded.
+
+    For a ``src_lang`` the model supports, the pipeline shares the model's
+    weights but has its own copy of the tokenizer set to that language, so
+    requests in other languages never change it under each other.
+    """
+    route = get_language_route(language)
+    base = summarizer if route['model'] == MODEL_NAME else model_registry.get(route['model'])
+    src_lang = route['src_lang']
+    if base is None or src_lang not in (getattr(base.tokenizer, 'lang_code_to_id', None) or {}):
+        return base
+
+    with _language_lock:
+        pipelines = _language_pipelines.setdefault(base, {})
+        pipe = pipelines.get(src_lang)
+        if pipe is None:
+            from transformers import pipeline
+
+            language_tokenizer = copy.deepcopy(base.tokenizer)
+            language_tokenizer.src_lang = src_lang
+            pipe = pipelines[src_lang] = pipeline("summarization", model=base.model, tokenizer=language_tokenizer)
+    return pipe
+
+def language_generate_kwargs(pipe):
+    """Make a multilingual model write its summary in the source language."""
+    src_lang = getattr(pipe.tokenizer, 'src_lang', None)
+    lang_code_to_id = getattr(pipe.tokenizer, 'lang_code_to_id', None) or {}
+    if src_lang in lang_code_to_id:
+        return {'forced_bos_token_id': lang_code_to_id[src_lang]}
+    return {}
+
+def cache_model_name(language=None):
+    """Name the model and source language a summary is made with, for cache keys."""
+    route = get_language_route(language)
+    return f"{route['model']}:{route['src_lang']}" if route['src_lang'] else route['model']
+
+def run_batch(texts, language=None, **generate_kwargs):
+    """Run one padded batch of texts through the summarizer pipeline of a language."""
+    pipe = get_pipeline(language)
+    if pipe is None:
+        raise RuntimeError(f'The model of language {language} is not loaded')
+    results = pipe(texts, batch_size=len(texts), **generate_kwargs, **language_generate_kwargs(pipe))
+    return [result['summary_text'] for result in results]
+
+def get_scheduler():
+    """Return the micro-batching scheduler of this process, creating it if needed."""
+    global scheduler
+    # The batching thread does not survive a fork, so each worker gets its own
+    if scheduler is None or scheduler.pid != os.getpid():
+        scheduler = BatchScheduler(
+            run_batch,
+            max_batch_size=settings.SUMMARIZER_BATCH_SIZE,
+            max_wait_ms=settings.SUMMARIZER_BATCH_WAIT_MS,
+            max_queue_size=settings.SUMMARIZER_QUEUE_SIZE,
+            timeout=settings.SUMMARIZER_BATCH_TIMEOUT,
+        )
+    return scheduler
+
+def run_summarizer(texts, **generate_kwargs):
+    """Summarize a list of texts, batched with other requests when enabled."""
+    with stage('generate'):
+        if settings.SUMMARIZER_BATCHING:
+            return get_scheduler().map(texts, **generate_kwargs)
+
+        summaries = []
+        for start in range(0, len(texts), settings.SUMMARIZER_BATCH_SIZE):
+            summaries.extend(run_batch(texts[start:start + settings.SUMMARIZER_BATCH_SIZE], **generate_kwargs))
+        return summaries
+
+def is_turkish_text(text):
+    """Check if the text is in Turkish."""
+    return detect_language(text) == 'tr'
+
+def get_max_length(summary_length):
+    """Return the generation max_length for the given summary length."""
+    if summary_length == 'short':
+        return 50
+    elif summary_length == 'long':
+        return 150
+    return 100  # medium
+
+def is_chunk_boundary(sentence):
+    """Whether a content-defined chunk may end after this sentence.
+
+    Decided by a stable hash of the sentence alone, so a chunk boundary
+    stays put when the text before it is edited.
+    """
+    return zlib.crc32(sentence.encode()) % settings.SUMMARIZER_CHUNK_BOUNDARY_SENTENCES == 0
+
+def iter_chunks(sentence_batches, max_tokens, language=None, content_defined=False):
+    """Pack sentences into chunks of at most max_tokens tokens as they come.
+
+    ``sentence_batches`` is an iterable of lists of sentences, each
+    tokenized at once, so a text can be chunked while it is still being
+    read. Without a loaded model the budget counts words. See
+    ``split_into_chunks`` for ``content_defined``.
+    """
+    pipe = get_pipeline(language)
+    chunk_tokenizer = pipe.tokenizer if pipe is not None else tokenizer
+
+    current = []
+    current_tokens = 0
+    for sentences in sentence_batches:
+        with stage('tokenize'):
+            if chunk_tokenizer is not None:
+                token_ids = chunk_tokenizer(sentences, add_special_tokens=False)['input_ids'] if sentences else []
+            else:
+                token_ids = [sentence.split() for sentence in sentences]
+
+        for sentence, ids in zip(sentences, token_ids):
+            # A single sentence longer than the budget is cut into token windows
+            if len(ids) > max_tokens:
+                if current:
+                    yield ' '.join(current)
+                    current, current_tokens = [], 0
+                for start in range(0, len(ids), max_tokens):
+                    window = ids[start:start + max_tokens]
+                    if chunk_tokenizer is not None:
+                        yield chunk_tokenizer.decode(window, skip_special_tokens=True)
+                    else:
+                        yield ' '.join(window)
+                continue
+
+            if current and current_tokens + len(ids) > max_tokens:
+                yield ' '.join(current)
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += len(ids)
+            if content_defined and current_tokens >= max_tokens // 4 and is_chunk_boundary(sentence):
+                yield ' '.join(current)
+                current, current_tokens = [], 0
+
+    if current:
+        yield ' '.join(current)
+
+def split_into_chunks(text, max_tokens, language=None, content_defined=False):
+    """Split text on sentence boundaries into chunks of at most max_tokens tokens.
+
+    Chunks are normally packed full. With ``content_defined`` a chunk also
+    ends after a boundary sentence (see ``is_chunk_boundary``) once it holds
+    a quarter of the budget, so an edit only changes the chunks around it
+    instead of shifting every chunk after it.
+    """
+    with stage('tokenize'):
+        sentences = sent_tokenize(text, get_language_route(language)['sentence_tokenizer'])
+    return list(iter_chunks([sentences], max_tokens, language, content_defined))
+
+def iter_sentence_batches(pieces, language=None, buffer_chars=SEGMENT_CHARS):
+    """Split a text given as an iterable of pieces into lists of sentences.
+
+    Pieces are buffered up to about ``buffer_chars`` characters and split;
+    the last sentence of a buffer may go on in the next piece, so it is
+    kept for the next buffer unless it is as long as a buffer by itself.
+    """
+    sentence_tokenizer = get_language_route(language)['sentence_tokenizer']
+    buffer = ''
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < buffer_chars:
+            continue
+        with stage('tokenize'):
+            sentences = sent_tokenize(buffer, sentence_tokenizer)
+        buffer = ''
+        if sentences and len(sentences[-1]) < buffer_chars:
+            # The tokenizer drops the space after it, which may end the piece
+            buffer = sentences.pop() + ' '
+        if sentences:
+            yield [normalize_whitespace(sentence) for sentence in sentences]
+    if buffer.strip():
+        with stage('tokenize'):
+            sentences = sent_tokenize(buffer, sentence_tokenizer)
+        yield [normalize_whitespace(sentence) for sentence in sentences]
+
+def get_generate_kwargs(max_length, min_length=30, language=None):
+    """Return the generation options shared by every summarization pass.
+
+    ``language`` picks the route whose model runs the passes.
+    """
+    return {
+        'max_length': max_length,
+        'min_length': min(min_length, max_length),
+        'do_sample': False,
+        'truncation': True,
+        'language': language,
+    }
+
+def chunk_summary_key(chunk, generate_kwargs):
+    """Key of the partial summary of a chunk: its text, model, precision and generation options."""
+    options = (
+        f"{cache_model_name(generate_kwargs['language'])}|{settings.SUMMARIZER_PRECISION}|"
+        f"{generate_kwargs['max_length']}|{generate_kwargs['min_length']}"
+    )
+    return hashlib.sha256(f'{options}\0{chunk}'.encode()).hexdigest()
+
+def summarize_chunks(chunks, generate_kwargs, stats):
+    """Summarize chunks, reusing the stored partial summaries of unchanged ones.
+
+    Only the chunks without a ``ChunkSummary`` go to the model; their
+    summaries are stored for the next time. The number of reused chunks is
+    added to ``stats['reused_chunks']``. If the database can't be used the
+    chunks are all summarized.
+    """
+    from .models import ChunkSummary
+
+    keys = [chunk_summary_key(chunk, generate_kwargs) for chunk in chunks]
+    try:
+        with stage('chunk_lookup'):
+            found = dict(ChunkSummary.objects.filter(key__in=set(keys)).values_list('key', 'summary'))
+    except DatabaseError:
+        logger.exception("Chunk summary lookup error")
+        found = {}
+
+    # The same chunk may appear twice; summarize it once
+    missing = {key: chunk for key, chunk in zip(keys, chunks) if key not in found}
+    if missing:
+        partials = run_summarizer(list(missing.values()), **generate_kwargs)
+        created = dict(zip(missing, partials))
+        found.update(created)
+        try:
+            with stage('db'):
+                ChunkSummary.objects.bulk_create(
+                    [ChunkSummary(key=key, summary=summary) for key, summary in created.items()],
+                    ignore_conflicts=True,
+                )
+        except DatabaseError:
+            logger.exception("Chunk summary store error")
+
+    stats['reused_chunks'] = stats.get('reused_chunks', 0) + sum(key not in missing for key in keys)
+    return [found[key] for key in keys]
+
+def reduce_to_single_chunk(text, generate_kwargs):
+    """Map-reduce text over token-budgeted chunks until one chunk is left.
+
+    Returns the text for the final summarization pass and a dict with the
+    number of chunks in the first pass and the number of levels used,
+    counting the final pass. With SUMMARIZER_INCREMENTAL the chunks are
+    content-defined and their partial summaries are stored and reused at
+    every level, so summarizing an edited document again only generates
+    the chunks that changed, plus the final pass.
+    """
+    max_tokens = settings.SUMMARIZER_CHUNK_TOKENS
+    language = generate_kwargs['language']
+    incremental = settings.SUMMARIZER_INCREMENTAL
+    chunks = split_into_chunks(text, max_tokens, language, content_defined=incremental)
+    stats = {'chunks': len(chunks), 'levels': 1}
+    if incremental:
+        stats['reused_chunks'] = 0
+
+    # Map: summarize the chunks as a batch, then reduce the joined partial
+    # summaries until they fit into a single chunk
+    while len(chunks) > 1 and stats['levels'] < settings.SUMMARIZER_MAX_LEVELS:
+        if incremental:
+            partials = summarize_chunks(chunks, generate_kwargs, stats)
+        else:
+            partials = run_summarizer(chunks, **generate_kwargs)
+        chunks = split_into_chunks(' '.join(partials), max_tokens, language, content_defined=incremental)
+        stats['levels'] += 1
+
+    return ' '.join(chunks), stats
+
+def summarize_long_text(text, max_length, min_length=30, language=None):
+    """Summarize text of any length by map-reducing over token-budgeted chunks.
+
+    Returns the summary and a dict with the number of chunks in the first
+    pass and the number of summarization levels that were needed.
+    """
+    generate_kwargs = get_generate_kwargs(max_length, min_length, language)
+    final_text, stats = reduce_to_single_chunk(text, generate_kwargs)
+    summary = run_summarizer([final_text], **generate_kwargs)[0]
+    return summary, stats
+
+def summarize_long_texts(texts, max_length, min_length=30, language=None):
+    """Summarize several texts with the same options in padded batches.
+
+    Each text is reduced to a single chunk as in ``summarize_long_text``;
+    the final passes are then sorted by length, so a batch pads little, and
+    run in batches of SUMMARIZER_BATCH_SIZE. They bypass the scheduler:
+    the request is a batch already and would only fill its queue. Returns
+    the summaries in input order and their chunk stats.
+    """
+    generate_kwargs = get_generate_kwargs(max_length, min_length, language)
+    reduced = [reduce_to_single_chunk(text, generate_kwargs) for text in texts]
+    order = sorted(range(len(texts)), key=lambda i: len(reduced[i][0]))
+    batch_size = settings.SUMMARIZER_BATCH_SIZE
+
+    summaries = [None] * len(texts)
+    with stage('generate'):
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, summary in zip(batch, run_batch([reduced[i][0] for i in batch], **generate_kwargs)):
+                summaries[i] = summary
+    return summaries, [stats for _, stats in reduced]
+
+def format_bullet_points(summary):
+    """Format each sentence of a summary as a bullet point."""
+    # Split into sentences and clean them
+    sentences = SENTENCE_END_RE.split(summary)
+    sentences = [s.strip() for s in sentences if s.strip()]
+    return '\n'.join(['• ' + sentence for sentence in sentences])
+
+def cancelled_criteria(cancelled):
+    """Return a stopping criteria that ends generation once ``cancelled`` is set."""
+    from transformers import StoppingCriteria
+
+    class CancelledCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs):
+            return cancelled.is_set()
+
+    return CancelledCriteria()
+
+def stream_summary(text, summary_length, cancelled, stats, language=None):
+    """Yield pieces of the model summary of normalized text as they are decoded.
+
+    Long documents are first reduced to a single chunk as usual; only the
+    final pass is streamed. Generation stops early once ``cancelled`` is set.
+    """
+    import torch
+    from transformers import StoppingCriteriaList, TextIteratorStreamer
+
+    generate_kwargs = get_generate_kwargs(get_max_length(summary_length), language=language)
+    final_text, chunk_stats = reduce_to_single_chunk(text, generate_kwargs)
+    stats.update(chunk_stats, engine='transformer')
+
+    pipe = get_pipeline(language)
+    if pipe is None:
+        raise RuntimeError(f'The model of language {language} is not loaded')
+    inputs = pipe.tokenizer(final_text, return_tensors='pt', truncation=True)
+    streamer = TextIteratorStreamer(pipe.tokenizer, skip_special_tokens=True, timeout=settings.SUMMARIZER_STREAM_TIMEOUT)
+    errors = []
+
+    def generate():
+        try:
+            with torch.inference_mode():
+                pipe.model.generate(
+                    **inputs.to(pipe.model.device),
+                    **language_generate_kwargs(pipe),
+                    max_length=generate_kwargs['max_length'],
+                    min_length=generate_kwargs['min_length'],
+                    # Streaming only works with greedy decoding
+                    num_beams=1,
+                    do_sample=False,
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([cancelled_criteria(cancelled)]),
+                )
+        except Exception as e:
+            errors.append(e)
+            streamer.end()
+
+    thread = threading.Thread(target=generate, name='summary-stream', daemon=True)
+    thread.start()
+    try:
+        for piece in streamer:
+            if piece:
+                yield piece
+    finally:
+        cancelled.set()
+    thread.join()
+    if errors:
+        raise errors[0]
+
+def summarize_text(text, bullet_points=False, summary_length='medium', stats=None, engine='transformer',
+                   user_id=None):
+    """Summarize the given text using Hugging Face's Turkish model.
+
+    ``engine`` can name one of the extractive engines instead, which never
+    load or call the model. The language of the text is detected and picks
+    the model and the NLTK resources (see ``core.language``). Summaries are
+    served from the summary cache when the same normalized text was already
+    summarized with the same options and engine; model requests of the user
+    ``user_id`` also reuse the stored summary of a near-duplicate text of
+    theirs (``reuse_near_duplicate``). If a ``stats`` dict is given it is
+    filled with the engine that produced the summary, the language, whether
+    it came from the cache and, for the model, the number of chunks and
+    levels used or the near-duplicate reused.
+    """
+    if stats is None:
+        stats = {}
+    started = time.perf_counter()
+
+    # Clean and preprocess text
+    text = normalize_whitespace(text)
+    
+    if not text:
+        return ""
+
+    with stage('detect_language'):
+        language = detect_language(text)
+    if engine in EXTRACTIVE_ENGINE_NAMES:
+        use_model = False
+    else:
+        use_model = model_available(language)
+        engine = 'transformer' if use_model else 'nltk'
+        if not use_model:
+            FALLBACKS.inc('model_unavailable')
+    key = make_cache_key(text, summary_length, bullet_points, cache_model_name(language), engine)
+
+    def compute():
+        if use_model:
+            reused = reuse_near_duplicate(text, summary_length, bullet_points, language, user_id)
+            if reused is not None:
+                # Only for this user: not stored under the key of this text
+                return reused, False
+        generate_stats = {}
+        summary = generate_summary(text, bullet_points, summary_length, use_model, generate_stats, engine, language)
+        # A model failure falls back to NLTK; don't store that under the model key
+        return (summary, generate_stats), generate_stats['engine'] == engine
+
+    (summary, generate_stats), cached = summary_cache.get_or_compute(key, compute)
+    stats.update(generate_stats, cached=cached, language=language)
+    observe_summary(text, summary_length, stats, time.perf_counter() - started)
+    return summary
+
+def summarize_texts(documents, user_id=None, wait=False):
+    """Summarize several documents at once, batching the model passes.
+
+    ``documents`` is a list of dicts with ``text``, ``bullet_points``,
+    ``summary_length`` and ``engine``, as taken by ``summarize_text``.
+    Returns a ``(summary, stats)`` pair per document, in input order. Cached
+    summaries and those of near-duplicate texts of the user ``user_id`` are
+    reused; the model documents are summarized together per
+    ``summary_length`` and language, falling back to NLTK if their batch
+    fails. With ``wait``, models that are not loaded yet are waited for
+    instead of falling back to NLTK.
+    """
+    from .extractive import summarize_text_nltk
+
+    results = [None] * len(documents)
+    # language -> whether its model can be used
+    use_model = {}
+    # (summary_length, language) -> [(index, text, bullet_points, cache key)]
+    pending = {}
+    for i, document in enumerate(documents):
+        text = normalize_whitespace(document['text'])
+        bullet_points = document['bullet_points']
+        summary_length = document['summary_length']
+        engine = document['engine']
+        if not text:
+            results[i] = ('', {})
+            continue
+
+        with stage('detect_language'):
+            language = detect_language(text)
+        if engine not in EXTRACTIVE_ENGINE_NAMES:
+            if language not in use_model:
+                use_model[language] = model_available(language, wait)
+            engine = 'transformer' if use_model[language] else 'nltk'
+            if not use_model[language]:
+                FALLBACKS.inc('model_unavailable')
+        key = make_cache_key(text, summary_length, bullet_points, cache_model_name(language), engine)
+
+        cached = summary_cache.get(key)
+        if cached is not None:
+            summary, stats = cached
+            results[i] = (summary, dict(stats, cached=True, language=language))
+        elif engine == 'transformer':
+            reused = reuse_near_duplicate(text, summary_length, bullet_points, language, user_id)
+            if reused is not None:
+                results[i] = (reused[0], dict(reused[1], cached=False, language=language))
+            else:
+                pending.setdefault((summary_length, language), []).append((i, text, bullet_points, key))
+        else:
+            stats = {}
+            summary = generate_summary(text, bullet_points, summary_length, False, stats, engine, language)
+            if stats['engine'] == engine:
+                summary_cache.set(key, (summary, dict(stats)))
+            results[i] = (summary, dict(stats, cached=False, language=language))
+
+    for (summary_length, language), items in pending.items():
+        try:
+            summaries, chunk_stats = summarize_long_texts(
+                [text for _, text, _, _ in items], get_max_length(summary_length), language=language,
+            )
+        except Exception:
+            logger.exception("Batch summarization error")
+            ERRORS.inc('generate')
+            for i, text, bullet_points, _ in items:
+                FALLBACKS.inc('error')
+                with stage('extractive'):
+                    summary = summarize_text_nltk(text, bullet_points, summary_length, language=language)
+                results[i] = (summary, {'engine': 'nltk', 'cached': False, 'language': language})
+            continue
+
+        for (i, _, bullet_points, key), summary, stats in zip(items, summaries, chunk_stats):
+            if bullet_points:
+                summary = format_bullet_points(summary)
+            stats['engine'] = 'transformer'
+            summary_cache.set(key, (summary, dict(stats)))
+            results[i] = (summary, dict(stats, cached=False, language=language))
+    return results
+
+def reuse_near_duplicate(text, summary_length, bullet_points, language, user_id):
+    """Return ``(summary, stats)`` of a stored near-duplicate of text, or None.
+
+    Lets a model request of the user ``user_id`` reuse the summary of a text
+    of theirs that the model of ``language`` already summarized with the
+    same options, up to whitespace, a footer or small edits (see
+    ``core.dedup``). The result is the other text's summary, so it must not
+    be cached under the key of this one.
+    """
+    from .dedup import find_near_duplicate
+
+    if user_id is None:
+        return None
+    try:
+        with stage('dedup'):
+            match = find_near_duplicate(text, summary_length, bullet_points, cache_model_name(language), user_id)
+    except DatabaseError:
+        logger.exception("Near-duplicate lookup error")
+        return None
+    if match is None:
+        return None
+    NEAR_DUPLICATES.inc()
+    return match.summary_text, {
+        'engine': 'transformer',
+        'near_duplicate': match.id,
+        'similarity': round(match.similarity, 3),
+    }
+
+def summary_origin(stats):
+    """Return the ``engine`` and ``model_name`` to save on a Summary made with ``stats``."""
+    engine = stats.get('engine') or ''
+    model_name = cache_model_name(stats.get('language')) if engine == 'transformer' else ''
+    return {'engine': engine, 'model_name': model_name}
+
+def summarize_text_pieces(pieces, bullet_points=False, summary_length='medium', stats=None, engine='transformer'):
+    """Summarize a text given as an iterable of pieces, e.g. read from a file.
+
+    The text is never held as a whole: pieces are split into sentences and
+    packed into chunks as they come, and each batch of chunks is summarized
+    (by the model, or by ``engine`` when it is extractive or the model is
+    unavailable) before more is read, and the partial summaries are
+    summarized again whenever they fill a batch. What is left is reduced as
+    in ``summarize_long_text``. The language is detected from the start of
+    the text. Summaries are not cached. ``stats`` is filled as
+    by ``summarize_text``, plus the number of words read.
+    """
+    from .extractive import EXTRACTIVE_ENGINES
+
+    if stats is None:
+        stats = {}
+    started = time.perf_counter()
+
+    pieces = iter(pieces)
+    head = ''
+    for piece in pieces:
+        head += piece
+        if len(head) >= LANGUAGE_SAMPLE_CHARS:
+            break
+    with stage('detect_language'):
+        language = detect_language(normalize_whitespace(head))
+    if engine in EXTRACTIVE_ENGINE_NAMES:
+        use_model = False
+    else:
+        use_model = model_available(language)
+        engine = 'transformer' if use_model else 'nltk'
+        if not use_model:
+            FALLBACKS.inc('model_unavailable')
+
+    words = 0
+
+    def counted(sentence_batches):
+        nonlocal words
+        for sentences in sentence_batches:
+            words += sum(len(sentence.split()) for sentence in sentences)
+            yield sentences
+
+    max_tokens = settings.SUMMARIZER_CHUNK_TOKENS
+    batch_size = settings.SUMMARIZER_BATCH_SIZE
+    content_defined = use_model and settings.SUMMARIZER_INCREMENTAL
+    chunks = iter_chunks(
+        counted(iter_sentence_batches(itertools.chain([head], pieces), language)),
+        max_tokens, language, content_defined=content_defined,
+    )
+    generate_kwargs = get_generate_kwargs(get_max_length(summary_length), language=language)
+
+    def summarize_batch(batch):
+        if not use_model:
+            with stage('extractive'):
+                return [EXTRACTIVE_ENGINES[engine](chunk, False, summary_length, language=language)
+                        for chunk in batch]
+        if settings.SUMMARIZER_INCREMENTAL:
+            return summarize_chunks(batch, generate_kwargs, stats)
+        return run_summarizer(batch, **generate_kwargs)
+
+    # Partial summaries per level, the ones of earlier text in higher levels.
+    # A level holding a batch of chunks is summarized into the next one, so
+    # they never hold more than a batch each however long the text is. The
+    # model gets at most SUMMARIZER_MAX_LEVELS levels, as its summaries are
+    # not bound to be shorter than their text; extractive ones always are.
+    max_levels = settings.SUMMARIZER_MAX_LEVELS if use_model else None
+    levels = [[]]
+    chunk_count = 0
+    while True:
+        batch = list(itertools.islice(chunks, batch_size))
+        if not batch:
+            break
+        chunk_count += len(batch)
+        levels[0].extend(summarize_batch(batch))
+        for level, partials in enumerate(levels):
+            if level + 1 == max_levels:
+                break
+            reduced = split_into_chunks(' '.join(partials), max_tokens, language, content_defined=content_defined)
+            if len(reduced) < batch_size:
+                break
+            if level + 1 == len(levels):
+                levels.append([])
+            levels[level + 1].extend(summarize_batch(reduced))
+            levels[level] = []
+    partials = [partial for level in reversed(levels) for partial in level]
+
+    # Reduce: a single chunk is summarized already
+    if not use_model:
+        with stage('extractive'):
+            summary = EXTRACTIVE_ENGINES[engine](' '.join(partials), bullet_points, summary_length, language=language)
+        depth = len(levels) + (chunk_count > 1)
+    elif chunk_count <= 1:
+        summary = partials[0] if partials else ''
+        depth = 1
+    else:
+        final_text, reduce_stats = reduce_to_single_chunk(' '.join(partials), generate_kwargs)
+        summary = run_summarizer([final_text], **generate_kwargs)[0]
+        depth = len(levels) + reduce_stats['levels']
+    if use_model and bullet_points:
+        summary = format_bullet_points(summary)
+
+    stats.update(engine=engine, language=language, chunks=chunk_count, levels=depth, words=words, cached=False)
+    observe_summary('', summary_length, stats, time.perf_counter() - started, words=words)
+    return summary
+
+def generate_summary(text, bullet_points, summary_length, use_model, stats, engine='nltk', language=None):
+    """Generate a summary of already normalized text, bypassing the cache.
+
+    Without the model the extractive ``engine`` is used. ``language`` picks
+    the route to summarize with.
+    """
+    from .extractive import EXTRACTIVE_ENGINES, summarize_text_nltk
+
+    try:
+        # Try using Hugging Face model first
+        if use_model:
+            # Set max length based on summary_length parameter
+            max_length = get_max_length(summary_length)
+            
+            # Generate summary, chunking documents longer than the model input
+            summary, chunk_stats = summarize_long_text(text, max_length, language=language)
+            stats.update(chunk_stats, engine='transformer')
+            
+            # Format as bullet points if requested
+            if bullet_points:
+                return format_bullet_points(summary)
+            else:
+                return summary
+        else:
+            # Extractive engine requested, or fallback to NLTK if model loading fails
+            if engine not in EXTRACTIVE_ENGINES:
+                engine = 'nltk'
+            stats['engine'] = engine
+            with stage('extractive'):
+                return EXTRACTIVE_ENGINES[engine](text, bullet_points, summary_length, language=language)
+            
+    except Exception:
+        logger.exception("Summarization error")
+        ERRORS.inc('generate')
+        FALLBACKS.inc('error')
+        # Fallback to NLTK if there's an error
+        stats.clear()
+        stats['engine'] = 'nltk'
+        with stage('extractive'):
+            return summarize_text_nltk(text, bullet_points, summary_length, language=language)
@@ -0,0 +1,162 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .extraction import file_kind
+from .inference import summarize_text, summary_origin
+from .metrics import ERRORS
+from .models import Summary, SummaryJob
+
+logger = logging.getLogger(__name__)
+
+executor = None
+
+
+def get_executor():
+    """Return the local worker pool that runs jobs in the web process."""
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.SUMMARY_JOB_WORKERS,
+            thread_name_prefix='summary-job',
+        )
+    return executor
+
+
+def enqueue_job(job):
+    """Hand a pending job to the configured backend.
+
+    With the 'thread' backend it runs in this process's worker pool; a
+    pool thread that finishes a job also runs the jobs a dead web worker
+    left behind. With the 'command' backend it stays pending until
+    `run_summary_jobs` picks it up.
+    """
+    if settings.SUMMARY_JOB_BACKEND == 'thread':
+        job_id = job.pk
+        transaction.on_commit(lambda: get_executor().submit(_run_in_thread, job_id))
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+        # Also run the jobs a web worker that died left pending or running
+        while True:
+            job_id = claim_next_job()
+            if job_id is None:
+                break
+            run_job(job_id, claimed=True)
+    finally:
+        close_old_connections()
+
+
+def claimable_jobs():
+    """Return the jobs a worker may claim: pending ones and ones whose claim timed out."""
+    stale = timezone.now() - timedelta(seconds=settings.SUMMARY_JOB_TIMEOUT)
+    return SummaryJob.objects.filter(
+        Q(status=SummaryJob.STATUS_PENDING) | Q(status=SummaryJob.STATUS_RUNNING, started_at__lt=stale)
+    )
+
+
+def claim_job(job_id):
+    """Mark a claimable job as running; return False if another worker has it."""
+    claimed = claimable_jobs().filter(pk=job_id).update(
+        status=SummaryJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+    )
+    return claimed == 1
+
+
+def claim_next_job():
+    """Claim the oldest claimable job, or return None if there is none."""
+    while True:
+        job_id = claimable_jobs().order_by('created_at').values_list('pk', flat=True).first()
+        if job_id is None:
+            return None
+        if claim_job(job_id):
+            return job_id
+
+
+def run_file_job(job):
+    """Summarize the uploaded file of a job, recording its progress.
+
+    Returns the summary; ``job.summary`` and ``job.truncated`` are set.
+    """
+    from .uploads import summarize_file
+
+    def progress(fraction):
+        percent = int(fraction * 100)
+        if percent > job.progress:
+            job.progress = percent
+            SummaryJob.objects.filter(pk=job.pk).update(progress=percent)
+
+    stats = {}
+    with open(job.source_file, 'rb') as f:
+        summary_text, job.summary = summarize_file(
+            f, file_kind(job.source_name),
+            bullet_points=job.bullet_points,
+            summary_length=job.summary_length,
+            engine=job.engine,
+            user_id=job.user_id,
+            stats=stats,
+            progress=progress,
+        )
+    job.truncated = stats['truncated']
+    return summary_text
+
+
+def run_job(job_id, claimed=False):
+    """Summarize a job's text or file and store the result, saving a Summary for users."""
+    if not claimed and not claim_job(job_id):
+        return
+
+    job = SummaryJob.objects.get(pk=job_id)
+    stats = {}
+    try:
+        if job.source_file:
+            summary_text = run_file_job(job)
+        else:
+            summary_text = summarize_text(
+                job.text, bullet_points=job.bullet_points, summary_length=job.summary_length, stats=stats,
+                engine=job.engine, user_id=job.user_id,
+            )
+        if not summary_text.strip():
+            raise ValueError('Empty summary')
+
+        # The Summary of a file was saved as it was read
+        if job.user_id is not None and not job.source_file:
+            job.summary = Summary.objects.create(
+                user_id=job.user_id,
+                original_text=job.text,
+                summary_text=summary_text,
+                bullet_points=job.bullet_points,
+                summary_length=job.summary_length,
+                **summary_origin(stats)
+            )
+        job.result = summary_text
+        job.progress = 100
+        job.status = SummaryJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("Summary job %s failed", job_id)
+        ERRORS.inc('job')
+        job.error = str(e)
+        job.status = SummaryJob.STATUS_FAILED
+
+    # Leave the job alone if it timed out and another worker claimed it since
+    finished = SummaryJob.objects.filter(pk=job.pk, started_at=job.started_at).update(
+        summary=job.summary,
+        result=job.result,
+        error=job.error,
+        status=job.status,
+        progress=job.progress,
+        truncated=job.truncated,
+        finished_at=timezone.now(),
+    )
+    # Until then a worker that claims the job again still needs the file
+    if finished and job.source_file and os.path.exists(job.source_file):
+        os.remove(job.source_file)
@@ -0,0 +1,141 @@
+"""Language identification and per-language summarizer routes.
+
+Languages are told apart by their character n-gram profiles (Cavnar and
+Trenkle's out-of-place distance), built on first use from the short
+samples below, so detection needs no model, download or network. Only the
+start of a text is looked at, and results are cached.
+"""
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+
+NON_LETTER_RE = re.compile(r'[\W\d_]+')
+
+# n-grams of 1 to MAX_NGRAM characters; the PROFILE_SIZE most frequent ones
+# make up a profile
+MAX_NGRAM = 3
+PROFILE_SIZE = 300
+# Characters of a text that are looked at, and letters needed for a guess
+SAMPLE_CHARS = 1000
+MIN_LETTERS = 20
+
+LANGUAGE_SAMPLES = {
+    'en': (
+        "The city council met on Tuesday to discuss the new budget for the coming year. "
+        "Most of the members agreed that more money should be spent on public transport, "
+        "schools and the health service, while some of them argued that taxes were already "
+        "too high. After a long debate, which lasted well into the evening, the proposal was "
+        "accepted with a small majority. The mayor said that the decision would help the "
+        "people who live in the poorer parts of the city and that the work on the new roads "
+        "could start in the spring. Critics, however, pointed out that there was still no "
+        "clear plan for how the money would be raised and when the projects would be finished."
+    ),
+    'tr': (
+        "Belediye meclisi salı günü gelecek yılın bütçesini görüşmek için toplandı. Üyelerin "
+        "çoğu toplu taşımaya, okullara ve sağlık hizmetlerine daha fazla para ayrılması "
+        "gerektiği konusunda anlaştı, ancak bazıları vergilerin zaten çok yüksek olduğunu "
+        "söyledi. Akşama kadar süren uzun bir tartışmanın ardından öneri küçük bir çoğunlukla "
+        "kabul edildi. Belediye başkanı, kararın şehrin yoksul bölgelerinde yaşayan insanlara "
+        "yardımcı olacağını ve yeni yolların yapımına ilkbaharda başlanabileceğini belirtti. "
+        "Eleştirmenler ise paranın nasıl bulunacağına ve projelerin ne zaman bitirileceğine "
+        "dair hâlâ açık bir plan olmadığını vurguladılar."
+    ),
+    'de': (
+        "Der Stadtrat traf sich am Dienstag, um über den neuen Haushalt für das kommende Jahr "
+        "zu sprechen. Die meisten Mitglieder waren sich einig, dass mehr Geld für den "
+        "öffentlichen Verkehr, die Schulen und das Gesundheitswesen ausgegeben werden sollte, "
+        "während einige von ihnen meinten, die Steuern seien schon jetzt zu hoch. Nach einer "
+        "langen Debatte, die bis in den Abend dauerte, wurde der Vorschlag mit einer knappen "
+        "Mehrheit angenommen. Der Bürgermeister sagte, die Entscheidung werde den Menschen in "
+        "den ärmeren Stadtteilen helfen und die Arbeiten an den neuen Straßen könnten im "
+        "Frühling beginnen. Kritiker wiesen jedoch darauf hin, dass es noch keinen klaren Plan "
+        "gebe, wie das Geld aufgebracht werden solle."
+    ),
+    'fr': (
+        "Le conseil municipal s'est réuni mardi pour discuter du nouveau budget de l'année "
+        "prochaine. La plupart des membres étaient d'accord pour dire qu'il fallait consacrer "
+        "plus d'argent aux transports publics, aux écoles et aux services de santé, tandis que "
+        "certains estimaient que les impôts étaient déjà trop élevés. Après un long débat qui "
+        "a duré jusque dans la soirée, la proposition a été adoptée à une faible majorité. Le "
+        "maire a déclaré que cette décision aiderait les habitants des quartiers les plus "
+        "pauvres de la ville et que les travaux sur les nouvelles routes pourraient commencer "
+        "au printemps. Les critiques ont toutefois souligné qu'il n'existait toujours pas de "
+        "plan clair pour savoir comment l'argent serait trouvé."
+    ),
+    'es': (
+        "El ayuntamiento se reunió el martes para hablar del nuevo presupuesto para el próximo "
+        "año. La mayoría de los miembros estuvo de acuerdo en que se debería gastar más dinero "
+        "en el transporte público, las escuelas y el servicio de salud, mientras que algunos "
+        "de ellos dijeron que los impuestos ya eran demasiado altos. Después de un largo debate "
+        "que duró hasta la noche, la propuesta fue aprobada por una pequeña mayoría. El alcalde "
+        "dijo que la decisión ayudaría a las personas que viven en los barrios más pobres de la "
+        "ciudad y que las obras de las nuevas carreteras podrían comenzar en la primavera. Los "
+        "críticos, sin embargo, señalaron que todavía no había un plan claro sobre cómo se "
+        "conseguiría el dinero."
+    ),
+}
+
+# Languages without a route use the primary model without a source
+# language, English sentence splitting and the combined English and Turkish
+# stop words
+DEFAULT_ROUTE = {'src_lang': None, 'stop_words': None, 'sentence_tokenizer': 'english'}
+
+_lock = threading.Lock()
+_profiles = None
+
+
+def ngram_ranks(text):
+    """Rank the character n-grams of a text by frequency: n-gram -> rank."""
+    counts = Counter()
+    for word in NON_LETTER_RE.sub(' ', text.lower()).split():
+        padded = f' {word} '
+        for n in range(1, MAX_NGRAM + 1):
+            for start in range(len(padded) - n + 1):
+                counts[padded[start:start + n]] += 1
+    del counts[' ']
+    return {ngram: rank for rank, (ngram, _) in enumerate(counts.most_common(PROFILE_SIZE))}
+
+
+def get_profiles():
+    """Return the n-gram profile of every known language, built once."""
+    global _profiles
+    if _profiles is None:
+        with _lock:
+            if _profiles is None:
+                _profiles = {language: ngram_ranks(sample) for language, sample in LANGUAGE_SAMPLES.items()}
+    return _profiles
+
+
+@lru_cache(maxsize=1024)
+def _detect(sample):
+    if len(NON_LETTER_RE.sub('', sample)) < MIN_LETTERS:
+        return None
+    ranks = ngram_ranks(sample)
+
+    def distance(profile):
+        # Out-of-place measure; n-grams missing from the profile cost the most
+        return sum(abs(rank - profile.get(ngram, PROFILE_SIZE)) for ngram, rank in ranks.items())
+
+    return min(get_profiles().items(), key=lambda item: distance(item[1]))[0]
+
+
+def detect_language(text):
+    """Return the ISO 639-1 code of the language of a text, or None if it is too short to tell."""
+    if not settings.SUMMARIZER_DETECT_LANGUAGE:
+        return None
+    return _detect(text[:SAMPLE_CHARS])
+
+
+def get_language_route(language):
+    """Return the summarizer configuration of a language.
+
+    Routes are set per language code in ``SUMMARIZER_LANGUAGES``: the model,
+    its ``src_lang`` code and the NLTK stop word and sentence tokenizer
+    languages. A language without a route, or None, gets the default route.
+    """
+    route = dict(DEFAULT_ROUTE, model=settings.SUMMARIZER_MODEL_NAME)
+    route.update(settings.SUMMARIZER_LANGUAGES.get(language, {}))
+    return route
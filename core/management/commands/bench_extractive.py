@@ -0,0 +1,81 @@
+import re
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from nltk.tokenize import word_tokenize
+
+from core.benchmarks import synthetic_sentences
+from core.extractive import summarize_sentences, summarize_text_textrank
+from core.resources import get_stop_words
+
+
+def legacy_summarize(sentences, text, summary_length='medium'):
+    """The dict-based scorer summarize_text_nltk used before, kept for comparison."""
+    text = re.sub(r'[^\w\s]', '', text.lower())
+    words = word_tokenize(text)
+    stop_words = get_stop_words()
+    words = [word for word in words if word not in stop_words]
+
+    word_freq = defaultdict(int)
+    for word in words:
+        word_freq[word] += 1
+
+    sentence_scores = defaultdict(int)
+    for sentence in sentences:
+        for word in word_tokenize(sentence.lower()):
+            if word in word_freq:
+                sentence_scores[sentence] += word_freq[word]
+
+    num_sentences = len(sentences)
+    if summary_length == 'short':
+        num_summary = max(1, num_sentences // 4)
+    elif summary_length == 'long':
+        num_summary = max(2, num_sentences // 2)
+    else:
+        num_summary = max(1, num_sentences // 3)
+
+    summary_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:num_summary]
+    summary_sentences = [s[0] for s in summary_sentences]
+    summary_sentences.sort(key=lambda x: sentences.index(x))
+    return summary_sentences
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the vectorized extractive summarizer against the previous implementation, and TextRank'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Document sizes in sentences')
+        parser.add_argument('--language', choices=['en', 'tr'], default='en')
+        parser.add_argument('--legacy-max', type=int, default=100000,
+                            help='Skip the previous implementation above this many sentences')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'sentences':>10} {'legacy s':>10} {'vectorized s':>13} {'speedup':>8} {'same':>5} {'textrank s':>11}"
+        )
+        for size in options['sizes']:
+            sentences = synthetic_sentences(size, options['language'])
+            text = ' '.join(sentences)
+
+            started = time.perf_counter()
+            selected = summarize_sentences(sentences)
+            vectorized = time.perf_counter() - started
+
+            started = time.perf_counter()
+            summarize_text_textrank(text)
+            textrank = time.perf_counter() - started
+
+            if size > options['legacy_max']:
+                self.stdout.write(f"{size:>10} {'skipped':>10} {vectorized:>13.3f} {'-':>8} {'-':>5} {textrank:>11.3f}")
+                continue
+
+            started = time.perf_counter()
+            expected = legacy_summarize(sentences, text)
+            legacy = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{size:>10} {legacy:>10.3f} {vectorized:>13.3f} {legacy / vectorized:>7.1f}x "
+                f"{'yes' if selected == expected else 'no':>5} {textrank:>11.3f}"
+            )
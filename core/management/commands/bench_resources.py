@@ -0,0 +1,64 @@
+import re
+import timeit
+from string import punctuation
+
+import nltk
+from django.core.management.base import BaseCommand
+from nltk.corpus import stopwords
+
+from core import resources
+from core.benchmarks import CORPUS
+from core.extractive import summarize_sentences
+
+
+def legacy_get_stop_words():
+    """How get_stop_words built the stop word set on every call before."""
+    stop_words = set(stopwords.words('english'))
+    stop_words.update(resources.TURKISH_STOP_WORDS)
+    stop_words.update(punctuation)
+    return stop_words
+
+
+def legacy_prepare(text):
+    """The per-request preprocessing of the NLTK fallback before the registry."""
+    text = re.sub(r'\s+', ' ', text).strip()
+    sentences = nltk.sent_tokenize(text)
+    return sentences, legacy_get_stop_words()
+
+
+def cached_prepare(text):
+    text = resources.normalize_whitespace(text)
+    return resources.sent_tokenize(text), resources.get_stop_words()
+
+
+class Command(BaseCommand):
+    help = 'Measures the per-request preprocessing overhead the resource registry removes from the NLTK fallback'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=200, help='Calls per measurement')
+
+    def handle(self, *args, **options):
+        number = options['number']
+        texts = [entry['text'] for entry in CORPUS]
+        resources.preload()
+
+        def per_call(function):
+            seconds = timeit.timeit(lambda: [function(text) for text in texts], number=number)
+            return seconds / (number * len(texts)) * 1e6
+
+        def summarize(prepare):
+            def run(text):
+                sentences, stop_words = prepare(text)
+                return summarize_sentences(sentences, stop_words=stop_words)
+            return run
+
+        rows = [
+            ('stop words', per_call(lambda text: legacy_get_stop_words()),
+             per_call(lambda text: resources.get_stop_words())),
+            ('preprocessing', per_call(legacy_prepare), per_call(cached_prepare)),
+            ('fallback summary', per_call(summarize(legacy_prepare)), per_call(summarize(cached_prepare))),
+        ]
+
+        self.stdout.write(f"{'per request':<18} {'before us':>10} {'cached us':>10} {'saved us':>9}")
+        for name, before, after in rows:
+            self.stdout.write(f'{name:<18} {before:>10.1f} {after:>10.1f} {before - after:>9.1f}')
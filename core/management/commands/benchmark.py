@@ -0,0 +1,211 @@
+import json
+import platform
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core.benchmarks import install_stub_model, read_memory, synthetic_text
+
+SCENARIOS = ['summarize_text', 'summarize_text_fallback', 'summarize_text_nltk', 'home', 'api']
+METRICS = ['p50', 'p95', 'p99', 'throughput']
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks summarization latency, throughput and memory on a synthetic corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--sentences', type=int, nargs='+', default=[5, 50, 500],
+                            help='Document lengths in sentences')
+        parser.add_argument('--languages', nargs='+', choices=['en', 'tr'], default=['en', 'tr'])
+        parser.add_argument('--requests', type=int, default=20, help='Timed runs per case')
+        parser.add_argument('--concurrency', type=int, default=1, help='Runs in flight at once')
+        parser.add_argument('--stub-model', action='store_true',
+                            help='Replace the model with a local stub so the benchmark runs offline')
+        parser.add_argument('--stub-ms-per-token', type=float, default=0.05)
+        parser.add_argument('--output', help='Write the results as a JSON baseline to this file')
+        parser.add_argument('--compare', help='Compare the results with a JSON baseline')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Percent change reported as a regression when comparing')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        from core import inference
+        from core.admission import admission
+
+        started = time.perf_counter()
+        if options['stub_model']:
+            install_stub_model(options['stub_ms_per_token'])
+        elif not inference.load_model(wait=True):
+            raise CommandError(
+                f"Model could not be loaded: {inference.model_state['error']}. Use --stub-model to run offline."
+            )
+        load_seconds = time.perf_counter() - started
+
+        # Measure the summarizer, not admission control: nothing is rate
+        # limited and every concurrent run gets a generation slot
+        admission.guest_capacity = admission.user_capacity = float('inf')
+        admission.slots = threading.BoundedSemaphore(max(options['concurrency'], 1))
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            cases = self.run_cases(inference, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'model': 'stub' if options['stub_model'] else inference.MODEL_NAME,
+                'precision': inference.model_state['precision'],
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+            },
+            'model_load_seconds': round(load_seconds, 3),
+            'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+            'cases': cases,
+        }
+        self.report(results)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(baseline, results, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} metrics regressed by more than {options["threshold"]:.0f}%')
+
+    def run_cases(self, inference, options):
+        from core.extractive import summarize_text_nltk
+        from core.models import ChunkSummary
+
+        client = Client()
+        addresses = iter(range(1, sys.maxsize))
+        address_lock = threading.Lock()
+
+        def remote_addr():
+            # Every request comes from its own guest, like real traffic
+            with address_lock:
+                n = next(addresses)
+            return f'10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}'
+
+        def post(path, data):
+            response = client.post(path, data, REMOTE_ADDR=remote_addr())
+            if response.status_code != 200:
+                raise CommandError(f'{path} answered {response.status_code}')
+
+        scenarios = {
+            'summarize_text': lambda text: inference.summarize_text(text),
+            'summarize_text_fallback': lambda text: inference.summarize_text(text, engine='nltk'),
+            'summarize_text_nltk': lambda text: summarize_text_nltk(text),
+            'home': lambda text: post('/', {'text': text}),
+            'api': lambda text: post('/api/summarize/', {'text': text}),
+        }
+
+        cases = []
+        for scenario in options['scenarios']:
+            for language in options['languages']:
+                for sentences in options['sentences']:
+                    # A different document per run, an empty cache and no stored
+                    # partial summaries, so that no run reuses an earlier case's
+                    # work (every case summarizes the same texts)
+                    texts = [synthetic_text(sentences, language, seed) for seed in range(options['requests'] + 1)]
+                    inference.summary_cache.clear()
+                    ChunkSummary.objects.all().delete()
+                    case = self.measure(scenarios[scenario], texts, options['concurrency'])
+                    case.update(scenario=scenario, language=language, sentences=sentences)
+                    cases.append(case)
+                    self.stdout.write(
+                        f"{scenario:<24} {language} {sentences:>6} sentences: "
+                        f"p50 {case['p50'] * 1000:.1f} ms, p95 {case['p95'] * 1000:.1f} ms"
+                    )
+        return cases
+
+    def measure(self, run, texts, concurrency):
+        """Run the first text once to warm up, then time the others."""
+        def timed(text):
+            started = time.perf_counter()
+            run(text)
+            return time.perf_counter() - started
+
+        timed(texts[0])
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(timed, texts[1:]))
+        elapsed = time.perf_counter() - started
+        requests = len(latencies)
+
+        return {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'throughput': requests / elapsed,
+            'rss_mb': round(read_memory()['rss'], 1) if sys.platform.startswith('linux') else None,
+        }
+
+    def report(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'scenario':<24} {'lang':<4} {'sents':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+            f"{'req/s':>8} {'RSS MB':>8}"
+        )
+        for case in results['cases']:
+            self.stdout.write(
+                f"{case['scenario']:<24} {case['language']:<4} {case['sentences']:>6} "
+                f"{case['p50'] * 1000:>9.1f} {case['p95'] * 1000:>9.1f} {case['p99'] * 1000:>9.1f} "
+                f"{case['throughput']:>8.1f} {case['rss_mb'] or 0:>8.0f}"
+            )
+        self.stdout.write(
+            f"\nModel load: {results['model_load_seconds']:.1f} s, peak RSS: {results['peak_rss_mb']:.0f} MB"
+        )
+
+    def compare(self, baseline, results, threshold):
+        """Print the change of every metric against a baseline; return the number of regressions."""
+        previous = {(c['scenario'], c['language'], c['sentences']): c for c in baseline['cases']}
+        regressions = 0
+        self.stdout.write('\nChange against the baseline (positive is slower):')
+        for case in results['cases']:
+            old = previous.get((case['scenario'], case['language'], case['sentences']))
+            if old is None:
+                continue
+            changes = []
+            for metric in METRICS:
+                if not old[metric]:
+                    continue
+                change = (case[metric] - old[metric]) / old[metric] * 100
+                # More throughput is better, lower latency is better
+                slower = -change if metric == 'throughput' else change
+                if slower > threshold:
+                    regressions += 1
+                    changes.append(self.style.ERROR(f'{metric} {slower:+.0f}%'))
+                else:
+                    changes.append(f'{metric} {slower:+.0f}%')
+            self.stdout.write(
+                f"  {case['scenario']:<24} {case['language']:<4} {case['sentences']:>6}  " + '  '.join(changes)
+            )
+        for name in ('model_load_seconds', 'peak_rss_mb'):
+            if baseline.get(name):
+                change = (results[name] - baseline[name]) / baseline[name] * 100
+                self.stdout.write(f'  {name}: {baseline[name]} -> {results[name]} ({change:+.0f}%)')
+        return regressions
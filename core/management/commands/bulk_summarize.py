@@ -0,0 +1,260 @@
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+TEXT_EXTENSIONS = ('.txt', '.md')
+
+
+def iter_records(paths, text_field='text', id_field='id'):
+    """Lazily yield ``(record_id, text, path)`` for every input record.
+
+    Text files are one record each and are yielded with their path, to be
+    read by the worker; JSONL files give one record per line, with the text
+    inline. A JSONL line that can't be parsed is yielded with neither.
+    Directories are walked in sorted order, so that the records always come
+    in the same order and a checkpoint can count them.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.endswith(TEXT_EXTENSIONS + ('.jsonl',)):
+                        yield from iter_records([os.path.join(root, name)], text_field, id_field)
+        elif path.endswith('.jsonl'):
+            with open(path, encoding='utf-8') as f:
+                for lineno, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                        yield str(record.get(id_field, f'{path}:{lineno}')), record.get(text_field) or '', None
+                    except (ValueError, AttributeError):
+                        yield f'{path}:{lineno}', None, None
+        else:
+            yield path, None, path
+
+
+def init_worker(engine, torch_threads):
+    """Set up a pool process: load the model once and size its torch threads."""
+    import django
+
+    # Needed when processes are spawned rather than forked
+    django.setup()
+    if engine == 'transformer':
+        import torch
+
+        from core.inference import load_model
+
+        torch.set_num_threads(torch_threads)
+        load_model(wait=True)
+
+
+def summarize_records(records, summary_length, bullet_points, engine, keep_text, user_id=None):
+    """Summarize a batch of records in a pool process; return one result dict per record.
+
+    Near-duplicates of the summaries of the user ``user_id`` are reused.
+    """
+    from core.inference import summarize_texts
+
+    results = []
+    documents = []
+    for record_id, text, path in records:
+        result = {'id': record_id}
+        if path is not None:
+            try:
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    text = f.read()
+            except OSError as e:
+                result['error'] = str(e)
+        elif text is None:
+            result['error'] = 'invalid JSON'
+        if 'error' not in result and not text.strip():
+            result['error'] = 'empty text'
+        if 'error' not in result:
+            result['text'] = text
+            documents.append(result)
+        results.append(result)
+
+    summaries = summarize_texts([{
+        'text': result['text'],
+        'summary_length': summary_length,
+        'bullet_points': bullet_points,
+        'engine': engine,
+    } for result in documents], user_id, wait=True)
+    for result, (summary, stats) in zip(documents, summaries):
+        if not keep_text:
+            del result['text']
+        if summary.strip():
+            result.update(summary=summary, engine=stats.get('engine'), language=stats.get('language'))
+        else:
+            result['error'] = 'empty summary'
+    return results
+
+
+class Command(BaseCommand):
+    """Summarize an archive offline.
+
+    Records are read lazily and summarized in batches by a pool of
+    processes that each load the model once; at most two batches per
+    process are in flight, so memory stays bounded whatever the archive
+    size. Results are written in input order and a checkpoint records how
+    many are done. With ``--resume`` an interrupted run continues from it,
+    first cutting the JSONL output back to the checkpoint; with ``--user``
+    the batch that was being saved may be saved twice.
+    """
+
+    help = 'Summarizes text files and JSONL dumps in a process pool, resumable from a checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Text files (.txt, .md), JSONL files or directories of them')
+        sink = parser.add_mutually_exclusive_group(required=True)
+        sink.add_argument('--output', help='Append the results to this JSONL file')
+        sink.add_argument('--user', help='Save the summaries as Summary rows of this user')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Pool processes')
+        parser.add_argument('--batch-size', type=int, default=settings.SUMMARIZER_BATCH_SIZE,
+                            help='Records summarized together by a worker')
+        parser.add_argument('--summary-length', choices=['short', 'medium', 'long'], default='medium')
+        parser.add_argument('--bullet-points', action='store_true')
+        parser.add_argument('--engine', choices=['transformer', 'nltk', 'textrank'], default='transformer')
+        parser.add_argument('--text-field', default='text', help='Text field of JSONL records')
+        parser.add_argument('--id-field', default='id', help='Id field of JSONL records')
+        parser.add_argument('--checkpoint', help='Progress file, by default next to the output')
+        parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint')
+
+    def handle(self, *args, **options):
+        for path in options['paths']:
+            if not os.path.exists(path):
+                raise CommandError(f'{path} does not exist')
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist")
+
+        inputs = [os.path.abspath(path) for path in options['paths']]
+        checkpoint_path = options['checkpoint'] or f"{options['output'] or 'bulk_summarize'}.checkpoint"
+        # A new run appends to an existing output file
+        output_bytes = os.path.getsize(options['output']) if options['output'] and os.path.exists(options['output']) else 0
+        checkpoint = {'inputs': inputs, 'records': 0, 'output_bytes': output_bytes}
+        if os.path.exists(checkpoint_path):
+            if not options['resume']:
+                raise CommandError(f'{checkpoint_path} exists: pass --resume to continue, or delete it')
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            if checkpoint['inputs'] != inputs:
+                raise CommandError(f'{checkpoint_path} belongs to a run over other inputs')
+            self.stdout.write(f"Resuming after {checkpoint['records']} records")
+
+        output = None
+        if options['output']:
+            output = open(options['output'], 'ab')
+            # Drop whatever was written after the last checkpoint
+            output.truncate(checkpoint['output_bytes'])
+            output.seek(checkpoint['output_bytes'])
+
+        records = islice(iter_records(options['paths'], options['text_field'], options['id_field']),
+                         checkpoint['records'], None)
+        workers = max(1, options['workers'])
+        task_args = (
+            options['summary_length'], options['bullet_points'], options['engine'], user is not None,
+            user.id if user is not None else None,
+        )
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        started = time.monotonic()
+        done = failed = 0
+        pool = get_context().Pool(
+            workers, initializer=init_worker,
+            initargs=(options['engine'], max(1, (os.cpu_count() or 1) // workers)),
+        )
+        try:
+            # Keep a bounded number of batches in flight; results are written
+            # in input order, so the checkpoint is a count of records
+            pending = deque()
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if batch:
+                    pending.append(pool.apply_async(summarize_records, (batch, *task_args)))
+                if pending and (not batch or len(pending) >= workers * 2):
+                    results = pending.popleft().get()
+                    self.write_results(results, output, user, options)
+                    done += len(results)
+                    failed += sum('error' in result for result in results)
+                    checkpoint['records'] += len(results)
+                    if output:
+                        checkpoint['output_bytes'] = output.tell()
+                    self.save_checkpoint(checkpoint_path, checkpoint)
+                    rate = done / (time.monotonic() - started)
+                    self.stdout.write(f'{checkpoint["records"]} records ({failed} failed), {rate:.1f}/s')
+                elif not batch:
+                    break
+            pool.close()
+        except KeyboardInterrupt:
+            pool.terminate()
+            raise CommandError(f"Interrupted after {checkpoint['records']} records: run again with --resume")
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            if output:
+                output.close()
+
+        # Never saved when the inputs held no records
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        self.stdout.write(self.style.SUCCESS(f'Summarized {done - failed} of {done} records'))
+
+    def write_results(self, results, output, user, options):
+        """Append a batch of results to the JSONL output or save them as Summary rows."""
+        if output:
+            output.write(b''.join(
+                json.dumps(result, ensure_ascii=False).encode() + b'\n' for result in results
+            ))
+            output.flush()
+            os.fsync(output.fileno())
+            return
+
+        from core.dedup import index_summaries
+        from core.inference import summary_origin
+        from core.models import Summary
+
+        summaries = [
+            Summary(
+                user=user,
+                original_text=result['text'],
+                summary_text=result['summary'],
+                bullet_points=options['bullet_points'],
+                summary_length=options['summary_length'],
+                **summary_origin(result)
+            )
+            for result in results if 'summary' in result
+        ]
+        # bulk_create skips save(), which fills the preview and compresses the text
+        for summary in summaries:
+            summary.prepare_text()
+        Summary.objects.bulk_create(summaries, batch_size=500)
+        if settings.SUMMARIZER_DEDUP:
+            index_summaries(summaries)
+        for result in results:
+            if 'error' in result:
+                self.stderr.write(f"{result['id']}: {result['error']}")
+
+    def save_checkpoint(self, path, checkpoint):
+        """Replace the checkpoint atomically, so an interruption leaves the old or the new one."""
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,78 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from core.models import GuestUsage, GuestUsageDaily
+
+
+def compact_batch(cutoff, batch_size):
+    """Roll one batch of GuestUsage rows older than ``cutoff`` into daily counts.
+
+    The counts are added and the rows deleted in one transaction, so an
+    interrupted run never counts a row twice. Returns the number of rows
+    compacted.
+    """
+    with transaction.atomic():
+        ids = list(
+            GuestUsage.objects.filter(timestamp__lt=cutoff)
+            .order_by('timestamp')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        counts = Counter({
+            (row['ip_address'], row['day']): row['count']
+            for row in GuestUsage.objects.filter(id__in=ids)
+            .annotate(day=TruncDate('timestamp'))
+            .values('ip_address', 'day')
+            .annotate(count=Count('id'))
+        })
+
+        existing = (
+            GuestUsageDaily.objects.select_for_update()
+            .filter(ip_address__in={ip for ip, _ in counts}, day__in={day for _, day in counts})
+            .values_list('id', 'ip_address', 'day')
+        )
+        for daily_id, ip_address, day in existing:
+            count = counts.pop((ip_address, day), None)
+            if count:
+                GuestUsageDaily.objects.filter(id=daily_id).update(count=F('count') + count)
+        GuestUsageDaily.objects.bulk_create([
+            GuestUsageDaily(ip_address=ip_address, day=day, count=count)
+            for (ip_address, day), count in counts.items()
+        ])
+
+        GuestUsage.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+class Command(BaseCommand):
+    help = 'Rolls old guest usage rows up into per-IP daily counts and deletes them in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.GUEST_USAGE_RETENTION_DAYS,
+                            help='Keep the individual rows of this many days')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows compacted per transaction')
+
+    def handle(self, *args, **options):
+        # Only whole days are compacted, so a day is never split between
+        # its daily count and individual rows
+        today = timezone.localdate()
+        cutoff = timezone.make_aware(datetime.combine(today - timedelta(days=options['days']), time.min))
+
+        total = 0
+        while True:
+            compacted = compact_batch(cutoff, options['batch_size'])
+            if not compacted:
+                break
+            total += compacted
+            self.stdout.write(f'Compacted {total} rows...')
+
+        self.stdout.write(self.style.SUCCESS(f'Compacted {total} guest usage rows older than {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,119 @@
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmarks import CORPUS, read_memory, rouge_scores
+
+MODES = ['fp32', 'bf16', 'int8']
+
+
+def mean(values):
+    values = list(values)
+    return sum(values) / len(values) if values else 0.0
+
+
+class Command(BaseCommand):
+    help = 'Compares latency, memory and ROUGE of the model inference precision modes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per corpus text')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--run-mode', choices=MODES, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['run_mode']:
+            # Child process: measure a single mode and report it as JSON
+            result = self.run_mode(options['run_mode'], options['repeat'])
+            self.stdout.write(json.dumps(result))
+            return
+
+        # Every mode runs in its own process so memory numbers don't mix
+        results = {}
+        for mode in options['modes']:
+            self.stdout.write(f'Running {mode}...')
+            process = subprocess.run(
+                [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'compare_precision',
+                 '--run-mode', mode, '--repeat', str(options['repeat'])],
+                capture_output=True, text=True,
+            )
+            if process.returncode != 0:
+                raise CommandError(f'{mode} run failed:\n{process.stderr}')
+            results[mode] = json.loads(process.stdout.strip().splitlines()[-1])
+
+        baseline = results.get('fp32')
+        for mode, result in results.items():
+            for item in result['items']:
+                reference = next(c['reference'] for c in CORPUS if c['id'] == item['id'])
+                item['rouge'] = rouge_scores(item['summary'], reference)
+                if baseline:
+                    fp32_summary = next(i['summary'] for i in baseline['items'] if i['id'] == item['id'])
+                    item['agreement'] = rouge_scores(item['summary'], fp32_summary)
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def run_mode(self, mode, repeat):
+        from core import inference
+
+        with override_settings(SUMMARIZER_PRECISION=mode, SUMMARIZER_BATCHING=False):
+            started = time.perf_counter()
+            if not inference.load_model(wait=True):
+                raise CommandError(f"Model could not be loaded: {inference.model_state['error']}")
+            load_seconds = time.perf_counter() - started
+            memory_after_load = read_memory()['rss']
+
+            items = []
+            for entry in CORPUS:
+                timings = []
+                for _ in range(repeat):
+                    # Time generation, not the summary cache
+                    inference.summary_cache.clear()
+                    stats = {}
+                    started = time.perf_counter()
+                    summary = inference.summarize_text(entry['text'], stats=stats)
+                    timings.append(time.perf_counter() - started)
+                    if stats.get('engine') != 'transformer':
+                        raise CommandError(f"{entry['id']} fell back to {stats.get('engine')}")
+                items.append({
+                    'id': entry['id'],
+                    'summary': summary,
+                    'latency': sorted(timings)[len(timings) // 2],
+                })
+
+        return {
+            'precision': inference.model_state['precision'],
+            'load_seconds': load_seconds,
+            'rss_after_load': memory_after_load,
+            'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            'items': items,
+        }
+
+    def report(self, results):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'mode':<6} {'actual':<7} {'load s':>7} {'RSS MB':>8} {'peak MB':>8} "
+            f"{'median s':>9} {'R-1':>6} {'R-2':>6} {'R-L':>6} {'vs fp32 R-L':>12}"
+        )
+        for mode, result in results.items():
+            items = result['items']
+            agreement = mean(i['agreement']['rougeL'] for i in items if 'agreement' in i)
+            self.stdout.write(
+                f"{mode:<6} {result['precision']:<7} {result['load_seconds']:>7.1f} "
+                f"{result['rss_after_load']:>8.0f} {result['peak_rss']:>8.0f} "
+                f"{mean(i['latency'] for i in items):>9.3f} "
+                f"{mean(i['rouge']['rouge1'] for i in items):>6.3f} "
+                f"{mean(i['rouge']['rouge2'] for i in items):>6.3f} "
+                f"{mean(i['rouge']['rougeL'] for i in items):>6.3f} "
+                f"{agreement:>12.3f}"
+            )
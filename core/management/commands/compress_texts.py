@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.compression import compress_rows, recompress_blobs
+from core.models import Summary, TextBlob
+
+
+class Command(BaseCommand):
+    help = ('Compresses the long original texts still stored in full, recompresses texts stored with another '
+            'codec and deletes unused compressed texts')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Summaries compressed per transaction')
+        parser.add_argument('--min-chars', type=int, default=settings.SUMMARIZER_COMPRESS_MIN_CHARS,
+                            help='Compress texts of at least this many characters')
+
+    def handle(self, *args, **options):
+        total = 0
+        for compressed in compress_rows(Summary, TextBlob, settings.SUMMARIZER_TEXT_CODEC,
+                                        options['min_chars'], options['batch_size']):
+            total += compressed
+            self.stdout.write(f'Compressed {total} texts...')
+
+        recompressed = 0
+        for count in recompress_blobs(TextBlob, settings.SUMMARIZER_TEXT_CODEC, options['batch_size']):
+            recompressed += count
+            self.stdout.write(f'Recompressed {recompressed} texts...')
+
+        # Texts of deleted summaries; a summary saved meanwhile may have
+        # picked one of them up again, which PROTECT refuses to delete
+        deleted = 0
+        while True:
+            ids = list(
+                TextBlob.objects.filter(summaries__isnull=True)
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            deleted += TextBlob.objects.filter(id__in=ids, summaries__isnull=True).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Compressed {total} texts, recompressed {recompressed}, deleted {deleted} unused ones'
+        ))
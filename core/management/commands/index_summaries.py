@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core.dedup import index_summaries
+from core.models import Summary, SummaryBand
+
+
+class Command(BaseCommand):
+    help = ('Adds the model summaries of users saved before the near-duplicate lookup was enabled to its index, '
+            'in batches')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Summaries indexed per batch')
+        parser.add_argument('--reindex', action='store_true',
+                            help='Drop the index and the stored signatures and index every summary again')
+
+    def handle(self, *args, **options):
+        if options['reindex']:
+            SummaryBand.objects.all().delete()
+            Summary.objects.update(minhash=None)
+
+        total = 0
+        last_id = 0
+        while True:
+            # Walk the primary key so every batch is an index range scan. Only
+            # model summaries of users can be reused; rows saved before the
+            # engine was recorded (engine '') can never match and are skipped.
+            batch = list(
+                Summary.objects.filter(id__gt=last_id, minhash__isnull=True, engine='transformer', user__isnull=False)
+                .select_related('original_blob')
+                .order_by('id')
+                .only('id', 'original_text', 'minhash', 'original_blob')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            index_summaries(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f'Indexed {total} summaries...')
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} summaries'))
@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imported only once a summary is generated or the model is loaded
+HEAVY_MODULES = ['torch', 'transformers', 'nltk', 'numpy', 'scipy']
+
+IMPORT_SCRIPT = '''
+import os, resource, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'summaralze.settings')
+import django
+django.setup()
+for module in sys.argv[1:]:
+    __import__(module)
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+def measure_imports(modules):
+    """Import Django and ``modules`` in a fresh interpreter with ``-X importtime``.
+
+    Returns the per-module timings as (name, self us, cumulative us) rows,
+    the peak RSS in MB and the set of all modules that were imported.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', IMPORT_SCRIPT, *modules],
+        capture_output=True, text=True, cwd=settings.BASE_DIR,
+    )
+    if process.returncode != 0:
+        raise CommandError(f'Import failed:\n{process.stderr}')
+
+    timings = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented below the one that triggered them
+        timings.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+
+    rss, loaded = process.stdout.splitlines()[-2:]
+    return timings, int(rss) / 1024, set(loaded.split())
+
+
+class Command(BaseCommand):
+    help = 'Reports the import time of the web app and fails if it pulls in the ML stack'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', default=['core.urls', 'core.admin'],
+                            help='Modules to import after django.setup()')
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+        parser.add_argument('--budget-ms', type=float,
+                            help='Fail if importing everything takes longer than this')
+
+    def handle(self, *args, **options):
+        timings, rss, loaded = measure_imports(options['modules'])
+
+        # Top-level imports (not indented) add up to the total
+        total_ms = sum(cumulative for name, _, cumulative in timings if not name.startswith(' ')) / 1000
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>8}  module")
+        for name, self_us, cumulative_us in sorted(timings, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f'{cumulative_us / 1000:>14.1f} {self_us / 1000:>8.1f}  {name.strip()}')
+        self.stdout.write(f'\nTotal import time: {total_ms:.0f} ms, peak RSS: {rss:.0f} MB')
+
+        heavy = [module for module in HEAVY_MODULES if module in loaded]
+        if heavy:
+            raise CommandError(f"Importing {', '.join(options['modules'])} loads {', '.join(heavy)}")
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(f"Import time {total_ms:.0f} ms is over the budget of {options['budget_ms']:.0f} ms")
+        self.stdout.write(self.style.SUCCESS(f"None of {', '.join(HEAVY_MODULES)} were imported"))
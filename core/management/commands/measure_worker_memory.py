@@ -0,0 +1,95 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.benchmarks import read_memory
+
+
+class Command(BaseCommand):
+    help = 'Measures resident memory per forked worker with a shared and a per-worker model'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help='Number of workers to fork')
+        parser.add_argument('--mode', choices=['shared', 'separate', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        if not sys.platform.startswith('linux'):
+            raise CommandError('Memory is read from /proc and can only be measured on Linux')
+
+        from core import inference
+
+        modes = ['separate', 'shared'] if options['mode'] == 'both' else [options['mode']]
+        results = {}
+        for mode in modes:
+            # The per-worker case must fork before the parent loads the model
+            if mode == 'shared' and not inference.share_model_before_fork():
+                raise CommandError(f"Model could not be loaded: {inference.model_state['error']}")
+            results[mode] = self.measure(inference, mode, options['workers'])
+
+        model_mb = max(memory['model'] for workers in results.values() for memory in workers)
+        self.stdout.write(f'Model parameters: {model_mb:.0f} MB')
+
+        for mode, workers in results.items():
+            self.stdout.write(f'\n{mode} model, {len(workers)} workers:')
+            for i, memory in enumerate(workers):
+                self.stdout.write(
+                    f"  worker {i}: rss {memory['rss']:.0f} MB, pss {memory['pss']:.0f} MB, "
+                    f"private {memory['private']:.0f} MB ({memory['private'] / model_mb:.1%} of model)"
+                )
+            extra = sum(memory['private'] for memory in workers) / len(workers)
+            self.stdout.write(self.style.SUCCESS(f'  memory per added worker: {extra:.0f} MB'))
+
+    def measure(self, inference, mode, count):
+        """Fork workers that each warm up the model and report their memory."""
+        connections.close_all()
+        workers = []
+        for _ in range(count):
+            report_r, report_w = os.pipe()
+            go_r, go_w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(report_r)
+                os.close(go_w)
+                status = 0
+                try:
+                    inference.configure_torch_threads()
+                    if mode == 'separate':
+                        inference.load_model(wait=True)
+                    else:
+                        inference.warm_up_model()
+                    # Measure only once every worker is up, so that
+                    # proportional set sizes account for all of them
+                    os.write(report_w, b'r')
+                    os.read(go_r, 1)
+                    memory = read_memory()
+                    memory['model'] = sum(
+                        p.numel() * p.element_size() for p in inference.model.parameters()
+                    ) / 1024 / 1024
+                    os.write(report_w, json.dumps(memory).encode())
+                except Exception:
+                    status = 1
+                finally:
+                    os._exit(status)
+            os.close(report_w)
+            os.close(go_r)
+            workers.append((pid, report_r, go_w))
+
+        for pid, report_r, go_w in workers:
+            if os.read(report_r, 1) != b'r':
+                raise CommandError(f'Worker {pid} failed to load the model')
+        for pid, report_r, go_w in workers:
+            os.write(go_w, b'g')
+            os.close(go_w)
+
+        results = []
+        for pid, report_r, go_w in workers:
+            with os.fdopen(report_r) as f:
+                data = f.read()
+            os.waitpid(pid, 0)
+            if not data:
+                raise CommandError(f'Worker {pid} failed before reporting its memory')
+            results.append(json.loads(data))
+        return results
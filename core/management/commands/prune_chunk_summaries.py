@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ChunkSummary
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored chunk summaries older than a number of days in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.SUMMARIZER_CHUNK_SUMMARY_DAYS,
+                            help='Keep the chunk summaries of this many days')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per query')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+
+        total = 0
+        while True:
+            ids = list(
+                ChunkSummary.objects.filter(created_at__lt=cutoff)
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            total += ChunkSummary.objects.filter(id__in=ids).delete()[0]
+            self.stdout.write(f'Deleted {total} rows...')
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} chunk summaries older than {options["days"]} days'))
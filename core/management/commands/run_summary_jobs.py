@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Runs pending summarization jobs submitted through the job API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Exit when no jobs are pending')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when idle')
+
+    def handle(self, *args, **options):
+        from core.inference import load_model
+
+        # Load the model up front instead of on the first job
+        load_model(wait=True)
+        self.stdout.write(self.style.SUCCESS('Waiting for summarization jobs...'))
+
+        while True:
+            close_old_connections()
+            job_id = claim_next_job()
+            if job_id is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            run_job(job_id, claimed=True)
+            self.stdout.write(f'Finished job {job_id}')
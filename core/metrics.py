@@ -0,0 +1,172 @@
+"""Counters, histograms and per-stage timers for the summarize path.
+
+Metrics are kept in memory per worker process and rendered in the
+Prometheus text format by the metrics view. Stage timers also collect the
+durations of the current request for the ``Server-Timing`` header (see
+``core.middleware``). With ``METRICS_ENABLED = False`` the timers are a
+shared no-op context manager and nothing is recorded.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import nullcontext
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+INPUT_WORD_BUCKETS = (100, 1000, 10000)
+SUMMARY_LENGTHS = ('short', 'medium', 'long')
+
+_registry = []
+
+# Stage durations of the request being handled, for Server-Timing
+request_timings = contextvars.ContextVar('request_timings', default=None)
+
+_disabled = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        if not settings.METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self.values = {}
+        _registry.append(self)
+
+    def observe(self, value, *labels):
+        if not settings.METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                counts = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for labels, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    extra = [('le', bound)]
+                    lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, extra)} {cumulative}')
+                lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {total}')
+                lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+def render_metrics():
+    """Render every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+STAGE_SECONDS = Histogram(
+    'summarizer_stage_seconds', 'Time spent in each stage of the summarize path', ['stage'],
+)
+SUMMARY_SECONDS = Histogram(
+    'summarizer_summary_seconds', 'Time to produce a summary, by input length in words',
+    ['engine', 'summary_length', 'input_words'],
+)
+SUMMARIES = Counter('summarizer_summaries_total', 'Summaries produced or served from the cache', ['engine', 'cached'])
+FALLBACKS = Counter(
+    'summarizer_fallbacks_total', 'Model requests answered by the extractive engine instead', ['reason'],
+)
+NEAR_DUPLICATES = Counter(
+    'summarizer_near_duplicates_total', 'Model requests answered with the stored summary of a near-duplicate text',
+)
+ERRORS = Counter('summarizer_errors_total', 'Errors on the summarize path', ['stage'])
+
+
+def record_stage(name, seconds):
+    """Record the duration of a stage that was timed by other means."""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+class _StageTimer:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_stage(self.name, time.perf_counter() - self.started)
+
+
+def stage(name):
+    """Time a stage of the summarize path: ``with stage('generate'): ...``."""
+    if not settings.METRICS_ENABLED:
+        return _disabled
+    return _StageTimer(name)
+
+
+def input_words_bucket(words):
+    """Label for the length of an input text in words, e.g. '<1000'."""
+    for bound in INPUT_WORD_BUCKETS:
+        if words < bound:
+            return f'<{bound}'
+    return f'>={INPUT_WORD_BUCKETS[-1]}'
+
+
+def observe_summary(text, summary_length, stats, seconds, words=None):
+    """Count a summary and record its latency by engine, input length and ``summary_length``.
+
+    ``words`` gives the input length when the text is not at hand as a whole.
+    """
+    if not settings.METRICS_ENABLED:
+        return
+    engine = stats.get('engine', 'none')
+    # summary_length comes from the request; keep the label set bounded
+    if summary_length not in SUMMARY_LENGTHS:
+        summary_length = 'other'
+    SUMMARIES.inc(engine, 'true' if stats.get('cached') else 'false')
+    SUMMARY_SECONDS.observe(seconds, engine, summary_length, input_words_bucket(len(text.split()) if words is None else words))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+
+from .metrics import request_timings
+
+
+class ServerTimingMiddleware:
+    """Report the stages timed while handling a request in a ``Server-Timing`` header.
+
+    Durations of a stage that ran more than once, such as generation over
+    several chunks, are added up. A streamed response only reports the
+    stages that ran before its first byte.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        timings = []
+        token = request_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            request_timings.reset(token)
+
+        if timings:
+            totals = {}
+            for name, seconds in timings:
+                totals[name] = totals.get(name, 0.0) + seconds
+            totals['total'] = time.perf_counter() - started
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={seconds * 1000:.1f}' for name, seconds in totals.items()
+            )
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:33
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+BATCH_SIZE = 500
+PREVIEW_WORDS = 50
+PREVIEW_LENGTH = 500
+
+
+def make_preview(text):
+    # A frozen copy of core.models.make_preview as of this migration
+    return Truncator(Truncator(text).words(PREVIEW_WORDS)).chars(PREVIEW_LENGTH)
+
+
+def backfill_previews(apps, schema_editor):
+    Summary = apps.get_model('core', 'Summary')
+    last_id = 0
+    while True:
+        batch = list(
+            Summary.objects.filter(id__gt=last_id, preview='')
+            .order_by('id')
+            .only('id', 'original_text')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for summary in batch:
+            summary.preview = make_preview(summary.original_text)
+        Summary.objects.bulk_update(batch, ['preview'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_summaryjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summary',
+            name='preview',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.RunPython(backfill_previews, migrations.RunPython.noop),
+    ]
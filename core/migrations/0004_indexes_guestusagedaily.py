@@ -0,0 +1,44 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_summary_preview'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestUsageDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField()),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Guest Usage (daily)',
+                'verbose_name_plural': 'Guest Usage (daily)',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='guestusage',
+            index=models.Index(fields=['ip_address', 'timestamp'], name='guestusage_ip_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guestusage',
+            index=models.Index(fields=['timestamp'], name='guestusage_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='summary',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='summary_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='guestusagedaily',
+            constraint=models.UniqueConstraint(fields=('ip_address', 'day'), name='guestusagedaily_ip_day_unique'),
+        ),
+    ]
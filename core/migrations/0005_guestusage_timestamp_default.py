@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 20:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indexes_guestusagedaily'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='guestusage',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:03
+
+import hashlib
+import io
+import zlib
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+from django.db.models.functions import Length
+
+BATCH_SIZE = 500
+# Fixed rather than SUMMARIZER_TEXT_CODEC, which may name a codec whose package
+# is missing; compress_texts recompresses the blobs with the configured codec
+CODEC = 'zlib'
+ZLIB_LEVEL = 6
+
+
+def compress(text):
+    # A frozen copy of core.compression.compress with zlib as of this migration
+    return zlib.compress(text.encode('utf-8'), ZLIB_LEVEL)
+
+
+def decompress(data, codec):
+    # A frozen copy of core.compression.decompress as of this migration;
+    # compress_texts may have recompressed blobs with zstd since
+    if codec == 'zstd':
+        import zstandard
+
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)).read().decode('utf-8')
+    return zlib.decompress(data).decode('utf-8')
+
+
+def compress_original_texts(apps, schema_editor):
+    # A frozen copy of core.compression.compress_rows as of this migration
+    if not settings.SUMMARIZER_COMPRESS_TEXT:
+        return
+    Summary = apps.get_model('core', 'Summary')
+    TextBlob = apps.get_model('core', 'TextBlob')
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Summary.objects.annotate(text_length=Length('original_text'))
+                .filter(id__gt=last_id, original_blob__isnull=True,
+                        text_length__gte=settings.SUMMARIZER_COMPRESS_MIN_CHARS)
+                .order_by('id')
+                .only('id', 'original_text')[:BATCH_SIZE]
+            )
+            if not batch:
+                return
+            digests = [hashlib.sha256(summary.original_text.encode('utf-8')).hexdigest() for summary in batch]
+            existing = set(TextBlob.objects.filter(digest__in=digests).values_list('digest', flat=True))
+            new = {digest: summary.original_text for digest, summary in zip(digests, batch) if digest not in existing}
+            TextBlob.objects.bulk_create([
+                TextBlob(digest=digest, codec=CODEC, size=len(text), data=compress(text))
+                for digest, text in new.items()
+            ], ignore_conflicts=True)
+            blob_ids = dict(TextBlob.objects.filter(digest__in=digests).values_list('digest', 'id'))
+            for digest, summary in zip(digests, batch):
+                summary.original_blob_id = blob_ids[digest]
+                summary.original_text = ''
+            Summary.objects.bulk_update(batch, ['original_blob', 'original_text'])
+        last_id = batch[-1].id
+
+
+def decompress_original_texts(apps, schema_editor):
+    Summary = apps.get_model('core', 'Summary')
+    last_id = 0
+    while True:
+        batch = list(
+            Summary.objects.filter(id__gt=last_id, original_blob__isnull=False)
+            .select_related('original_blob')
+            .order_by('id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for summary in batch:
+            summary.original_text = decompress(bytes(summary.original_blob.data), summary.original_blob.codec)
+            summary.original_blob = None
+        Summary.objects.bulk_update(batch, ['original_text', 'original_blob'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    # Every batch of the data migration is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_summary_minhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('codec', models.CharField(max_length=8)),
+                ('size', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='summary',
+            name='original_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='summary',
+            name='original_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='summaries', to='core.textblob'),
+        ),
+        migrations.RunPython(compress_original_texts, decompress_original_texts),
+    ]
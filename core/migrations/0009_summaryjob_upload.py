@@ -0,0 +1,38 @@
+# Generated by Django 5.0.2 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_textblob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summaryjob',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='summaryjob',
+            name='source_file',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='summaryjob',
+            name='source_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='summaryjob',
+            name='truncated',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='summaryjob',
+            name='text',
+            field=models.TextField(blank=True),
+        ),
+    ]
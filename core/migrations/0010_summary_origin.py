@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_summaryjob_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summary',
+            name='engine',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='summary',
+            name='model_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-18 22:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_summary_origin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='summaryjob',
+            name='engine',
+            field=models.CharField(default='transformer', max_length=20),
+        ),
+    ]
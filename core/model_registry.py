@@ -0,0 +1,117 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def model_size_mb(model):
+    """Return the memory taken by a model's parameters and buffers, in MB."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors) / 2 ** 20
+
+
+class ModelRegistry:
+    """Summarization pipelines of extra models, loaded on first use.
+
+    ``load(name)`` starts loading a model with ``loader`` in a background
+    thread and returns False, as it does while another thread is loading it
+    or while a failed load is backing off, so requests fall back instead of
+    waiting for the cold start; ``wait=True`` loads it in the calling
+    thread or waits for the load under way. Once the loaded models take
+    more than ``budget_mb``, the least recently used ones are unloaded; the
+    model just loaded is always kept, even if it alone is over the budget.
+    """
+
+    def __init__(self, loader, budget_mb=4096, retry_backoff=30):
+        self.loader = loader
+        self.budget_mb = budget_mb
+        self.retry_backoff = retry_backoff
+        self.lock = threading.Lock()
+        # name -> (pipeline, size in MB), least recently used first
+        self.entries = OrderedDict()
+        # name -> Event set when its load is over
+        self.loading = {}
+        # name -> time.monotonic() after which a failed load is retried
+        self.failed = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, name):
+        """Return the pipeline of a loaded model, or None."""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            self.entries.move_to_end(name)
+            return entry[0]
+
+    def load(self, name, wait=False):
+        """Load a model unless it is loaded; return whether it can be used now."""
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+                return True
+            if time.monotonic() < self.failed.get(name, 0):
+                return False
+            done = self.loading.get(name)
+            if done is None:
+                done = self.loading[name] = threading.Event()
+                loader = True
+            else:
+                loader = False
+
+        if not loader:
+            if wait:
+                done.wait()
+                return self.get(name) is not None
+            return False
+        if not wait:
+            threading.Thread(target=self._load, args=(name, done), name='model-load', daemon=True).start()
+            return False
+        return self._load(name, done)
+
+    def _load(self, name, done):
+        try:
+            pipeline = self.loader(name)
+        except Exception:
+            logger.exception("Model loading error: %s", name)
+            with self.lock:
+                self.failed[name] = time.monotonic() + self.retry_backoff
+                del self.loading[name]
+            done.set()
+            return False
+
+        size = model_size_mb(pipeline.model)
+        with self.lock:
+            self.entries[name] = (pipeline, size)
+            self.failed.pop(name, None)
+            del self.loading[name]
+            self.loads += 1
+            evicted = self._evict(keep=name)
+        done.set()
+        if evicted:
+            logger.info("Unloaded %s to stay within %s MB", ', '.join(evicted), self.budget_mb)
+            # Requests still running on an unloaded model keep it alive until they end
+            gc.collect()
+        return True
+
+    def _evict(self, keep):
+        evicted = []
+        while sum(size for _, size in self.entries.values()) > self.budget_mb and len(self.entries) > 1:
+            name = next(name for name in self.entries if name != keep)
+            del self.entries[name]
+            self.evictions += 1
+            evicted.append(name)
+        return evicted
+
+    def stats(self):
+        with self.lock:
+            return {
+                'loaded': {name: round(size, 1) for name, (_, size) in self.entries.items()},
+                'budget_mb': self.budget_mb,
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
@@ -1,29 +1,221 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
+from django.utils.text import Truncator
+import hashlib
+import uuid
+
+from .compression import compress, decompress, iter_decompressed
+
+PREVIEW_WORDS = 50
+PREVIEW_LENGTH = 500
+
+
+def make_preview(text):
+    """Return the start of a text as shown in lists, at most PREVIEW_LENGTH characters."""
+    return Truncator(Truncator(text).words(PREVIEW_WORDS)).chars(PREVIEW_LENGTH)
 
 # Create your models here.
 
+class TextBlob(models.Model):
+    """A compressed text, stored once per distinct content (see ``core.compression``)."""
+    digest = models.CharField(max_length=64, unique=True)
+    codec = models.CharField(max_length=8)
+    # Characters of the text
+    size = models.PositiveIntegerField()
+    data = models.BinaryField()
+
+    @classmethod
+    def store(cls, text):
+        """Return the blob of a text, compressing and saving it unless it is stored already."""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        blob = cls.objects.filter(digest=digest).defer('data').first()
+        if blob is None:
+            codec = settings.SUMMARIZER_TEXT_CODEC
+            blob, _ = cls.objects.get_or_create(digest=digest, defaults={
+                'codec': codec,
+                'size': len(text),
+                'data': compress(text, codec),
+            })
+        return blob
+
+    @classmethod
+    def store_stream(cls, stream):
+        """Return the blob of a text written to a ``StreamCompressor``, saving it unless stored already."""
+        blob, _ = cls.objects.get_or_create(digest=stream.hash.hexdigest(), defaults={
+            'codec': stream.codec,
+            'size': stream.size,
+            'data': stream.finish(),
+        })
+        return blob
+
+    def get_text(self):
+        return decompress(bytes(self.data), self.codec)
+
+    def iter_text(self):
+        """Decompress the text in pieces, for streaming."""
+        return iter_decompressed(bytes(self.data), self.codec)
+
+    def __str__(self):
+        return self.digest
+
 class Summary(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
-    original_text = models.TextField()
+    # Empty when the text is compressed into original_blob; read it with
+    # get_original_text()
+    original_text = models.TextField(blank=True)
+    original_blob = models.ForeignKey(
+        TextBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='summaries',
+    )
+    # The start of original_text, so lists never have to load the full text
+    preview = models.CharField(max_length=PREVIEW_LENGTH, blank=True)
     summary_text = models.TextField()
     created_at = models.DateTimeField(default=timezone.now)
     bullet_points = models.BooleanField(default=False)
     summary_length = models.CharField(max_length=10, default='medium')
     is_guest = models.BooleanField(default=False)
     guest_email = models.EmailField(null=True, blank=True)
+    # MinHash signature of original_text, for the near-duplicate lookup
+    minhash = models.BinaryField(null=True, editable=False)
+    # What made summary_text: the engine and, for the model, its route (see
+    # inference.summary_origin). Empty for summaries saved before they were
+    # recorded, which are never reused for near-duplicates.
+    engine = models.CharField(max_length=20, blank=True)
+    model_name = models.CharField(max_length=200, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The history is listed per user by (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id'], name='summary_user_created_idx'),
+        ]
+
+    def prepare_text(self):
+        """Fill the preview and compress a long original text.
+
+        Called by save(); rows saved with bulk_create need it called first.
+        """
+        if not self.preview and self.original_text:
+            self.preview = make_preview(self.original_text)
+        if (settings.SUMMARIZER_COMPRESS_TEXT and self.original_blob_id is None
+                and len(self.original_text) >= settings.SUMMARIZER_COMPRESS_MIN_CHARS):
+            self.original_blob = TextBlob.store(self.original_text)
+            self.original_text = ''
+
+    def get_original_text(self):
+        if self.original_blob_id is not None:
+            return self.original_blob.get_text()
+        return self.original_text
+
+    def iter_original_text(self):
+        """Yield the original text in pieces, decompressing it as it goes."""
+        if self.original_blob_id is not None:
+            yield from self.original_blob.iter_text()
+        elif self.original_text:
+            yield self.original_text
+
+    def save(self, *args, **kwargs):
+        self.prepare_text()
+        indexed = self._state.adding and settings.SUMMARIZER_DEDUP
+        super().save(*args, **kwargs)
+        if indexed:
+            from .dedup import index_summaries
+
+            index_summaries([self])
+
+class SummaryBand(models.Model):
+    """One LSH band of a Summary's MinHash signature (see ``core.dedup``)."""
+    summary = models.ForeignKey(Summary, on_delete=models.CASCADE, related_name='bands')
+    key = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"{self.summary_id} - {self.key}"
+
+class ChunkSummary(models.Model):
+    """The partial summary of one chunk of a long document.
+
+    ``key`` hashes the chunk text with the model and generation options, so
+    an edited document only needs new partial summaries for the chunks
+    that changed.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    summary = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return self.key
 
 class GuestUsage(models.Model):
     ip_address = models.GenericIPAddressField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the request is recorded, not when the buffered row is written
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = 'Guest Usage'
         verbose_name_plural = 'Guest Usages'
+        indexes = [
+            # Usage per guest over a time window
+            models.Index(fields=['ip_address', 'timestamp'], name='guestusage_ip_time_idx'),
+            # Old rows are compacted by age
+            models.Index(fields=['timestamp'], name='guestusage_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.ip_address} - {self.timestamp}"
+
+class GuestUsageDaily(models.Model):
+    """Number of guest requests per IP address and day, rolled up from GuestUsage."""
+    ip_address = models.GenericIPAddressField()
+    day = models.DateField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Guest Usage (daily)'
+        verbose_name_plural = 'Guest Usage (daily)'
+        constraints = [
+            models.UniqueConstraint(fields=['ip_address', 'day'], name='guestusagedaily_ip_day_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.ip_address} - {self.day}: {self.count}"
+
+class SummaryJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Empty for jobs of an uploaded file, which is read from source_file
+    text = models.TextField(blank=True)
+    source_file = models.CharField(max_length=255, blank=True)
+    source_name = models.CharField(max_length=255, blank=True)
+    summary_length = models.CharField(max_length=10, default='medium')
+    bullet_points = models.BooleanField(default=False)
+    # 'transformer' or one of the extractive engines
+    engine = models.CharField(max_length=20, default='transformer')
+    # Percent of an uploaded file read so far
+    progress = models.PositiveSmallIntegerField(default=0)
+    # Whether the file had more text than SUMMARIZER_UPLOAD_MAX_CHARS
+    truncated = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    summary = models.ForeignKey(Summary, on_delete=models.SET_NULL, null=True, blank=True)
+    result = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"{self.id} - {self.status}"
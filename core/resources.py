@@ -0,0 +1,103 @@
+"""Text preprocessing resources, loaded once per process.
+
+Stop word sets, compiled patterns and the punkt sentence tokenizer used to
+be rebuilt or looked up on every request. Everything here is created on
+first use and then shared, read-only, by all threads of the process (and
+by forked workers when it is loaded before the fork).
+"""
+import re
+import threading
+from string import punctuation
+
+WHITESPACE_RE = re.compile(r'\s+')
+NON_WORD_RE = re.compile(r'[^\w\s]')
+WORD_RE = re.compile(r'\w+')
+SENTENCE_END_RE = re.compile(r'[.!?]+')
+
+TURKISH_CHARS = frozenset('çÇğĞıİöÖşŞüÜ')
+
+NLTK_DATA = {
+    'punkt': 'tokenizers/punkt',
+    'stopwords': 'corpora/stopwords',
+}
+
+TURKISH_STOP_WORDS = frozenset({
+    'acaba', 'ama', 'aslında', 'az', 'bazı', 'belki', 'biri', 'birkaç', 'birşey',
+    'biz', 'bu', 'çok', 'çünkü', 'da', 'daha', 'de', 'defa', 'diye', 'eğer', 'en',
+    'gibi', 'hem', 'hep', 'hepsi', 'her', 'hiç', 'için', 'ile', 'ise', 'kez', 'ki',
+    'kim', 'mı', 'mu', 'mü', 'nasıl', 'ne', 'neden', 'nerde', 'nerede', 'nereye',
+    'niçin', 'niye', 'o', 'sanki', 'şey', 'siz', 'şu', 'tüm', 've', 'veya', 'ya',
+    'yani'
+})
+
+_lock = threading.Lock()
+_nltk_ready = False
+_stop_words = {}
+_sentence_tokenizers = {}
+
+
+def ensure_nltk_data():
+    """Check for the NLTK data once per process, downloading what is missing."""
+    global _nltk_ready
+    if _nltk_ready:
+        return
+    with _lock:
+        if not _nltk_ready:
+            import nltk
+
+            for package, path in NLTK_DATA.items():
+                try:
+                    nltk.data.find(path)
+                except LookupError:
+                    nltk.download(package)
+            _nltk_ready = True
+
+
+def get_stop_words(language=None):
+    """Return the frozen stop word set of a language, punctuation included.
+
+    ``language`` is 'turkish' or the name of an NLTK stop word list such
+    as 'english'; by default English and Turkish are combined, which is
+    what the extractive engines use on input of unknown language.
+    """
+    stop_words = _stop_words.get(language)
+    if stop_words is None:
+        if language == 'turkish':
+            words = TURKISH_STOP_WORDS
+        else:
+            ensure_nltk_data()
+            from nltk.corpus import stopwords
+            words = set(stopwords.words(language or 'english'))
+            if language is None:
+                words |= TURKISH_STOP_WORDS
+        stop_words = _stop_words.setdefault(language, frozenset(words) | frozenset(punctuation))
+    return stop_words
+
+
+def get_sentence_tokenizer(language='english'):
+    """Return the punkt sentence tokenizer of a language, loaded once."""
+    tokenizer = _sentence_tokenizers.get(language)
+    if tokenizer is None:
+        import nltk
+
+        ensure_nltk_data()
+        tokenizer = _sentence_tokenizers.setdefault(
+            language, nltk.data.load(f'tokenizers/punkt/{language}.pickle')
+        )
+    return tokenizer
+
+
+def sent_tokenize(text, language='english'):
+    """Split text into sentences, like ``nltk.sent_tokenize``."""
+    return get_sentence_tokenizer(language).tokenize(text)
+
+
+def normalize_whitespace(text):
+    """Collapse runs of whitespace into single spaces and strip the ends."""
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def preload():
+    """Load every resource now, e.g. in the master process before forking."""
+    get_stop_words()
+    get_sentence_tokenizer()
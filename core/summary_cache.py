@@ -0,0 +1,167 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+def make_cache_key(text, summary_length, bullet_points, model_name, engine):
+    """Hash normalized text and summary options into a cache key."""
+    digest = hashlib.sha256()
+    for part in (model_name, engine, summary_length, str(bool(bullet_points)), text):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """Content-addressed summary cache with a local LRU and an optional shared tier.
+
+    The local tier is an in-process LRU bounded by ``max_entries`` and
+    ``ttl`` seconds. When ``shared_alias`` names a Django cache, entries are
+    also written there so other workers can reuse them, and that cache is
+    used as a lock so only one worker generates a given summary at a time.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, shared_alias=None, lock_timeout=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self.lock_timeout = lock_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def get(self, key):
+        """Return the cached value for key, or None."""
+        value, tier = self._lookup(key)
+        self._count(tier)
+        return value
+
+    def _lookup(self, key):
+        """Return (value, tier) for key without touching the counters."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return value, 'local'
+                del self._entries[key]
+
+        if self.shared is not None:
+            value = self.shared.get('summary:' + key)
+            if value is not None:
+                self._set_local(key, value)
+                return value, 'shared'
+
+        return None, None
+
+    def _count(self, tier):
+        with self._lock:
+            if tier == 'local':
+                self.local_hits += 1
+            elif tier == 'shared':
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+
+    def set(self, key, value):
+        """Store value in both tiers."""
+        self._set_local(key, value)
+        if self.shared is not None:
+            self.shared.set('summary:' + key, value, self.ttl)
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        """Return (value, hit) for key, calling compute() at most once per key.
+
+        compute() returns ``(value, cacheable)``; uncacheable values are
+        returned to the caller without being stored.
+        """
+        value, tier = self._lookup(key)
+        if value is None:
+            # Concurrent requests for the same key in this process wait for
+            # the first one instead of generating the same summary again
+            with self._lock:
+                key_lock = self._key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                try:
+                    value, tier = self._lookup(key)
+                    if value is None:
+                        value, tier = self._compute_once(key, compute)
+                finally:
+                    with self._lock:
+                        self._key_locks.pop(key, None)
+
+        self._count(tier)
+        return value, tier is not None
+
+    def _compute_once(self, key, compute):
+        shared_lock = self._acquire_shared_lock(key)
+        if shared_lock is None:
+            # Another worker finished the summary while we waited
+            value, tier = self._lookup(key)
+            if value is not None:
+                return value, tier
+
+        try:
+            value, cacheable = compute()
+            if cacheable:
+                self.set(key, value)
+            return value, None
+        finally:
+            if shared_lock:
+                self.shared.delete('summary-lock:' + key)
+
+    def _acquire_shared_lock(self, key):
+        """Take the cross-worker lock for key.
+
+        Returns True when this worker should generate the summary, False if
+        there is no shared tier to lock, and None if another worker stored
+        the summary while we were waiting for its lock.
+        """
+        if self.shared is None:
+            return False
+
+        lock_key = 'summary-lock:' + key
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.shared.add(lock_key, 1, self.lock_timeout):
+            if self.shared.get('summary:' + key) is not None:
+                return None
+            if time.monotonic() >= deadline:
+                # The lock holder is stuck or gone; generate it ourselves
+                return True
+            time.sleep(0.05)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the size of the local tier."""
+        with self._lock:
+            return {
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'shared': bool(self.shared_alias),
+            }
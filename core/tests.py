@@ -1,3 +1,1049 @@
-from django.test import TestCase
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from datetime import timedelta
+from importlib.util import find_spec
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.http import urlsafe_base64_encode
+
+from .admission import AdmissionController, Overloaded, RateLimited, admission
+from .batching import BatchScheduler
+from .management.commands.measure_imports import HEAVY_MODULES, measure_imports
+from .dedup import find_near_duplicate, minhash_signature
+from .jobs import _run_in_thread, claim_next_job, run_job
+from .inference import (
+    cache_model_name, chunk_summary_key, get_generate_kwargs, reduce_to_single_chunk, split_into_chunks, summarize_chunks,
+    summarize_text, summarize_text_pieces, summary_cache,
+)
+from .extractive import (
+    build_term_matrix, rank_sentences, select_top_sentences, sentence_graph, summarize_sentences,
+    summarize_text_textrank,
+)
+from .language import detect_language
+from .metrics import STAGE_SECONDS, render_metrics
+from .model_registry import ModelRegistry
+from .resources import get_stop_words
+from .summary_cache import SummaryCache, make_cache_key
+from .uploads import summarize_file
+from .models import ChunkSummary, GuestUsage, GuestUsageDaily, Summary, SummaryBand, SummaryJob, TextBlob
+from .usage import UsageBuffer, guest_usage
+
+
+class ImportTimeTests(SimpleTestCase):
+    def test_web_app_does_not_import_ml_stack(self):
+        # URLs pull in every view; torch and friends must wait for the first summary
+        timings, rss, loaded = measure_imports(['core.urls', 'core.admin', 'core.jobs'])
+        self.assertEqual([module for module in HEAVY_MODULES if module in loaded], [])
+
+
+class PreloadTests(SimpleTestCase):
+    @override_settings(SUMMARIZER_PRELOAD=True)
+    def test_preload_is_left_to_gunicorn_hooks(self):
+        with mock.patch('core.inference.preload_model') as preload_model:
+            apps.get_app_config('core').ready()
+            self.assertEqual(preload_model.call_count, 1)
+            # In the gunicorn master the workers preload after the fork
+            with mock.patch.dict(sys.modules, {'gunicorn.arbiter': mock.Mock()}):
+                apps.get_app_config('core').ready()
+            self.assertEqual(preload_model.call_count, 1)
+
+
+class QueryPlanTests(TransactionTestCase):
+    """Capture the query plans of the hot queries without and with their index."""
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plans are compared in the SQLite format')
+        self.user = User.objects.create_user('reader')
+        now = timezone.now()
+        Summary.objects.bulk_create([
+            Summary(user=self.user, original_text='text', summary_text='summary', created_at=now - timedelta(minutes=i))
+            for i in range(50)
+        ])
+        GuestUsage.objects.bulk_create([
+            GuestUsage(ip_address=f'10.0.0.{i % 10}') for i in range(50)
+        ])
+
+    def capture_plans(self, model, index_name, queryset):
+        """Return the plan of ``queryset`` without and with the named index."""
+        index = next(index for index in model._meta.indexes if index.name == index_name)
+        with connection.schema_editor() as editor:
+            editor.remove_index(model, index)
+        try:
+            before = queryset.explain()
+        finally:
+            with connection.schema_editor() as editor:
+                editor.add_index(model, index)
+        return before, queryset.explain()
+
+    def test_history_uses_user_created_index(self):
+        queryset = (
+            Summary.objects.filter(user=self.user)
+            .defer('original_text')
+            .order_by('-created_at', '-id')[:21]
+        )
+        before, after = self.capture_plans(Summary, 'summary_user_created_idx', queryset)
+
+        # Without the index every row of the user is sorted for each page
+        self.assertIn('TEMP B-TREE', before, before)
+        self.assertIn('summary_user_created_idx', after, after)
+        self.assertNotIn('TEMP B-TREE', after, after)
+
+    def test_guest_usage_window_uses_ip_time_index(self):
+        queryset = GuestUsage.objects.filter(
+            ip_address='10.0.0.1', timestamp__gte=timezone.now() - timedelta(days=1)
+        )
+        before, after = self.capture_plans(GuestUsage, 'guestusage_ip_time_idx', queryset.values('id'))
+
+        self.assertNotIn('guestusage_ip_time_idx', before, before)
+        self.assertIn('guestusage_ip_time_idx', after, after)
+
+
+class HistoryCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='secret')
+        self.client.force_login(self.user)
+        now = timezone.now()
+        # Three summaries share a timestamp, so pages have to break ties by id
+        for created_at in [now, now, now, now - timedelta(days=1), now + timedelta(days=1)]:
+            Summary.objects.create(user=self.user, original_text='Text.', summary_text='Summary.', created_at=created_at)
+        Summary.objects.create(user=User.objects.create_user('other'), original_text='Text.', summary_text='Summary.')
+
+    @override_settings(HISTORY_PAGE_SIZE=2)
+    def test_pages_follow_cursors_without_gaps_or_repeats(self):
+        ids = []
+        cursor = None
+        for _ in range(3):
+            response = self.client.get('/history/json/', {'cursor': cursor} if cursor else {})
+            self.assertEqual(response.status_code, 200)
+            ids.extend(result['id'] for result in response.json()['results'])
+            cursor = response.json()['next_cursor']
+        self.assertIsNone(cursor)
+
+        expected = Summary.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+
+    def test_bad_cursors_are_rejected(self):
+        for cursor in ['not a cursor', urlsafe_base64_encode(b'2024-01-01T00:00:00+00:00'),
+                       urlsafe_base64_encode(b'yesterday|5'), urlsafe_base64_encode(b'2024-01-01T00:00:00+00:00|x'),
+                       urlsafe_base64_encode(b'2024-01-01T00:00:00|5'), urlsafe_base64_encode(b'\xff\xfe|5')]:
+            self.assertEqual(self.client.get('/history/json/', {'cursor': cursor}).status_code, 400, cursor)
+
+
+class CompactGuestUsageTests(TestCase):
+    def test_rolls_old_rows_into_daily_counts(self):
+        old = timezone.now() - timedelta(days=40)
+        GuestUsage.objects.bulk_create(
+            [GuestUsage(ip_address='10.0.0.1', timestamp=old) for _ in range(3)]
+            + [GuestUsage(ip_address='10.0.0.2', timestamp=old)]
+            + [GuestUsage(ip_address='10.0.0.1')]
+        )
+        GuestUsageDaily.objects.create(ip_address='10.0.0.1', day=timezone.localdate(old), count=2)
+
+        call_command('compact_guest_usage', days=30, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(GuestUsage.objects.count(), 1)
+        self.assertEqual(
+            dict(GuestUsageDaily.objects.values_list('ip_address', 'count')),
+            {'10.0.0.1': 5, '10.0.0.2': 1},
+        )
+
+
+class UsageBufferTests(TestCase):
+    def test_full_buffer_is_flushed(self):
+        buffer = UsageBuffer(max_size=3, flush_interval=3600)
+        buffer.record('10.0.0.1')
+        buffer.record('10.0.0.2')
+        self.assertEqual(GuestUsage.objects.count(), 0)
+
+        buffer.record('10.0.0.1')
+        self.assertEqual(GuestUsage.objects.count(), 3)
+        self.assertEqual((buffer.stats()['pending'], buffer.stats()['flushed']), (0, 3))
+
+    def test_events_are_kept_when_a_flush_fails(self):
+        buffer = UsageBuffer(max_size=100, flush_interval=3600)
+        buffer.record('10.0.0.1')
+        buffer.record('10.0.0.2')
+        with mock.patch('core.models.GuestUsage.objects.bulk_create', side_effect=DatabaseError), \
+                self.assertLogs('core.usage', 'ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual((buffer.stats()['pending'], buffer.stats()['failures']), (2, 1))
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(GuestUsage.objects.count(), 2)
+
+    def test_count_covers_the_sliding_window(self):
+        buffer = UsageBuffer(max_size=100, flush_interval=3600, window=100)
+        with mock.patch('core.usage.time.time', return_value=1000.0):
+            buffer.record('10.0.0.1')
+            buffer.record('10.0.0.1')
+            self.assertEqual((buffer.count('10.0.0.1'), buffer.count('10.0.0.2')), (2, 0))
+        # Half of the previous window still overlaps
+        with mock.patch('core.usage.time.time', return_value=1150.0):
+            self.assertEqual(buffer.count('10.0.0.1'), 1)
+        with mock.patch('core.usage.time.time', return_value=1250.0):
+            self.assertEqual(buffer.count('10.0.0.1'), 0)
+
+
+class MetricsTests(TestCase):
+    def test_extractive_request_is_timed_and_exported(self):
+        self.client.force_login(User.objects.create_user('ops', is_staff=True))
+        timed = sum(STAGE_SECONDS.values.get(('extractive',), [[0], 0])[0])
+
+        response = self.client.post('/api/summarize/', {
+            'text': 'Stages are timed per request. The header lists them. Prometheus scrapes the totals.',
+            'engine': 'nltk',
+        })
+        self.assertRegex(response['Server-Timing'], r'^detect_language;dur=[\d.]+, extractive;dur=[\d.]+, db;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertEqual(sum(STAGE_SECONDS.values[('extractive',)][0]), timed + 1)
+
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('summarizer_stage_seconds_bucket{stage="extractive",le="+Inf"}', response.content.decode())
+        self.assertTrue(render_metrics().endswith('\n'))
+
+
+class SummaryCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SummaryCache(max_entries=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+
+        self.assertEqual([cache.get(key) for key in 'abc'], ['A', None, 'C'])
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_entries_expire_after_ttl(self):
+        cache = SummaryCache(ttl=60)
+        with mock.patch('core.summary_cache.time.monotonic', return_value=1000.0):
+            cache.set('a', 'A')
+        with mock.patch('core.summary_cache.time.monotonic', return_value=1059.0):
+            self.assertEqual(cache.get('a'), 'A')
+        with mock.patch('core.summary_cache.time.monotonic', return_value=1061.0):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_other_worker_reads_the_shared_tier(self):
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+        writer = SummaryCache(shared_alias='default')
+        reader = SummaryCache(shared_alias='default')
+
+        self.assertEqual(writer.get_or_compute('k', lambda: ('summary', True)), ('summary', False))
+        self.assertEqual(reader.get_or_compute('k', lambda: self.fail('computed twice')), ('summary', True))
+        reader.get('k')
+        self.assertEqual((reader.stats()['shared_hits'], reader.stats()['local_hits']), (1, 1))
+
+    def test_fallback_summaries_are_not_cached_as_model_output(self):
+        text = 'The council approved the budget on Monday. It funds new schools. Critics called it too small.'
+        key = make_cache_key(text, 'medium', False, cache_model_name('en'), 'transformer')
+        summary_cache.clear()
+        self.addCleanup(summary_cache.clear)
+
+        with mock.patch('core.inference.model_available', return_value=True), \
+                mock.patch('core.inference.summarize_long_text', side_effect=RuntimeError) as generate, \
+                self.assertLogs('core.inference', 'ERROR'):
+            for _ in range(2):
+                stats = {}
+                summarize_text(text, stats=stats)
+                self.assertEqual((stats['engine'], stats['cached']), ('nltk', False))
+        self.assertEqual(generate.call_count, 2)
+        self.assertIsNone(summary_cache.get(key))
+
+        # A degraded request asks for the extractive engine, cached under its own key
+        summarize_text(text, engine='nltk')
+        self.assertIsNone(summary_cache.get(key))
+
+
+class AdmissionTests(TestCase):
+    text = 'word ' * 50
+
+    def setUp(self):
+        # Write the guest requests while the test database exists
+        self.addCleanup(guest_usage.flush)
+
+    def test_token_bucket_limits_and_refunds(self):
+        controller = AdmissionController(guest_capacity=100, window=60)
+        controller.take('ip:1', 80)
+        with self.assertRaises(RateLimited) as raised:
+            controller.take('ip:1', 50)
+        # 30 more tokens at 100 per minute
+        self.assertEqual(raised.exception.retry_after, 18)
+
+        controller.refund('ip:1', 80)
+        controller.take('ip:1', 100)
+        # A larger request gets through a full bucket and leaves it in debt
+        controller.take('ip:2', 150)
+        self.assertLess(controller.buckets['ip:2'][0], 0)
+        self.assertEqual(controller.file_cost('ip:3', 10 * 2 ** 20), 100)
+
+    def test_busy_worker_degrades_or_rejects(self):
+        controller = AdmissionController(guest_capacity=1000, max_concurrency=1, max_wait_ms=0)
+        ticket = controller.admit('ip:1', self.text)
+        self.assertEqual((ticket.engine, ticket.degraded), ('transformer', False))
+
+        degraded = controller.admit('ip:1', self.text)
+        self.assertEqual((degraded.engine, degraded.degraded), ('nltk', True))
+        # The degraded request got its tokens back
+        self.assertAlmostEqual(controller.buckets['ip:1'][0], 1000 - 70, delta=1)
+        controller.degrade = False
+        with self.assertRaises(Overloaded):
+            controller.admit('ip:1', self.text)
+
+        ticket.release()
+        ticket.release()
+        with controller.admit('ip:1', self.text) as ticket:
+            self.assertFalse(ticket.degraded)
+        self.assertEqual(controller.admit('ip:1', self.text, engine='textrank').engine, 'textrank')
+
+    def test_guest_requests_are_limited_per_window(self):
+        usage = UsageBuffer(max_size=100, flush_interval=3600, window=3600)
+        controller = AdmissionController(usage=usage, guest_requests=2)
+        usage.record('10.0.0.1')
+        controller.take('ip:10.0.0.1', 1)
+        usage.record('10.0.0.1')
+
+        with self.assertRaises(RateLimited):
+            controller.take('ip:10.0.0.1', 1)
+        controller.take('ip:10.0.0.2', 1)
+        controller.take('user:1', 1)
+
+    def test_client_over_budget_gets_429(self):
+        admission.take('ip:10.0.0.7', admission.guest_capacity)
+
+        response = self.client.post('/api/summarize/', {'text': self.text}, REMOTE_ADDR='10.0.0.7')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(SUMMARIZER_UPLOAD_DIR=tempfile.gettempdir())
+    def test_large_upload_costs_at_most_a_full_bucket(self):
+        response = self.client.post('/api/summarize/upload/', {
+            'file': SimpleUploadedFile('book.txt', self.text.encode() * 2000),
+        }, REMOTE_ADDR='10.0.0.8')
+
+        self.assertEqual(response.status_code, 202)
+        self.addCleanup(os.remove, SummaryJob.objects.get().source_file)
+        self.assertGreaterEqual(admission.buckets['ip:10.0.0.8'][0], 0)
+
+
+def parse_events(chunks):
+    """Decode server-sent events into ``(event, data)`` pairs."""
+    events = []
+    for block in b''.join(chunks).decode().split('\n\n')[:-1]:
+        event, data = block.split('\n')
+        events.append((event.removeprefix('event: '), json.loads(data.removeprefix('data: '))))
+    return events
+
+
+class SummaryStreamTests(TestCase):
+    text = 'The council approved the budget on Monday. It funds new schools. Critics called it too small.'
+
+    def setUp(self):
+        summary_cache.clear()
+        self.addCleanup(summary_cache.clear)
+        self.addCleanup(guest_usage.flush)
+        # One slot, so a ticket that is not given back makes the next request wait
+        self.admission = AdmissionController(max_concurrency=1, max_wait_ms=0, degrade=False)
+        patcher = mock.patch('core.views.admission', self.admission)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cancelled = []
+
+    def fake_stream(self, text, summary_length, cancelled, stats, language=None):
+        self.cancelled.append(cancelled)
+        stats.update(engine='transformer', chunks=1)
+        yield from ['The council ', 'approved ', 'the budget.']
+
+    def post(self, **data):
+        return self.client.post('/stream/', {'text': self.text, **data}, REMOTE_ADDR='10.0.0.20')
+
+    def test_tokens_are_streamed_as_events(self):
+        user = User.objects.create_user('reader')
+        self.client.force_login(user)
+        with mock.patch('core.inference.model_available', return_value=True), \
+                mock.patch('core.views.stream_summary', self.fake_stream):
+            response = self.post(summary_length='short')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            events = parse_events(response.streaming_content)
+
+        self.assertEqual(events, [
+            ('token', {'text': 'The council '}),
+            ('token', {'text': 'approved '}),
+            ('token', {'text': 'the budget.'}),
+            ('done', {'summary': 'The council approved the budget.', 'engine': 'transformer', 'language': 'en',
+                      'degraded': False}),
+        ])
+        summary = Summary.objects.get(user=user)
+        self.assertEqual((summary.summary_text, summary.summary_length, summary.engine),
+                         ('The council approved the budget.', 'short', 'transformer'))
+        self.admission.admit('ip:10.0.0.21', self.text).release()
+
+    def test_falls_back_to_extractive_summary_in_one_event(self):
+        with mock.patch('core.inference.model_available', return_value=False), \
+                mock.patch('core.views.stream_summary', side_effect=AssertionError('model was called')):
+            events = parse_events(self.post().streaming_content)
+
+        self.assertEqual([event for event, _ in events], ['token', 'done'])
+        self.assertEqual(events[1][1]['engine'], 'nltk')
+        self.assertEqual(events[0][1]['text'], events[1][1]['summary'])
+
+    def test_generation_error_ends_with_error_event(self):
+        with mock.patch('core.inference.model_available', return_value=True), \
+                mock.patch('core.views.stream_summary', side_effect=RuntimeError), \
+                self.assertLogs('core.views', 'ERROR'):
+            events = parse_events(self.post().streaming_content)
+
+        self.assertEqual([event for event, _ in events], ['error'])
+        self.admission.admit('ip:10.0.0.21', self.text).release()
+
+    def test_disconnect_cancels_generation_and_frees_the_slot(self):
+        with mock.patch('core.inference.model_available', return_value=True), \
+                mock.patch('core.views.stream_summary', self.fake_stream):
+            response = self.post()
+            content = iter(response.streaming_content)
+            self.assertEqual(parse_events([next(content)]), [('token', {'text': 'The council '})])
+            with self.assertRaises(Overloaded):
+                self.admission.admit('ip:10.0.0.21', self.text)
+            response.close()
+
+        self.assertTrue(self.cancelled[0].is_set())
+        self.admission.admit('ip:10.0.0.21', self.text).release()
+
+        # A stream closed before it was read gives its slot back as well
+        self.post().close()
+        self.admission.admit('ip:10.0.0.21', self.text).release()
+
+
+class BatchSchedulerTests(SimpleTestCase):
+    def test_maps_more_texts_than_the_queue_holds(self):
+        batches = []
+
+        def run_batch(texts, **generate_kwargs):
+            batches.append(len(texts))
+            return [text.upper() for text in texts]
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=2, max_wait_ms=1, max_queue_size=2)
+        texts = [f'chunk {i}' for i in range(7)]
+
+        self.assertEqual(scheduler.map(texts, max_length=10), [text.upper() for text in texts])
+        self.assertEqual(sum(batches), 7)
+        self.assertLessEqual(max(batches), 2)
+
+    def test_short_batch_results_fail_instead_of_hanging(self):
+        scheduler = BatchScheduler(lambda texts, **kwargs: texts[:-1], max_batch_size=2, max_wait_ms=1, timeout=5)
+
+        with self.assertRaisesMessage(RuntimeError, 'run_batch returned 1 results for 2 texts'):
+            scheduler.map(['first', 'second'])
+
+    def test_waiting_for_a_stuck_batch_times_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def stuck(texts, **kwargs):
+            release.wait()
+            return texts
+
+        scheduler = BatchScheduler(stuck, max_batch_size=2, max_wait_ms=1, timeout=0.05)
+        with self.assertRaises(FuturesTimeoutError):
+            scheduler.map(['first', 'second', 'third'])
+
+
+class BatchSummarizeTests(TestCase):
+    def test_results_in_input_order_with_per_item_errors(self):
+        user = User.objects.create_user('writer')
+        self.client.force_login(user)
+        text = 'The cat sat on the mat. The dog lay by the door. Both of them slept all day.'
+        response = self.client.post('/api/summarize/batch/', {'documents': [
+            {'text': text, 'engine': 'nltk'},
+            {'text': ' '},
+            {'text': text, 'engine': 'textrank', 'summary_length': 'short'},
+        ]}, content_type='application/json')
+
+        results = response.json()['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertEqual([result.get('engine') for result in results], ['nltk', None, 'textrank'])
+        self.assertIn('error', results[1])
+        self.assertEqual(
+            list(Summary.objects.filter(user=user).order_by('id').values_list('id', 'preview')),
+            [(results[0]['summary_id'], text), (results[2]['summary_id'], text)],
+        )
+
+    def test_clients_post_with_the_token_of_the_csrf_endpoint(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('integration'))
+        text = 'The cat sat on the mat. The dog lay by the door. Both of them slept all day.'
+        documents = {'documents': [{'text': text, 'engine': 'nltk'}]}
+
+        response = client.post('/api/summarize/batch/', documents, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+        token = client.get('/api/csrf/').json()['csrf_token']
+        response = client.post('/api/summarize/batch/', documents, content_type='application/json',
+                               HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/api/summarize/', {'text': text, 'engine': 'nltk'}, HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.status_code, 200)
+
+
+class BulkSummarizeTests(SimpleTestCase):
+    def test_resume_cuts_output_back_to_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dump = os.path.join(directory, 'dump.jsonl')
+            with open(dump, 'w') as f:
+                for i in range(3):
+                    f.write(json.dumps({'id': i, 'text': f'Record {i} is here. It has two sentences.'}) + '\n')
+            output = os.path.join(directory, 'out.jsonl')
+            options = {'output': output, 'workers': 1, 'batch_size': 2, 'engine': 'nltk', 'stdout': StringIO()}
+            call_command('bulk_summarize', dump, **options)
+            with open(output) as f:
+                first_line = f.readline()
+
+            # An interrupted run: one record checkpointed, the next half written
+            with open(output, 'w') as f:
+                f.write(first_line + '{"id": "1", "summ')
+            with open(output + '.checkpoint', 'w') as f:
+                json.dump({'inputs': [dump], 'records': 1, 'output_bytes': len(first_line)}, f)
+            call_command('bulk_summarize', dump, resume=True, **options)
+
+            with open(output) as f:
+                rows = [json.loads(line) for line in f]
+            self.assertEqual([row['id'] for row in rows], ['0', '1', '2'])
+            self.assertFalse(os.path.exists(output + '.checkpoint'))
+
+    def test_empty_input_writes_empty_output(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dump = os.path.join(directory, 'empty.jsonl')
+            open(dump, 'w').close()
+            output = os.path.join(directory, 'out.jsonl')
+            stdout = StringIO()
+            call_command('bulk_summarize', dump, output=output, engine='nltk', stdout=stdout)
+
+            with open(output) as f:
+                self.assertEqual(f.read(), '')
+            self.assertIn('Summarized 0 of 0 records', stdout.getvalue())
+            self.assertFalse(os.path.exists(output + '.checkpoint'))
+
+
+def baseline_summary_sentences(sentences, summary_length, stop_words):
+    """The sentence scoring of the original NLTK fallback, kept as a reference."""
+    import re
+    from collections import defaultdict
+
+    from nltk.tokenize import word_tokenize
+
+    words = [word for word in word_tokenize(re.sub(r'[^\w\s]', '', ' '.join(sentences).lower()))
+             if word not in stop_words]
+    word_freq = defaultdict(int)
+    for word in words:
+        word_freq[word] += 1
+    sentence_scores = defaultdict(int)
+    for sentence in sentences:
+        for word in word_tokenize(sentence.lower()):
+            if word in word_freq:
+                sentence_scores[sentence] += word_freq[word]
+
+    num_sentences = len(sentences)
+    if summary_length == 'short':
+        num_summary = max(1, num_sentences // 4)
+    elif summary_length == 'long':
+        num_summary = max(2, num_sentences // 2)
+    else:
+        num_summary = max(1, num_sentences // 3)
+    summary_sentences = [s for s, _ in sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:num_summary]]
+    summary_sentences.sort(key=lambda x: sentences.index(x))
+    return summary_sentences
+
+
+class ExtractiveEngineTests(SimpleTestCase):
+    sentences = [
+        'The city council met on Tuesday to discuss the new budget.',
+        "Most of the budget goes to schools, roads and the city's parks.",
+        'Teachers asked the council for smaller classes and newer books.',
+        'The mayor said the budget keeps taxes where they are.',
+        'Road repairs were delayed last year because of the storms.',
+        'Several residents complained about the noise of the works!',
+        'Is the park by the river going to get new lights?',
+        'The council will vote on the budget next month.',
+        'Local shops hope the roads reopen before the holidays.',
+        "It's the third budget of the mayor's term, and the largest.",
+        'Nobody mentioned the library.',
+        'Schools, roads and parks: the council called them its priorities.',
+    ]
+
+    def test_selects_the_sentences_of_the_original_scorer(self):
+        stop_words = get_stop_words()
+        for summary_length in ['short', 'medium', 'long']:
+            for count in [3, 7, len(self.sentences)]:
+                sentences = self.sentences[:count]
+                self.assertEqual(
+                    summarize_sentences(sentences, summary_length, stop_words),
+                    baseline_summary_sentences(sentences, summary_length, stop_words),
+                    (summary_length, count),
+                )
+
+    def test_ties_go_to_the_earlier_sentence(self):
+        scores = np.array([1.0, 3.0, 3.0, 3.0, 0.0, 2.0])
+        self.assertEqual(list(select_top_sentences(scores, 2)), [1, 2])
+        self.assertEqual(list(select_top_sentences(scores, 4)), [1, 2, 3, 5])
+        # Sentences without a score are never picked
+        self.assertEqual(list(select_top_sentences(scores, 10)), [0, 1, 2, 3, 5])
+
+
+class TextRankTests(SimpleTestCase):
+    sentences = [
+        'Cats chase mice in the barn.',
+        'The mice fear the cats.',
+        'Rain falls on the city today.',
+        'The city expects more rain.',
+        'Cats sleep after the rain.',
+    ]
+
+    def test_only_sentences_sharing_a_term_are_connected(self):
+        matrix, terms = build_term_matrix(self.sentences)
+        graph = sentence_graph(matrix, terms, get_stop_words('english'), threshold=0)
+
+        edges = {tuple(sorted(pair)) for pair in zip(*graph.nonzero())}
+        # "the" is a stop word, so it connects nothing
+        self.assertEqual(edges, {(0, 1), (0, 4), (1, 4), (2, 3), (2, 4), (3, 4)})
+
+        # A term in more sentences than max_postings is left out too
+        graph = sentence_graph(matrix, terms, get_stop_words('english'), max_postings=2, threshold=0)
+        self.assertEqual({tuple(sorted(pair)) for pair in zip(*graph.nonzero())}, {(0, 1), (2, 3)})
+
+    def test_iteration_stops_below_the_tolerance(self):
+        matrix, terms = build_term_matrix(self.sentences)
+        graph = sentence_graph(matrix, terms, get_stop_words('english'), threshold=0)
+
+        previous = np.full(len(self.sentences), 1 / len(self.sentences))
+        for iterations in range(1, 100):
+            scores = rank_sentences(graph, tolerance=0, max_iterations=iterations)
+            if np.abs(scores - previous).sum() < 1e-4:
+                break
+            previous = scores
+        self.assertLess(iterations, 100)
+        self.assertEqual(list(rank_sentences(graph, tolerance=1e-4)), list(scores))
+        self.assertAlmostEqual(scores.sum(), 1)
+
+    def test_same_text_gives_same_summary(self):
+        text = ' '.join(self.sentences)
+        summaries = {summarize_text_textrank(text, summary_length='long', language='en') for _ in range(3)}
+
+        # The sentence linking both topics is always among them
+        self.assertEqual(summaries, {'The mice fear the cats. Cats sleep after the rain.'})
+
+
+class LanguageDetectionTests(SimpleTestCase):
+    def test_detects_language_from_character_ngrams(self):
+        texts = {
+            'en': 'Scientists have found a new kind of frog in the rainforest. It is small and lives in trees.',
+            'tr': 'Bilim insanları yağmur ormanında yeni bir kurbağa türü buldu. Çok küçük ve ağaçlarda yaşıyor.',
+            'de': 'Forscher haben im Regenwald eine neue Froschart entdeckt. Sie ist sehr klein und lebt auf Bäumen.',
+        }
+        self.assertEqual({language: detect_language(text) for language, text in texts.items()},
+                         {language: language for language in texts})
+        self.assertIsNone(detect_language('Hi there'))
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def test_first_request_does_not_wait_for_the_load(self):
+        release = threading.Event()
+
+        def loader(name):
+            release.wait(5)
+            return mock.Mock(model=mock.Mock(parameters=lambda: [], buffers=lambda: []))
+
+        registry = ModelRegistry(loader)
+        self.assertFalse(registry.load('tr-model'))
+        self.assertIsNone(registry.get('tr-model'))
+        release.set()
+
+        self.assertTrue(registry.load('tr-model', wait=True))
+        self.assertIsNotNone(registry.get('tr-model'))
+        self.assertEqual(registry.stats()['loads'], 1)
+
+
+class StubTokenizer:
+    """Tokenize by whitespace, so token counts are word counts."""
+
+    def __call__(self, texts, add_special_tokens=True):
+        return {'input_ids': [text.split() for text in texts]}
+
+    def decode(self, ids, skip_special_tokens=False):
+        return ' '.join(ids)
+
+
+@override_settings(SUMMARIZER_INCREMENTAL=False, SUMMARIZER_BATCHING=False)
+class ChunkingTests(SimpleTestCase):
+    # Seven tokens each, so two of them fill a chunk of 20 tokens
+    text = ' '.join(f'Sentence {i} tells about item number {i}.' for i in range(30))
+
+    def setUp(self):
+        patcher = mock.patch('core.inference.get_pipeline', return_value=mock.Mock(tokenizer=StubTokenizer()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks_stay_within_the_token_budget(self):
+        chunks = split_into_chunks(self.text, 20, 'en')
+
+        self.assertEqual(len(chunks), 15)
+        self.assertTrue(all(len(chunk.split()) <= 20 for chunk in chunks))
+        self.assertEqual(' '.join(chunks), self.text)
+
+    def test_sentence_longer_than_the_budget_is_split(self):
+        long_sentence = ' '.join(f'word{i}' for i in range(45)) + '.'
+        chunks = split_into_chunks(f'A short one. {long_sentence} Another short one.', 20, 'en')
+
+        self.assertEqual([len(chunk.split()) for chunk in chunks], [3, 20, 20, 5, 3])
+        self.assertEqual(' '.join(chunks[1:4]), long_sentence)
+
+    @override_settings(SUMMARIZER_CHUNK_TOKENS=20, SUMMARIZER_MAX_LEVELS=3)
+    def test_partial_summaries_are_reduced_level_by_level(self):
+        def summarizer(texts, **generate_kwargs):
+            return [' '.join(text.split()[:3]).rstrip('.') + '.' for text in texts]
+
+        generate_kwargs = get_generate_kwargs(100, language='en')
+        with mock.patch('core.inference.run_summarizer', side_effect=summarizer) as run:
+            final_text, stats = reduce_to_single_chunk(self.text, generate_kwargs)
+
+        # 15 chunks, their 15 partials fit into 3 chunks, those into one
+        self.assertEqual(stats, {'chunks': 15, 'levels': 3})
+        self.assertEqual([len(call.args[0]) for call in run.call_args_list], [15, 3])
+        self.assertEqual(final_text, 'Sentence 0 tells. Sentence 12 tells. Sentence 24 tells.')
+
+        with override_settings(SUMMARIZER_MAX_LEVELS=2), \
+                mock.patch('core.inference.run_summarizer', side_effect=summarizer):
+            final_text, stats = reduce_to_single_chunk(self.text, generate_kwargs)
+        self.assertEqual(stats, {'chunks': 15, 'levels': 2})
+        self.assertEqual(len(final_text.split()), 45)
+
+
+class ChunkSummaryTests(TestCase):
+    def test_only_changed_chunks_are_summarized_again(self):
+        generated = []
+
+        def fake_summarizer(texts, **generate_kwargs):
+            generated.extend(texts)
+            return [text.upper() for text in texts]
+
+        generate_kwargs = get_generate_kwargs(150, 50)
+        chunks = ['first chunk', 'second chunk', 'third chunk']
+        with mock.patch('core.inference.run_summarizer', fake_summarizer):
+            stats = {}
+            self.assertEqual(summarize_chunks(chunks, generate_kwargs, stats), [c.upper() for c in chunks])
+            self.assertEqual(stats['reused_chunks'], 0)
+
+            generated.clear()
+            edited = ['first chunk', 'second chunk, edited', 'third chunk']
+            self.assertEqual(summarize_chunks(edited, generate_kwargs, stats), [c.upper() for c in edited])
+
+        self.assertEqual(generated, ['second chunk, edited'])
+        self.assertEqual(stats['reused_chunks'], 2)
+        self.assertEqual(ChunkSummary.objects.count(), 4)
+
+        # Partial summaries made at another precision are not reused
+        key = chunk_summary_key('first chunk', generate_kwargs)
+        with override_settings(SUMMARIZER_PRECISION='int8'):
+            self.assertNotEqual(chunk_summary_key('first chunk', generate_kwargs), key)
+
+
+class NearDuplicateTests(TestCase):
+    article = ' '.join(
+        f'Sentence number {i} of the article reports on the {word} market and its prices.'
+        for i, word in enumerate(['grain', 'oil', 'steel', 'copper', 'cotton', 'coffee'] * 5)
+    )
+
+    model_name = 'summarizer:en_XX'
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='secret')
+
+    def test_finds_summary_of_edited_copy(self):
+        stored = Summary.objects.create(
+            user=self.user, original_text=self.article, summary_text='Prices.',
+            engine='transformer', model_name=self.model_name,
+        )
+        self.assertEqual(SummaryBand.objects.filter(summary=stored).count(), 16)
+
+        copy = '  '.join(self.article.split(' ')) + ' Read more at example.com/feed?utm_source=rss'
+        match = find_near_duplicate(copy, 'medium', False, self.model_name, self.user.id)
+        self.assertEqual(match.id, stored.id)
+        self.assertGreaterEqual(match.similarity, 0.85)
+
+        self.assertIsNone(find_near_duplicate(copy, 'short', False, self.model_name, self.user.id))
+        self.assertIsNone(find_near_duplicate(
+            'An unrelated text about the weather and football ' * 5, 'medium', False, self.model_name, self.user.id,
+        ))
+
+    def test_only_model_summaries_of_the_same_user_are_reused(self):
+        other = User.objects.create_user('other', password='secret')
+        Summary.objects.create(
+            user=other, original_text=self.article, summary_text='Private.',
+            engine='transformer', model_name=self.model_name,
+        )
+        Summary.objects.create(user=self.user, original_text=self.article, summary_text='Extractive.', engine='nltk')
+        Summary.objects.create(
+            user=self.user, original_text=self.article, summary_text='Other model.',
+            engine='transformer', model_name='other:tr_TR',
+        )
+
+        self.assertIsNone(find_near_duplicate(self.article, 'medium', False, self.model_name, self.user.id))
+        self.assertIsNone(find_near_duplicate(self.article, 'medium', False, self.model_name, None))
+        self.assertEqual(
+            find_near_duplicate(self.article, 'medium', False, self.model_name, other.id).summary_text, 'Private.',
+        )
+
+    def test_backfill_indexes_existing_rows(self):
+        Summary.objects.bulk_create([
+            Summary(user=self.user, original_text=self.article, summary_text='Prices.',
+                    engine='transformer', model_name=self.model_name),
+            # Saved before the engine was recorded
+            Summary(user=self.user, original_text=self.article, summary_text='Old.'),
+        ])
+        self.assertIsNone(find_near_duplicate(self.article, 'medium', False, self.model_name, self.user.id))
+
+        call_command('index_summaries', stdout=StringIO())
+
+        self.assertIsNotNone(find_near_duplicate(self.article, 'medium', False, self.model_name, self.user.id))
+        self.assertEqual(list(Summary.objects.filter(minhash__isnull=True).values_list('summary_text', flat=True)),
+                         ['Old.'])
+
+
+class CompressedTextTests(TestCase):
+    text = 'Ünlü şehrin tarihi merkezinde yeni bir müze açıldı. ' * 200
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='secret')
+        self.client.force_login(self.user)
+
+    def test_long_text_is_stored_once_and_streamed_back(self):
+        first = Summary.objects.create(user=self.user, original_text=self.text, summary_text='Müze.')
+        second = Summary.objects.create(user=self.user, original_text=self.text, summary_text='Müze.')
+
+        self.assertEqual(first.original_text, '')
+        self.assertEqual(first.original_blob_id, second.original_blob_id)
+        self.assertLess(len(first.original_blob.data), len(self.text) // 10)
+        self.assertTrue(first.preview.startswith('Ünlü şehrin'))
+
+        response = self.client.get(f'/history/{first.id}/original/')
+        self.assertEqual(b''.join(response.streaming_content).decode(), self.text)
+        response = self.client.get(f'/history/{first.id + 100}/original/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_command_compresses_rows_and_deletes_unused_texts(self):
+        Summary.objects.bulk_create([Summary(user=self.user, original_text=self.text, summary_text='Müze.')])
+        unused = TextBlob.store('Kullanılmayan metin.')
+
+        call_command('compress_texts', stdout=StringIO())
+
+        summary = Summary.objects.get()
+        self.assertEqual(summary.original_text, '')
+        self.assertEqual(summary.get_original_text(), self.text)
+        self.assertFalse(TextBlob.objects.filter(id=unused.id).exists())
+
+    @skipUnless(find_spec('zstandard'), 'zstd needs the zstandard package')
+    def test_command_recompresses_texts_with_the_configured_codec(self):
+        with override_settings(SUMMARIZER_TEXT_CODEC='zlib'):
+            summary = Summary.objects.create(user=self.user, original_text=self.text, summary_text='Müze.')
+
+        with override_settings(SUMMARIZER_TEXT_CODEC='zstd'):
+            call_command('compress_texts', stdout=StringIO())
+
+        summary = Summary.objects.select_related('original_blob').get(id=summary.id)
+        self.assertEqual(summary.original_blob.codec, 'zstd')
+        self.assertEqual(summary.get_original_text(), self.text)
+
+
+class FileUploadTests(TestCase):
+    paragraphs = [
+        f'Paragraph {i} explains how the {word} harvest depends on the weather of the spring.'
+        for i, word in enumerate(['wheat', 'barley', 'olive', 'grape', 'apple'] * 40)
+    ]
+
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='secret')
+        self.client.force_login(self.user)
+
+    # The page links static files, which have no manifest in tests
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_html_file_is_summarized_and_saved(self):
+        html = '<html><head><style>p {}</style></head><body>' + ''.join(
+            f'<p>{paragraph}</p>' for paragraph in self.paragraphs
+        ) + '<script>track();</script></body></html>'
+        upload = SimpleUploadedFile('report.html', html.encode(), content_type='text/html')
+
+        response = self.client.post('/', {'file': upload, 'text': '', 'engine': 'textrank', 'summary_length': 'short'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('harvest', response.context['summary_text'])
+        summary = Summary.objects.get(user=self.user)
+        text = summary.get_original_text()
+        self.assertEqual(text.split(), ' '.join(self.paragraphs).split())
+        self.assertNotIn('track', text)
+        self.assertEqual(bytes(summary.minhash), minhash_signature(text))
+        self.assertTrue(summary.preview.startswith('Paragraph 0'))
+
+    @override_settings(SUMMARIZER_COMPRESS_MIN_CHARS=1024)
+    def test_file_text_is_compressed_as_configured(self):
+        def save(text):
+            _, summary = summarize_file(BytesIO(text.encode()), 'text', engine='textrank', user_id=self.user.id)
+            return Summary.objects.select_related('original_blob').get(id=summary.id)
+
+        long_text = '\n'.join(self.paragraphs[:40])
+        summary = save(long_text)
+        self.assertEqual((summary.original_text, summary.get_original_text()), ('', long_text))
+
+        short_text = '\n'.join(self.paragraphs[:5])
+        summary = save(short_text)
+        self.assertEqual((summary.original_text, summary.original_blob), (short_text, None))
+
+        with override_settings(SUMMARIZER_COMPRESS_TEXT=False):
+            summary = save(long_text)
+        self.assertEqual((summary.original_text, summary.original_blob), (long_text, None))
+
+    @override_settings(SUMMARIZER_CHUNK_TOKENS=60, SUMMARIZER_BATCH_SIZE=4)
+    def test_partial_summaries_are_reduced_while_reading(self):
+        pieces = [paragraph + '\n' for paragraph in self.paragraphs] * 10
+        stats = {}
+
+        summary = summarize_text_pieces(pieces, summary_length='long', stats=stats, engine='textrank')
+
+        self.assertEqual(stats['words'], sum(len(piece.split()) for piece in pieces))
+        self.assertGreater(stats['levels'], 3)
+        # Bounded by a few batches of chunks, not by the length of the text
+        self.assertLess(len(summary.split()), 60 * 4 * stats['levels'])
+
+    @override_settings(SUMMARIZER_UPLOAD_DIR=tempfile.gettempdir(), SUMMARIZER_UPLOAD_MAX_BYTES=4096)
+    def test_upload_job_is_queued_within_limits(self):
+        response = self.client.post('/api/summarize/upload/', {
+            'file': SimpleUploadedFile('notes.docx', b'PK'),
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/summarize/upload/', {
+            'file': SimpleUploadedFile('notes.md', b'# Notes\n' * 1000),
+        })
+        self.assertEqual(response.status_code, 413)
+
+        response = self.client.post('/api/summarize/upload/', {
+            'file': SimpleUploadedFile('notes.md', '\n'.join(self.paragraphs[:10]).encode()),
+            'summary_length': 'long',
+            'engine': 'textrank',
+        })
+        self.assertEqual(response.status_code, 202)
+        job = SummaryJob.objects.get(id=response.json()['job_id'])
+        # Running the job deletes the file
+        self.addCleanup(lambda: os.path.exists(job.source_file) and os.remove(job.source_file))
+        self.assertEqual(
+            (job.source_name, job.summary_length, job.engine, job.text), ('notes.md', 'long', 'textrank', ''),
+        )
+        with open(job.source_file, 'rb') as f:
+            self.assertEqual(f.read(), '\n'.join(self.paragraphs[:10]).encode())
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['progress'], 0)
+
+        def summarize_file(f, kind, stats, **kwargs):
+            stats['truncated'] = False
+            return 'Summary.', None
+
+        with mock.patch('core.uploads.summarize_file', side_effect=summarize_file) as summarize:
+            run_job(job.pk)
+        self.assertEqual(summarize.call_args.kwargs['engine'], 'textrank')
+        self.assertFalse(os.path.exists(job.source_file))
+
+
+class SummaryJobTests(TestCase):
+    text = 'The council approved the budget on Monday. It funds new schools. Critics called it too small.'
+
+    @override_settings(SUMMARY_JOB_TIMEOUT=600)
+    def test_jobs_of_dead_workers_are_claimed_again(self):
+        now = timezone.now()
+        running = SummaryJob.objects.create(
+            text=self.text, status=SummaryJob.STATUS_RUNNING, started_at=now - timedelta(minutes=5),
+            created_at=now - timedelta(hours=2),
+        )
+        stale = SummaryJob.objects.create(
+            text=self.text, status=SummaryJob.STATUS_RUNNING, started_at=now - timedelta(minutes=20),
+            created_at=now - timedelta(hours=1),
+        )
+        pending = SummaryJob.objects.create(text=self.text)
+
+        self.assertEqual([claim_next_job(), claim_next_job(), claim_next_job()], [stale.pk, pending.pk, None])
+        stale.refresh_from_db()
+        self.assertGreater(stale.started_at, now)
+
+        # A worker finishing after its claim was taken over leaves the job to the new one
+        def taken_over(*args, **kwargs):
+            SummaryJob.objects.filter(pk=running.pk).update(started_at=timezone.now())
+            return 'Summary.'
+
+        with mock.patch('core.jobs.summarize_text', side_effect=taken_over):
+            run_job(running.pk, claimed=True)
+        with mock.patch('core.jobs.summarize_text', return_value='Summary.'):
+            run_job(stale.pk, claimed=True)
+        running.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertEqual((running.status, running.result), (SummaryJob.STATUS_RUNNING, ''))
+        self.assertEqual((stale.status, stale.result), (SummaryJob.STATUS_DONE, 'Summary.'))
+
+    def test_file_stays_until_the_job_is_finished(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+            f.write(self.text)
+        self.addCleanup(lambda: os.path.exists(f.name) and os.remove(f.name))
+        job = SummaryJob.objects.create(
+            source_file=f.name, source_name='notes.txt', status=SummaryJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+
+        def summarize_file(f, kind, stats, **kwargs):
+            stats['truncated'] = False
+            return 'Summary.', None
+
+        def taken_over(*args, **kwargs):
+            SummaryJob.objects.filter(pk=job.pk).update(started_at=timezone.now())
+            return summarize_file(*args, **kwargs)
+
+        with mock.patch('core.uploads.summarize_file', side_effect=taken_over):
+            run_job(job.pk, claimed=True)
+        self.assertTrue(os.path.exists(f.name))
+
+        with mock.patch('core.uploads.summarize_file', side_effect=summarize_file):
+            run_job(job.pk, claimed=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, SummaryJob.STATUS_DONE)
+        self.assertFalse(os.path.exists(f.name))
+
+    def test_pool_thread_runs_jobs_left_by_a_dead_worker(self):
+        orphan = SummaryJob.objects.create(text=self.text, created_at=timezone.now() - timedelta(hours=1))
+        job = SummaryJob.objects.create(text=self.text)
+
+        with mock.patch('core.jobs.summarize_text', return_value='Summary.'), \
+                mock.patch('core.jobs.close_old_connections'):
+            _run_in_thread(job.pk)
+
+        self.assertEqual(
+            list(SummaryJob.objects.filter(pk__in=[orphan.pk, job.pk]).values_list('status', flat=True)),
+            [SummaryJob.STATUS_DONE] * 2,
+        )
+
+    def test_clients_submit_jobs_with_the_token_of_the_csrf_endpoint(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(User.objects.create_user('integration'))
+
+        self.assertEqual(client.post('/api/jobs/', {'text': self.text}).status_code, 403)
+        token = client.get('/api/csrf/').json()['csrf_token']
+        self.assertEqual(client.post('/api/jobs/', {'text': self.text}, HTTP_X_CSRFTOKEN=token).status_code, 202)
@@ -0,0 +1,134 @@
+"""Summarizing uploaded files with bounded memory.
+
+An upload is extracted (``core.extraction``) and summarized
+(``summarize_text_pieces``) a piece at a time. To save it as a Summary of
+a registered user, its text is kept as it goes by, compressed once it is
+long enough, with its MinHash signature and the start of it for the preview.
+"""
+import os
+import shutil
+import uuid
+
+from django.conf import settings
+
+from .compression import StreamCompressor
+from .extraction import file_kind, iter_file_text
+from .inference import summarize_text_pieces, summary_origin
+
+# Characters kept from the start of a text for its preview
+HEAD_CHARS = 4096
+
+
+class UploadError(Exception):
+    """An upload that can't be summarized; the message can be shown to the user."""
+
+
+def check_upload(upload):
+    """Return the kind of an uploaded file, or raise ``UploadError``."""
+    kind = file_kind(upload.name)
+    if kind is None:
+        raise UploadError('Unsupported file type.')
+    if upload.size > settings.SUMMARIZER_UPLOAD_MAX_BYTES:
+        raise UploadError(f'The file is larger than {settings.SUMMARIZER_UPLOAD_MAX_BYTES // 2 ** 20} MB.')
+    return kind
+
+
+def spool_upload(upload):
+    """Copy an uploaded file to SUMMARIZER_UPLOAD_DIR for a job; return its path."""
+    os.makedirs(settings.SUMMARIZER_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.SUMMARIZER_UPLOAD_DIR, uuid.uuid4().hex)
+    upload.seek(0)
+    with open(path, 'wb') as f:
+        shutil.copyfileobj(upload, f)
+    return path
+
+
+class TextRecorder:
+    """Pass the pieces of a text through, up to ``max_chars`` characters.
+
+    With ``keep`` the text is kept and MinHashed as it goes by, so it can be
+    saved afterwards. Like ``Summary.prepare_text`` it is compressed when
+    SUMMARIZER_COMPRESS_TEXT is on and it reaches
+    SUMMARIZER_COMPRESS_MIN_CHARS characters; from then on it is never held
+    as a whole.
+    """
+
+    def __init__(self, max_chars, keep=False):
+        from .dedup import MinHasher
+
+        self.max_chars = max_chars
+        self.size = 0
+        self.truncated = False
+        self.head = ''
+        # The text as it came, until it is compressed
+        self.pieces = [] if keep else None
+        self.compressor = None
+        self.hasher = MinHasher() if keep and settings.SUMMARIZER_DEDUP else None
+
+    def record(self, pieces):
+        for piece in pieces:
+            if self.size + len(piece) > self.max_chars:
+                piece = piece[:self.max_chars - self.size]
+                self.truncated = True
+            self.size += len(piece)
+            if len(self.head) < HEAD_CHARS:
+                self.head += piece[:HEAD_CHARS - len(self.head)]
+            if self.compressor is not None:
+                self.compressor.write(piece)
+            elif self.pieces is not None:
+                self.pieces.append(piece)
+                if settings.SUMMARIZER_COMPRESS_TEXT and self.size >= settings.SUMMARIZER_COMPRESS_MIN_CHARS:
+                    self.compressor = StreamCompressor(settings.SUMMARIZER_TEXT_CODEC)
+                    for kept in self.pieces:
+                        self.compressor.write(kept)
+                    self.pieces = None
+            if self.hasher is not None:
+                self.hasher.update(piece)
+            if piece:
+                yield piece
+            if self.truncated:
+                return
+
+    def save_summary(self, **fields):
+        """Save a Summary of the recorded text with the given fields."""
+        from .models import Summary, TextBlob, make_preview
+
+        if self.compressor is not None:
+            text = {'original_text': '', 'original_blob': TextBlob.store_stream(self.compressor)}
+        else:
+            text = {'original_text': ''.join(self.pieces)}
+        return Summary.objects.create(
+            **text,
+            preview=make_preview(self.head),
+            minhash=self.hasher.signature() if self.hasher is not None else None,
+            **fields,
+        )
+
+
+def summarize_file(f, kind, bullet_points=False, summary_length='medium', engine='transformer',
+                   user_id=None, stats=None, progress=None):
+    """Summarize a file opened in binary mode; return the summary and the saved Summary.
+
+    A Summary is saved for the user ``user_id`` unless it is None or the
+    summary is empty; its text is stored compressed as configured. Only the first
+    SUMMARIZER_UPLOAD_MAX_CHARS characters of the text are read;
+    ``stats['truncated']`` tells whether there were more. ``progress`` is
+    called with the fraction of the file read so far.
+    """
+    if stats is None:
+        stats = {}
+    recorder = TextRecorder(settings.SUMMARIZER_UPLOAD_MAX_CHARS, keep=user_id is not None)
+    pieces = recorder.record(iter_file_text(f, kind, progress))
+    summary_text = summarize_text_pieces(pieces, bullet_points, summary_length, stats, engine)
+    stats['truncated'] = recorder.truncated
+
+    summary = None
+    if user_id is not None and summary_text.strip():
+        summary = recorder.save_summary(
+            user_id=user_id,
+            summary_text=summary_text,
+            bullet_points=bullet_points,
+            summary_length=summary_length,
+            **summary_origin(stats)
+        )
+    return summary_text, summary
@@ -8,5 +8,18 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.custom_logout, name='logout'),
     path('history/', views.history_view, name='history'),
+    path('history/json/', views.history_api, name='history_api'),
     path('delete-summary/<int:summary_id>/', views.delete_summary, name='delete_summary'),
+    path('history/<int:summary_id>/original/', views.original_text_view, name='original_text'),
+    path('cache-stats/', views.summary_cache_stats, name='summary_cache_stats'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('stream/', views.summarize_stream, name='summarize_stream'),
+    path('api/csrf/', views.csrf_token_api, name='csrf_token_api'),
+    path('api/summarize/', views.summarize_text_api, name='summarize_text_api'),
+    path('api/summarize/batch/', views.summarize_batch_api, name='summarize_batch_api'),
+    path('api/jobs/', views.submit_summary_job, name='submit_summary_job'),
+    path('api/summarize/upload/', views.submit_upload_job, name='submit_upload_job'),
+    path('api/jobs/<uuid:job_id>/', views.summary_job_status, name='summary_job_status'),
+    path('health/', views.health, name='health'),
+    path('health/ready/', views.readiness, name='readiness'),
 ] 
\ No newline at end of file
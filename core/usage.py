@@ -0,0 +1,131 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class UsageBuffer:
+    """Record guest requests in memory and write them to GuestUsage in batches.
+
+    Events are flushed with one ``bulk_create`` once ``max_size`` of them are
+    waiting, or by a background thread every ``flush_interval`` seconds, and
+    again when the process exits. Requests are also counted per IP address
+    in a sliding window of ``window`` seconds, which admission control
+    reads without a query (see ``core.admission``). The counts only cover
+    this process.
+    """
+
+    def __init__(self, max_size=100, flush_interval=5.0, window=3600):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.window = window
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.events = []
+        # ip -> [window number, count in that window, count in the one before]
+        self.counters = {}
+        self.pid = None
+        self.flushed = 0
+        self.failures = 0
+
+    def record(self, ip_address):
+        """Record one guest request; return the number of requests of that IP in the window."""
+        now = timezone.now()
+        with self.lock:
+            self._start()
+            self.events.append((ip_address, now))
+            count = self._count(ip_address, time.time(), increment=1)
+            full = len(self.events) >= self.max_size
+        if full:
+            self.flush()
+        return count
+
+    def count(self, ip_address):
+        """Return the number of requests of an IP address in the sliding window."""
+        with self.lock:
+            return self._count(ip_address, time.time())
+
+    def _count(self, ip_address, now, increment=0):
+        current = int(now // self.window)
+        counter = self.counters.get(ip_address)
+        if counter is None or counter[0] < current - 1:
+            counter = self.counters[ip_address] = [current, 0, 0]
+        elif counter[0] == current - 1:
+            counter[:] = [current, 0, counter[1]]
+        counter[1] += increment
+        # Weigh the previous window by how much of it still overlaps
+        overlap = 1 - (now / self.window - current)
+        return counter[1] + int(counter[2] * overlap)
+
+    def _start(self):
+        # The flush thread does not survive a fork, so each worker starts its own
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.events = []
+            self.counters = {}
+            thread = threading.Thread(target=self._run, name='guest-usage-flush', daemon=True)
+            thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+            self._prune()
+
+    def _prune(self):
+        """Forget IP addresses that have not been seen for two windows."""
+        current = int(time.time() // self.window)
+        with self.lock:
+            for ip_address in [ip for ip, counter in self.counters.items() if counter[0] < current - 1]:
+                del self.counters[ip_address]
+
+    def flush(self):
+        """Write the waiting events to the database; return how many were written."""
+        from .models import GuestUsage
+
+        with self.flush_lock:
+            with self.lock:
+                events, self.events = self.events, []
+            if not events:
+                return 0
+            try:
+                GuestUsage.objects.bulk_create(
+                    [GuestUsage(ip_address=ip_address, timestamp=timestamp) for ip_address, timestamp in events],
+                    batch_size=500,
+                )
+            except Exception:
+                logger.exception("Guest usage flush error")
+                self.failures += 1
+                with self.lock:
+                    # Keep the events for the next flush, but never more than a few batches
+                    self.events = (events + self.events)[-self.max_size * 10:]
+                return 0
+            self.flushed += len(events)
+            return len(events)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pending': len(self.events),
+                'flushed': self.flushed,
+                'failures': self.failures,
+                'tracked_ips': len(self.counters),
+            }
+
+
+guest_usage = UsageBuffer(
+    max_size=settings.GUEST_USAGE_BUFFER_SIZE,
+    flush_interval=settings.GUEST_USAGE_FLUSH_SECONDS,
+    window=settings.GUEST_USAGE_WINDOW,
+)
+atexit.register(guest_usage.flush)
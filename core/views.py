@@ -1,163 +1,46 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.utils import timezone
+from django.middleware.csrf import get_token
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.utils.crypto import constant_time_compare
+from django.utils.formats import date_format
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.db.models import Q
 from .forms import TextForm
-from .models import Summary, GuestUsage
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
-from string import punctuation
-import re
-import math
-from collections import defaultdict
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
-import os
-from django.http import JsonResponse
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('averaged_perceptron_tagger')
-
-# Initialize the model and tokenizer
-tokenizer = None
-model = None
-summarizer = None
-
-def load_model():
-    """Load the model only when needed."""
-    global tokenizer, model, summarizer
-    if summarizer is None:
-        try:
-            model_name = "facebook/mbart-large-50-many-to-many-mmt"
-            tokenizer = AutoTokenizer.from_pretrained(model_name)
-            model = AutoModelForSeq2SeqLM.from_pretrained(model_name, device_map='auto', low_cpu_mem_usage=True)
-            summarizer = pipeline("summarization", model=model, tokenizer=tokenizer)
-        except Exception as e:
-            print(f"Model loading error: {e}")
-            return False
-    return True
-
-def is_turkish_text(text):
-    """Check if the text contains Turkish characters."""
-    turkish_chars = set('çÇğĞıİöÖşŞüÜ')
-    return any(char in turkish_chars for char in text)
-
-def get_stop_words():
-    """Get stop words for both English and Turkish."""
-    stop_words = set(stopwords.words('english'))
-    turkish_stop_words = {
-        'acaba', 'ama', 'aslında', 'az', 'bazı', 'belki', 'biri', 'birkaç', 'birşey',
-        'biz', 'bu', 'çok', 'çünkü', 'da', 'daha', 'de', 'defa', 'diye', 'eğer', 'en',
-        'gibi', 'hem', 'hep', 'hepsi', 'her', 'hiç', 'için', 'ile', 'ise', 'kez', 'ki',
-        'kim', 'mı', 'mu', 'mü', 'nasıl', 'ne', 'neden', 'nerde', 'nerede', 'nereye',
-        'niçin', 'niye', 'o', 'sanki', 'şey', 'siz', 'şu', 'tüm', 've', 'veya', 'ya',
-        'yani'
-    }
-    stop_words.update(turkish_stop_words)
-    stop_words.update(punctuation)
-    return stop_words
-
-def summarize_text(text, bullet_points=False, summary_length='medium'):
-    """Summarize the given text using Hugging Face's Turkish model."""
-    # Clean and preprocess text
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    if not text:
-        return ""
-    
-    try:
-        # Try using Hugging Face model first
-        if load_model() and summarizer is not None:
-            # Set max length based on summary_length parameter
-            if summary_length == 'short':
-                max_length = 50
-            elif summary_length == 'long':
-                max_length = 150
-            else:  # medium
-                max_length = 100
-            
-            # Generate summary
-            summary = summarizer(text, max_length=max_length, min_length=30, do_sample=False)[0]['summary_text']
-            
-            # Format as bullet points if requested
-            if bullet_points:
-                # Split into sentences and clean them
-                sentences = re.split(r'[.!?]+', summary)
-                sentences = [s.strip() for s in sentences if s.strip()]
-                
-                # Format each sentence as a bullet point
-                bullet_points_list = ['• ' + sentence for sentence in sentences]
-                return '\n'.join(bullet_points_list)
-            else:
-                return summary
-        else:
-            # Fallback to NLTK if model loading fails
-            return summarize_text_nltk(text, bullet_points, summary_length)
-            
-    except Exception as e:
-        print(f"Summarization error: {e}")
-        # Fallback to NLTK if there's an error
-        return summarize_text_nltk(text, bullet_points, summary_length)
-
-def summarize_text_nltk(text, bullet_points=False, summary_length='medium'):
-    """Generate a summary using NLTK as fallback."""
-    # Tokenize the text into sentences
-    sentences = sent_tokenize(text)
-    
-    # Remove special characters and convert to lowercase
-    text = re.sub(r'[^\w\s]', '', text.lower())
-    
-    # Tokenize words
-    words = word_tokenize(text)
-    
-    # Remove stopwords and punctuation
-    stop_words = get_stop_words()
-    words = [word for word in words if word not in stop_words]
-    
-    # Calculate word frequencies
-    word_freq = defaultdict(int)
-    for word in words:
-        word_freq[word] += 1
-    
-    # Calculate sentence scores based on word frequencies
-    sentence_scores = defaultdict(int)
-    for sentence in sentences:
-        for word in word_tokenize(sentence.lower()):
-            if word in word_freq:
-                sentence_scores[sentence] += word_freq[word]
-    
-    # Select top sentences based on summary length
-    num_sentences = len(sentences)
-    if summary_length == 'short':
-        num_summary = max(1, num_sentences // 4)
-    elif summary_length == 'long':
-        num_summary = max(2, num_sentences // 2)
-    else:  # medium
-        num_summary = max(1, num_sentences // 3)
-    
-    # Get top sentences
-    summary_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:num_summary]
-    summary_sentences = [s[0] for s in summary_sentences]
-    
-    # Sort sentences by their original order
-    summary_sentences.sort(key=lambda x: sentences.index(x))
-    
-    # Format as bullet points if requested
-    if bullet_points:
-        return '\n'.join(['• ' + sentence for sentence in summary_sentences])
-    else:
-        return ' '.join(summary_sentences)
+from .models import Summary, SummaryJob
+from .jobs import enqueue_job
+from . import inference
+from .inference import (
+    format_bullet_points, generate_summary, get_model_status, stream_summary, summarize_text, summarize_texts,
+    summary_origin,
+)
+from .dedup import index_summaries
+from .extraction import pdf_supported
+from .language import detect_language
+from .resources import normalize_whitespace
+from .summary_cache import make_cache_key
+from .uploads import UploadError, check_upload, spool_upload, summarize_file
+from .usage import guest_usage
+from .admission import Rejected, RateLimited, admission, client_key, estimate_tokens
+from .metrics import ERRORS, render_metrics, stage
+import logging
+import threading
+import json
+from datetime import datetime
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+
+logger = logging.getLogger(__name__)
+
+# Room for the other fields of an upload form
+UPLOAD_FORM_BYTES = 64 * 1024
 
 def register_view(request):
     if request.method == 'POST':
@@ -191,8 +74,76 @@ def login_view(request):
 
 @login_required
 def history_view(request):
-    summaries = Summary.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, 'core/history.html', {'summaries': summaries})
+    summaries, next_cursor = get_history_page(request.user, request.GET.get('cursor'))
+    return render(request, 'core/history.html', {'summaries': summaries, 'next_cursor': next_cursor})
+
+@login_required
+def history_api(request):
+    """Return a page of the user's summaries as JSON, for infinite scrolling."""
+    cursor = request.GET.get('cursor')
+    if cursor and decode_history_cursor(cursor) is None:
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=400)
+
+    summaries, next_cursor = get_history_page(request.user, cursor)
+    return JsonResponse({
+        'results': [{
+            'id': summary.id,
+            'created_at': summary.created_at.isoformat(),
+            'date': date_format(summary.created_at, 'F j, Y'),
+            'summary_length': summary.summary_length,
+            'bullet_points': summary.bullet_points,
+            'preview': summary.preview,
+            'summary': summary.summary_text,
+            'delete_url': reverse('delete_summary', args=[summary.id]),
+            'original_url': reverse('original_text', args=[summary.id]),
+        } for summary in summaries],
+        'next_cursor': next_cursor,
+    })
+
+def encode_history_cursor(summary):
+    """Encode the (created_at, id) position after a summary as an opaque cursor."""
+    position = f'{summary.created_at.isoformat()}|{summary.id}'
+    return urlsafe_base64_encode(position.encode())
+
+def decode_history_cursor(cursor):
+    """Return the (created_at, id) position of a cursor, or None if it is invalid."""
+    try:
+        created_at, summary_id = urlsafe_base64_decode(cursor).decode().split('|')
+        created_at = datetime.fromisoformat(created_at)
+        summary_id = int(summary_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    # Cursors are only ever made from aware datetimes
+    if created_at.tzinfo is None:
+        return None
+    return created_at, summary_id
+
+def get_history_page(user, cursor=None):
+    """Return a page of a user's summaries, newest first, and the cursor of the next.
+
+    Pages are found by keyset: the page after a cursor holds the summaries
+    ordered before its (created_at, id), so the cost of a page does not grow
+    with the number of pages before it. The full original text is never
+    loaded; lists show the stored preview.
+    """
+    page_size = settings.HISTORY_PAGE_SIZE
+    summaries = (
+        Summary.objects.filter(user=user)
+        .defer('original_text', 'minhash')
+        .order_by('-created_at', '-id')
+    )
+    position = decode_history_cursor(cursor) if cursor else None
+    if position is not None:
+        created_at, summary_id = position
+        summaries = summaries.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=summary_id)
+        )
+
+    # One extra row tells whether there is a next page
+    summaries = list(summaries[:page_size + 1])
+    if len(summaries) > page_size:
+        return summaries[:page_size], encode_history_cursor(summaries[page_size - 1])
+    return summaries, None
 
 @login_required
 def delete_summary(request, summary_id):
@@ -204,6 +155,26 @@ def delete_summary(request, summary_id):
         messages.error(request, 'Summary not found.')
     return redirect('history')
 
+@login_required
+def original_text_view(request, summary_id):
+    """Stream the full original text of a saved summary as plain text.
+
+    A compressed text is decompressed piece by piece as it is sent.
+    """
+    try:
+        summary = (
+            Summary.objects.select_related('original_blob')
+            .only('id', 'original_text', 'original_blob')
+            .get(id=summary_id, user=request.user)
+        )
+    except Summary.DoesNotExist:
+        raise Http404('Summary not found.')
+
+    stream = summary.iter_original_text()
+    if isinstance(request, ASGIRequest):
+        stream = _iterate_in_thread(stream)
+    return StreamingHttpResponse(stream, content_type='text/plain; charset=utf-8')
+
 def is_meaningful_text(text):
     """Check if the text is meaningful enough to summarize."""
     # Count words
@@ -212,6 +183,17 @@ def is_meaningful_text(text):
     # Check if text has at least 3 words
     return len(words) >= 3
 
+def get_engine(request):
+    """Return the summarizer engine picked in the request, the model by default."""
+    engine = request.POST.get('engine', 'transformer')
+    return engine if engine in inference.EXTRACTIVE_ENGINE_NAMES else 'transformer'
+
+def render_home(request, context, **kwargs):
+    """Render the home page, timed as the render stage."""
+    context.update(pdf_supported=pdf_supported(), upload_max_mb=settings.SUMMARIZER_UPLOAD_MAX_BYTES // 2 ** 20)
+    with stage('render'):
+        return render(request, 'core/home.html', context, **kwargs)
+
 def home(request):
     context = {}
     
@@ -223,6 +205,7 @@ def home(request):
         text = request.POST.get('text', '').strip()
         summary_length = request.POST.get('summary_length', 'medium')
         bullet_points = request.POST.get('bullet_points') == 'on'
+        engine = get_engine(request)
         
         # Force medium length for guests
         if not request.user.is_authenticated and summary_length != 'medium':
@@ -232,98 +215,602 @@ def home(request):
         context.update({
             'original_text': text,
             'summary_length': summary_length,
-            'bullet_points': bullet_points
+            'bullet_points': bullet_points,
+            'engine': engine
         })
         
+        upload = request.FILES.get('file')
+        if upload is not None and not text:
+            return summarize_upload_page(request, upload, context)
+
         if not text:
             messages.error(request, 'Please enter some text to summarize.')
-            return render(request, 'core/home.html', context)
+            return render_home(request, context)
+
+        try:
+            ticket = admission.admit(client_key(request), text, engine)
+        except Rejected as e:
+            messages.error(request, 'Too many requests. Please wait a few seconds and try again.')
+            response = render_home(request, context, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        if ticket.degraded:
+            messages.info(request, 'The server is busy, so this is a quick extractive summary.')
 
+        stats = {}
         try:
             # Generate summary based on user type
             if not request.user.is_authenticated:
                 # Track guest usage
-                GuestUsage.objects.create(
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    timestamp=timezone.now()
-                )
+                guest_usage.record(request.META.get('REMOTE_ADDR'))
                 
                 # Generate summary for guest (without bullet points and force medium length)
-                summary_text = summarize_text(text, bullet_points=False, summary_length='medium')
+                with ticket:
+                    summary_text = summarize_text(text, bullet_points=False, summary_length='medium', engine=ticket.engine)
             else:
                 # Generate summary for logged-in user (with all features)
-                summary_text = summarize_text(text, bullet_points=bullet_points, summary_length=summary_length)
+                with ticket:
+                    summary_text = summarize_text(
+                        text, bullet_points=bullet_points, summary_length=summary_length, stats=stats,
+                        engine=ticket.engine, user_id=request.user.id,
+                    )
                 
                 # Save summary for logged-in users
-                Summary.objects.create(
-                    user=request.user,
-                    original_text=text,
-                    summary_text=summary_text,
-                    bullet_points=bullet_points,
-                    summary_length=summary_length
-                )
+                with stage('db'):
+                    Summary.objects.create(
+                        user=request.user,
+                        original_text=text,
+                        summary_text=summary_text,
+                        bullet_points=bullet_points,
+                        summary_length=summary_length,
+                        **summary_origin(stats)
+                    )
             
             if not summary_text.strip():
                 messages.error(request, 'Could not generate a summary. Please try with different text.')
-                return render(request, 'core/home.html', context)
+                return render_home(request, context)
             
             # Add summary to context
             context['summary_text'] = summary_text
-            return render(request, 'core/home.html', context)
+            return render_home(request, context)
             
         except Exception as e:
+            logger.exception("Summarization request failed")
+            ERRORS.inc('request')
             messages.error(request, 'An error occurred while generating the summary. Please try again.')
-            return render(request, 'core/home.html', context)
+            return render_home(request, context)
+        finally:
+            ticket.release()
+
+    return render_home(request, context)
+
+def sse_event(event, data):
+    """Encode one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _iterate_in_thread(iterator):
+    """Serve a blocking iterator to an ASGI server without buffering it."""
+    done = object()
+    try:
+        while True:
+            item = await sync_to_async(next, thread_sensitive=False)(iterator, done)
+            if item is done:
+                break
+            yield item
+    finally:
+        await sync_to_async(iterator.close, thread_sensitive=False)()
+
+class ReleasingStream:
+    """Iterate over a response stream and release its admission ticket once closed.
+
+    The ticket is released even if the stream is closed before it was ever
+    iterated, which a generator's ``finally`` would not see.
+    """
+
+    def __init__(self, stream, ticket):
+        self.stream = stream
+        self.ticket = ticket
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.stream)
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self.ticket.release()
+
+def rejected_response(e, message):
+    """Return the 429 answer to a request that was not admitted."""
+    response = JsonResponse({'error': message}, status=429)
+    response['Retry-After'] = str(e.retry_after)
+    return response
+
+def summarize_upload_page(request, upload, context):
+    """Summarize an uploaded file for the home page when the page can't poll a job."""
+    try:
+        kind = check_upload(upload)
+    except UploadError as e:
+        messages.error(request, str(e))
+        return render_home(request, context, status=400)
+
+    try:
+        key = client_key(request)
+        ticket = admission.admit(key, None, context['engine'], cost=admission.file_cost(key, upload.size))
+    except Rejected as e:
+        messages.error(request, 'Too many requests. Please wait a few seconds and try again.')
+        response = render_home(request, context, status=429)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+
+    user_id = request.user.id if request.user.is_authenticated else None
+    if user_id is None:
+        # Guests get medium length summaries without bullet points
+        guest_usage.record(request.META.get('REMOTE_ADDR'))
+        context.update(summary_length='medium', bullet_points=False)
+    stats = {}
+    try:
+        with ticket:
+            summary_text, _ = summarize_file(
+                upload, kind,
+                bullet_points=context['bullet_points'],
+                summary_length=context['summary_length'],
+                engine=ticket.engine,
+                user_id=user_id,
+                stats=stats,
+            )
+    except Exception:
+        logger.exception("File summarization request failed")
+        ERRORS.inc('request')
+        messages.error(request, 'An error occurred while generating the summary. Please try again.')
+        return render_home(request, context)
+    finally:
+        ticket.release()
 
-    return render(request, 'core/home.html', context)
+    if not summary_text.strip():
+        messages.error(request, 'Could not generate a summary. Please try with a different file.')
+    elif stats['truncated']:
+        messages.info(request, 'The file was too long, so only its beginning was summarized.')
+    context['summary_text'] = summary_text
+    return render_home(request, context)
+
+def summarize_stream(request):
+    """Stream the summary of the posted text as server-sent events.
+
+    Sends a ``token`` event for every decoded piece, then a ``done`` event
+    with the final (possibly bullet formatted) summary. When the client goes
+    away the response is closed and generation is cancelled.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=405)
+
+    text = normalize_whitespace(request.POST.get('text', ''))
+    summary_length = request.POST.get('summary_length', 'medium')
+    bullet_points = request.POST.get('bullet_points') == 'on'
+    engine = get_engine(request)
+
+    if not text:
+        return JsonResponse({'error': 'Please enter some text to summarize.'}, status=400)
+
+    try:
+        ticket = admission.admit(client_key(request), text, engine)
+    except Rejected as e:
+        return rejected_response(e, 'Too many requests. Please wait a few seconds and try again.')
+    engine = ticket.engine
+
+    user = request.user if request.user.is_authenticated else None
+    if user is None:
+        # Track guest usage; guests get medium length without bullet points
+        guest_usage.record(request.META.get('REMOTE_ADDR'))
+        summary_length = 'medium'
+        bullet_points = False
+
+    def events():
+        cancelled = threading.Event()
+        stats = {}
+        language = detect_language(text)
+        model_name = inference.cache_model_name(language)
+        if engine in inference.EXTRACTIVE_ENGINE_NAMES:
+            use_model = False
+            key = make_cache_key(text, summary_length, bullet_points, model_name, engine)
+        else:
+            use_model = inference.model_available(language)
+            key = make_cache_key(text, summary_length, bullet_points, model_name, 'transformer' if use_model else 'nltk')
+        try:
+            cached = inference.summary_cache.get(key)
+            reused = None
+            if cached is None and use_model:
+                reused = inference.reuse_near_duplicate(
+                    text, summary_length, bullet_points, language, user.id if user is not None else None,
+                )
+            if cached is not None or reused is not None:
+                summary, stats = cached or reused
+                yield sse_event('token', {'text': summary})
+            elif use_model:
+                pieces = []
+                for piece in stream_summary(text, summary_length, cancelled, stats, language):
+                    pieces.append(piece)
+                    yield sse_event('token', {'text': piece})
+                summary = ''.join(pieces).strip()
+                if bullet_points:
+                    summary = format_bullet_points(summary)
+                inference.summary_cache.set(key, (summary, dict(stats)))
+            else:
+                # Extractive engines have nothing to stream; send it in one piece
+                summary = generate_summary(text, bullet_points, summary_length, False, stats, engine, language)
+                yield sse_event('token', {'text': summary})
+
+            if not summary.strip():
+                yield sse_event('error', {'error': 'Could not generate a summary. Please try with different text.'})
+                return
+
+            if user is not None:
+                with stage('db'):
+                    Summary.objects.create(
+                        user=user,
+                        original_text=text,
+                        summary_text=summary,
+                        bullet_points=bullet_points,
+                        summary_length=summary_length,
+                        **summary_origin(dict(stats, language=language))
+                    )
+            yield sse_event('done', {
+                'summary': summary,
+                'engine': stats.get('engine'),
+                'language': language,
+                'degraded': ticket.degraded,
+            })
+        except Exception:
+            logger.exception("Streaming summarization error")
+            ERRORS.inc('stream')
+            yield sse_event('error', {'error': 'An error occurred while generating the summary. Please try again.'})
+        finally:
+            # Also reached when the client disconnects and the response is closed
+            cancelled.set()
+            ticket.release()
+
+    stream = ReleasingStream(events(), ticket)
+    if isinstance(request, ASGIRequest):
+        stream = _iterate_in_thread(stream)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 def custom_logout(request):
     logout(request)
     messages.success(request, 'You have been successfully logged out.')
     return redirect('login')
 
+def health(request):
+    """Liveness check that also reports the model load state."""
+    return JsonResponse({'status': 'ok', 'model': get_model_status()})
+
+def readiness(request):
+    """Readiness check: 200 once the model is loaded and warmed up, 503 before."""
+    status = get_model_status()
+    return JsonResponse({'ready': status['status'] == 'ready', 'model': status},
+                        status=200 if status['status'] == 'ready' else 503)
+
+@staff_member_required
+def summary_cache_stats(request):
+    return JsonResponse(dict(inference.summary_cache.stats(), admission=admission.stats(), guest_usage=guest_usage.stats()))
+
+def metrics(request):
+    """Serve the summarizer metrics of this worker in the Prometheus text format."""
+    if not settings.METRICS_ENABLED:
+        return HttpResponse(status=404)
+    if settings.METRICS_TOKEN:
+        authorized = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}')
+    else:
+        authorized = request.user.is_active and request.user.is_staff
+    if not authorized:
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@ensure_csrf_cookie
+def csrf_token_api(request):
+    """Give a client outside the browser the CSRF token the API posts need.
+
+    The token is also set as the ``csrftoken`` cookie; send both back, the
+    token in the ``X-CSRFToken`` header.
+    """
+    return JsonResponse({'csrf_token': get_token(request)})
+
 def summarize_text_api(request):
     if request.method == 'POST':
         text = request.POST.get('text', '')
         summary_length = request.POST.get('summary_length', 'medium')
         use_bullets = request.POST.get('use_bullets', 'false') == 'true'
+        engine = get_engine(request)
         
         if not text:
             return JsonResponse({'error': 'Lütfen özetlenecek bir metin girin.'})
             
-        if not load_model():
-            return JsonResponse({'error': 'Model yüklenemedi. Lütfen daha sonra tekrar deneyin.'})
-            
+        try:
+            ticket = admission.admit(client_key(request), text, engine)
+        except Rejected as e:
+            return rejected_response(e, 'Çok fazla istek gönderildi. Lütfen biraz sonra tekrar deneyin.')
+
+        stats = {}
         try:
             # Generate summary based on user type
             if not request.user.is_authenticated:
                 # Track guest usage
-                GuestUsage.objects.create(
-                    ip_address=request.META.get('REMOTE_ADDR'),
-                    timestamp=timezone.now()
-                )
+                guest_usage.record(request.META.get('REMOTE_ADDR'))
                 
                 # Generate summary for guest (without bullet points and force medium length)
-                summary_text = summarize_text(text, bullet_points=False, summary_length='medium')
+                with ticket:
+                    summary_text = summarize_text(text, bullet_points=False, summary_length='medium', stats=stats, engine=ticket.engine)
             else:
                 # Generate summary for logged-in user (with all features)
-                summary_text = summarize_text(text, bullet_points=use_bullets, summary_length=summary_length)
+                with ticket:
+                    summary_text = summarize_text(
+                        text, bullet_points=use_bullets, summary_length=summary_length, stats=stats,
+                        engine=ticket.engine, user_id=request.user.id,
+                    )
                 
                 # Save summary for logged-in users
-                Summary.objects.create(
-                    user=request.user,
-                    original_text=text,
-                    summary_text=summary_text,
-                    bullet_points=use_bullets,
-                    summary_length=summary_length
-                )
+                with stage('db'):
+                    Summary.objects.create(
+                        user=request.user,
+                        original_text=text,
+                        summary_text=summary_text,
+                        bullet_points=use_bullets,
+                        summary_length=summary_length,
+                        **summary_origin(stats)
+                    )
             
             if not summary_text.strip():
                 return JsonResponse({'error': 'Özetlenemedi. Lütfen farklı bir metin deneyin.'})
             
-            return JsonResponse({'summary': summary_text})
+            return JsonResponse({
+                'summary': summary_text,
+                'engine': stats.get('engine'),
+                'language': stats.get('language'),
+                'chunks': stats.get('chunks'),
+                'levels': stats.get('levels'),
+                'degraded': ticket.degraded,
+            })
             
         except Exception as e:
+            logger.exception("Summarization request failed")
+            ERRORS.inc('request')
             return JsonResponse({'error': 'Özetleme sırasında bir hata oluştu. Lütfen daha sonra tekrar deneyin.'})
+        finally:
+            ticket.release()
 
     return JsonResponse({'error': 'Geçersiz istek.'})
+
+def summarize_batch_api(request):
+    """Summarize several documents posted as JSON in one request.
+
+    The body is ``{"documents": [{"text": ..., "summary_length": ...,
+    "use_bullets": ..., "engine": ...}, ...]}``. The results come back in
+    input order; a document that could not be summarized gets an ``error``
+    instead of a ``summary``. Summaries of registered users are saved with
+    a single insert.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=405)
+
+    try:
+        documents = json.loads(request.body)['documents']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=400)
+    if not isinstance(documents, list) or not documents:
+        return JsonResponse({'error': 'Lütfen özetlenecek bir metin girin.'}, status=400)
+    max_documents = settings.SUMMARIZER_BULK_MAX_DOCUMENTS
+    if len(documents) > max_documents:
+        return JsonResponse({'error': f'Tek istekte en fazla {max_documents} metin gönderilebilir.'}, status=400)
+
+    user = request.user if request.user.is_authenticated else None
+    results = [None] * len(documents)
+    items = []
+    for i, document in enumerate(documents):
+        if not isinstance(document, dict) or not isinstance(document.get('text'), str) or not document['text'].strip():
+            results[i] = {'error': 'Lütfen özetlenecek bir metin girin.'}
+            continue
+        summary_length = document.get('summary_length', 'medium')
+        if summary_length not in ('short', 'medium', 'long'):
+            results[i] = {'error': 'Geçersiz özet uzunluğu.'}
+            continue
+        engine = document.get('engine')
+        items.append((i, {
+            'text': document['text'],
+            # Guests get medium length summaries without bullet points
+            'summary_length': summary_length if user else 'medium',
+            'bullet_points': document.get('use_bullets') is True and user is not None,
+            'engine': engine if engine in inference.EXTRACTIVE_ENGINE_NAMES else 'transformer',
+        }))
+
+    degraded = False
+    if items:
+        uses_model = any(item['engine'] == 'transformer' for _, item in items)
+        try:
+            ticket = admission.admit(
+                client_key(request), None, 'transformer' if uses_model else 'nltk',
+                cost=sum(estimate_tokens(item['text']) for _, item in items),
+            )
+        except Rejected as e:
+            return rejected_response(e, 'Çok fazla istek gönderildi. Lütfen biraz sonra tekrar deneyin.')
+        degraded = ticket.degraded
+        for _, item in items:
+            if item['engine'] == 'transformer':
+                item['engine'] = ticket.engine
+
+        if user is None:
+            # Track guest usage, once per document
+            for _ in items:
+                guest_usage.record(request.META.get('REMOTE_ADDR'))
+
+        try:
+            with ticket:
+                summaries = summarize_texts([item for _, item in items], user.id if user is not None else None)
+        except Exception:
+            logger.exception("Batch summarization request failed")
+            ERRORS.inc('request')
+            summaries = [('', None)] * len(items)
+        finally:
+            ticket.release()
+
+        rows = []
+        for (i, item), (summary, stats) in zip(items, summaries):
+            if stats is None:
+                results[i] = {'error': 'Özetleme sırasında bir hata oluştu. Lütfen daha sonra tekrar deneyin.'}
+                continue
+            if not summary.strip():
+                results[i] = {'error': 'Özetlenemedi. Lütfen farklı bir metin deneyin.'}
+                continue
+            results[i] = {
+                'summary': summary,
+                'engine': stats.get('engine'),
+                'language': stats.get('language'),
+                'chunks': stats.get('chunks'),
+                'levels': stats.get('levels'),
+                'cached': stats.get('cached', False),
+            }
+            if user is not None:
+                rows.append((i, Summary(
+                    user=user,
+                    original_text=item['text'],
+                    summary_text=summary,
+                    bullet_points=item['bullet_points'],
+                    summary_length=item['summary_length'],
+                    **summary_origin(stats)
+                )))
+        if rows:
+            with stage('db'):
+                # bulk_create skips save(), which fills the preview and
+                # compresses the text
+                for _, row in rows:
+                    row.prepare_text()
+                Summary.objects.bulk_create([row for _, row in rows])
+                if settings.SUMMARIZER_DEDUP:
+                    # bulk_create skips save(), which indexes the summary
+                    index_summaries([row for _, row in rows])
+            for i, row in rows:
+                results[i]['summary_id'] = row.id
+
+    return JsonResponse({
+        'results': [dict(result, index=i) for i, result in enumerate(results)],
+        'degraded': degraded,
+    })
+
+def submit_summary_job(request):
+    """Queue a summarization job and return its id without waiting for it."""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=405)
+
+    text = request.POST.get('text', '')
+    summary_length = request.POST.get('summary_length', 'medium')
+    use_bullets = request.POST.get('use_bullets', 'false') == 'true'
+    engine = get_engine(request)
+
+    if not text.strip():
+        return JsonResponse({'error': 'Lütfen özetlenecek bir metin girin.'}, status=400)
+
+    # Jobs run in their own bounded pool, so only the client's budget applies
+    try:
+        admission.take(client_key(request), estimate_tokens(text))
+    except RateLimited as e:
+        return rejected_response(e, 'Çok fazla istek gönderildi. Lütfen biraz sonra tekrar deneyin.')
+
+    if not request.user.is_authenticated:
+        # Track guest usage
+        guest_usage.record(request.META.get('REMOTE_ADDR'))
+        # Guests get medium length summaries without bullet points
+        job = SummaryJob.objects.create(text=text, summary_length='medium', bullet_points=False, engine=engine)
+    else:
+        job = SummaryJob.objects.create(
+            user=request.user,
+            text=text,
+            summary_length=summary_length,
+            bullet_points=use_bullets,
+            engine=engine,
+        )
+    enqueue_job(job)
+
+    return JsonResponse({
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': reverse('summary_job_status', args=[job.id]),
+    }, status=202)
+
+def submit_upload_job(request):
+    """Queue a summarization job for an uploaded file and return its id.
+
+    The file is copied to SUMMARIZER_UPLOAD_DIR for the job to read; its
+    status reports the percent of the file read so far.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Geçersiz istek.'}, status=405)
+
+    # Refuse an oversized body before it is read
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if content_length > settings.SUMMARIZER_UPLOAD_MAX_BYTES + UPLOAD_FORM_BYTES:
+        return JsonResponse({'error': 'Dosya çok büyük.'}, status=413)
+
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': 'Lütfen özetlenecek bir dosya seçin.'}, status=400)
+    try:
+        check_upload(upload)
+    except UploadError:
+        if upload.size > settings.SUMMARIZER_UPLOAD_MAX_BYTES:
+            return JsonResponse({'error': 'Dosya çok büyük.'}, status=413)
+        return JsonResponse({'error': 'Desteklenmeyen dosya türü.'}, status=400)
+    summary_length = request.POST.get('summary_length', 'medium')
+    use_bullets = request.POST.get('use_bullets', 'false') == 'true'
+    engine = get_engine(request)
+
+    # Jobs run in their own bounded pool, so only the client's budget applies
+    try:
+        key = client_key(request)
+        admission.take(key, admission.file_cost(key, upload.size))
+    except RateLimited as e:
+        return rejected_response(e, 'Çok fazla istek gönderildi. Lütfen biraz sonra tekrar deneyin.')
+
+    fields = {'source_file': spool_upload(upload), 'source_name': upload.name[-255:]}
+    if not request.user.is_authenticated:
+        guest_usage.record(request.META.get('REMOTE_ADDR'))
+        job = SummaryJob.objects.create(summary_length='medium', bullet_points=False, engine=engine, **fields)
+    else:
+        job = SummaryJob.objects.create(
+            user=request.user,
+            summary_length=summary_length,
+            bullet_points=use_bullets,
+            engine=engine,
+            **fields,
+        )
+    enqueue_job(job)
+
+    return JsonResponse({
+        'job_id': str(job.id),
+        'status': job.status,
+        'progress': job.progress,
+        'status_url': reverse('summary_job_status', args=[job.id]),
+    }, status=202)
+
+def summary_job_status(request, job_id):
+    """Return the status of a summarization job and its summary once done."""
+    try:
+        job = SummaryJob.objects.defer('text').get(id=job_id)
+    except SummaryJob.DoesNotExist:
+        return JsonResponse({'error': 'İş bulunamadı.'}, status=404)
+
+    # Jobs of registered users are only visible to their owner
+    if job.user_id is not None and job.user_id != request.user.id:
+        return JsonResponse({'error': 'İş bulunamadı.'}, status=404)
+
+    data = {'job_id': str(job.id), 'status': job.status, 'progress': job.progress}
+    if job.status == SummaryJob.STATUS_DONE:
+        data['summary'] = job.result
+        data['summary_id'] = job.summary_id
+        data['truncated'] = job.truncated
+    elif job.status == SummaryJob.STATUS_FAILED:
+        data['error'] = 'Özetleme sırasında bir hata oluştu. Lütfen daha sonra tekrar deneyin.'
+    return JsonResponse(data)
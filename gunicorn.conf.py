@@ -0,0 +1,32 @@
+# Gunicorn configuration, see the Procfile.
+import os
+
+threads = 4
+
+# Load the app, and with it the model, once in the master and fork the
+# workers from it so they share the weights copy-on-write.
+preload_app = os.environ.get('SUMMARIZER_SHARE_MODEL', 'False') == 'True'
+
+
+def when_ready(server):
+    if preload_app:
+        from core.inference import share_model_before_fork
+        share_model_before_fork()
+
+
+def post_worker_init(worker):
+    # Torch thread pools are not fork-safe, so they are sized in the worker.
+    # Then, with SUMMARIZER_PRELOAD or a model shared from the master, load
+    # (unless shared) and warm up the model in the background; requests that
+    # arrive before it is ready use NLTK.
+    from django.conf import settings
+    from core.inference import configure_torch_threads, preload_model
+    configure_torch_threads()
+    if preload_app or settings.SUMMARIZER_PRELOAD:
+        preload_model()
+
+
+def worker_exit(server, worker):
+    # Write the guest usage still buffered in this worker
+    from core.usage import guest_usage
+    guest_usage.flush()
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 import dj_database_url # type: ignore
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ServerTimingMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -144,6 +146,203 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Summarizer
+SUMMARIZER_MODEL_NAME = os.environ.get('SUMMARIZER_MODEL_NAME', 'facebook/mbart-large-50-many-to-many-mmt')
+
+# The language of every text is detected (core.language) and picks its
+# route: the model, the mBART-50 source language code and the NLTK stop word
+# and sentence tokenizer languages. Languages without a route use
+# SUMMARIZER_MODEL_NAME without a source language. Models other than
+# SUMMARIZER_MODEL_NAME are loaded on first use; the least recently used
+# ones are unloaded to keep them within SUMMARIZER_MODEL_MEMORY_MB.
+SUMMARIZER_DETECT_LANGUAGE = os.environ.get('SUMMARIZER_DETECT_LANGUAGE', 'True') == 'True'
+SUMMARIZER_LANGUAGES = {
+    'en': {
+        'model': os.environ.get('SUMMARIZER_MODEL_NAME_EN', SUMMARIZER_MODEL_NAME),
+        'src_lang': 'en_XX',
+        'stop_words': 'english',
+        'sentence_tokenizer': 'english',
+    },
+    'tr': {
+        'model': os.environ.get('SUMMARIZER_MODEL_NAME_TR', SUMMARIZER_MODEL_NAME),
+        'src_lang': 'tr_TR',
+        'stop_words': 'turkish',
+        'sentence_tokenizer': 'turkish',
+    },
+}
+SUMMARIZER_MODEL_MEMORY_MB = int(os.environ.get('SUMMARIZER_MODEL_MEMORY_MB', '4096'))
+
+# Inference precision: 'fp32', 'bf16' (CPUs with native bfloat16 support,
+# fp32 otherwise) or 'int8' (dynamic quantization of the linear layers).
+# Compare them with `python manage.py compare_precision`.
+SUMMARIZER_PRECISION = os.environ.get('SUMMARIZER_PRECISION', 'fp32')
+
+# Long documents are split on sentence boundaries into chunks of at most
+# SUMMARIZER_CHUNK_TOKENS model tokens, summarized as a batch and then reduced
+# again until a single chunk is left (at most SUMMARIZER_MAX_LEVELS passes).
+SUMMARIZER_CHUNK_TOKENS = int(os.environ.get('SUMMARIZER_CHUNK_TOKENS', '900'))
+SUMMARIZER_MAX_LEVELS = int(os.environ.get('SUMMARIZER_MAX_LEVELS', '3'))
+
+# Incremental mode, off by default: chunk boundaries follow the content (a
+# chunk may end after a sentence whose hash is divisible by
+# SUMMARIZER_CHUNK_BOUNDARY_SENTENCES) and the partial summary of every
+# chunk is stored as a ChunkSummary, so summarizing an edited document again
+# only generates the chunks that changed. The smaller chunks make the first
+# summary of a long document slower, so it pays off only where documents are
+# summarized again after edits. `python manage.py prune_chunk_summaries`
+# deletes the ones older than SUMMARIZER_CHUNK_SUMMARY_DAYS; run it
+# periodically when incremental mode is on.
+SUMMARIZER_INCREMENTAL = os.environ.get('SUMMARIZER_INCREMENTAL', 'False') == 'True'
+SUMMARIZER_CHUNK_BOUNDARY_SENTENCES = int(os.environ.get('SUMMARIZER_CHUNK_BOUNDARY_SENTENCES', '8'))
+SUMMARIZER_CHUNK_SUMMARY_DAYS = int(os.environ.get('SUMMARIZER_CHUNK_SUMMARY_DAYS', '30'))
+
+# Near-duplicate lookup: before the model is called, stored summaries of
+# texts whose estimated Jaccard similarity (MinHash over 5-word shingles)
+# reaches SUMMARIZER_DEDUP_THRESHOLD are reused. Index the summaries saved
+# before it was turned on with `python manage.py index_summaries`.
+SUMMARIZER_DEDUP = os.environ.get('SUMMARIZER_DEDUP', 'True') == 'True'
+SUMMARIZER_DEDUP_THRESHOLD = float(os.environ.get('SUMMARIZER_DEDUP_THRESHOLD', '0.85'))
+
+# Seconds to wait for the next token of a streamed summary before giving up
+SUMMARIZER_STREAM_TIMEOUT = int(os.environ.get('SUMMARIZER_STREAM_TIMEOUT', '60'))
+
+# Load and warm up the model when the app starts instead of on the first
+# request. A failed load is not retried for SUMMARIZER_RETRY_BACKOFF seconds,
+# doubling after every further failure up to SUMMARIZER_RETRY_BACKOFF_MAX.
+SUMMARIZER_PRELOAD = os.environ.get('SUMMARIZER_PRELOAD', 'False') == 'True'
+SUMMARIZER_RETRY_BACKOFF = int(os.environ.get('SUMMARIZER_RETRY_BACKOFF', '30'))
+SUMMARIZER_RETRY_BACKOFF_MAX = int(os.environ.get('SUMMARIZER_RETRY_BACKOFF_MAX', '900'))
+
+# With SUMMARIZER_SHARE_MODEL gunicorn loads the app and the model once in the
+# master process and forks the workers from it, so they share the weights.
+# Each worker then uses SUMMARIZER_TORCH_THREADS intra-op threads (0 leaves
+# torch's default of one per core).
+SUMMARIZER_SHARE_MODEL = os.environ.get('SUMMARIZER_SHARE_MODEL', 'False') == 'True'
+SUMMARIZER_TORCH_THREADS = int(os.environ.get('SUMMARIZER_TORCH_THREADS', '0'))
+
+# Concurrent summarization jobs in a worker are queued and run as padded
+# batches of up to SUMMARIZER_BATCH_SIZE texts. A partial batch is flushed
+# after SUMMARIZER_BATCH_WAIT_MS; submissions beyond SUMMARIZER_QUEUE_SIZE
+# are rejected and fall back to the NLTK summarizer, like a text whose summary
+# takes longer than SUMMARIZER_BATCH_TIMEOUT seconds.
+SUMMARIZER_BATCHING = os.environ.get('SUMMARIZER_BATCHING', 'True') == 'True'
+SUMMARIZER_BATCH_SIZE = int(os.environ.get('SUMMARIZER_BATCH_SIZE', '8'))
+SUMMARIZER_BATCH_WAIT_MS = int(os.environ.get('SUMMARIZER_BATCH_WAIT_MS', '20'))
+SUMMARIZER_QUEUE_SIZE = int(os.environ.get('SUMMARIZER_QUEUE_SIZE', '64'))
+SUMMARIZER_BATCH_TIMEOUT = float(os.environ.get('SUMMARIZER_BATCH_TIMEOUT', '300'))
+
+# /api/summarize/batch/ takes up to SUMMARIZER_BULK_MAX_DOCUMENTS documents
+# per request and runs them through the model in batches of
+# SUMMARIZER_BATCH_SIZE
+SUMMARIZER_BULK_MAX_DOCUMENTS = int(os.environ.get('SUMMARIZER_BULK_MAX_DOCUMENTS', '64'))
+
+# Summarization jobs submitted to /api/jobs/ run in a pool of
+# SUMMARY_JOB_WORKERS threads in the web process ('thread'), or are left
+# for `python manage.py run_summary_jobs` to pick up ('command'). A job
+# still running SUMMARY_JOB_TIMEOUT seconds after it was claimed is taken to
+# belong to a worker that died and is claimed again. With the thread backend
+# the jobs of a web worker that died are run once another job finishes in
+# some worker, so they wait for the next submitted job.
+SUMMARY_JOB_BACKEND = os.environ.get('SUMMARY_JOB_BACKEND', 'thread')
+SUMMARY_JOB_WORKERS = int(os.environ.get('SUMMARY_JOB_WORKERS', '2'))
+SUMMARY_JOB_TIMEOUT = int(os.environ.get('SUMMARY_JOB_TIMEOUT', '1800'))
+
+# Files (.txt, .md, .html, and .pdf with the pypdf package) uploaded to
+# /api/summarize/upload/ of up to SUMMARIZER_UPLOAD_MAX_BYTES are kept in
+# SUMMARIZER_UPLOAD_DIR until their job has read them, which must be shared
+# with `run_summary_jobs` under the 'command' backend. Only the first
+# SUMMARIZER_UPLOAD_MAX_CHARS characters of their text are summarized.
+SUMMARIZER_UPLOAD_MAX_BYTES = int(os.environ.get('SUMMARIZER_UPLOAD_MAX_BYTES', str(20 * 2 ** 20)))
+SUMMARIZER_UPLOAD_MAX_CHARS = int(os.environ.get('SUMMARIZER_UPLOAD_MAX_CHARS', '2000000'))
+SUMMARIZER_UPLOAD_DIR = os.environ.get(
+    'SUMMARIZER_UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'summaralze-uploads'),
+)
+
+# Generated summaries are cached by a hash of the normalized text and the
+# summary options, in a per-process LRU of SUMMARY_CACHE_SIZE entries that
+# expire after SUMMARY_CACHE_TTL seconds. Set SUMMARY_CACHE_ALIAS to one of
+# CACHES to share summaries between workers.
+SUMMARY_CACHE_SIZE = int(os.environ.get('SUMMARY_CACHE_SIZE', '1024'))
+SUMMARY_CACHE_TTL = int(os.environ.get('SUMMARY_CACHE_TTL', '86400'))
+SUMMARY_CACHE_ALIAS = os.environ.get('SUMMARY_CACHE_ALIAS') or None
+SUMMARY_CACHE_LOCK_TIMEOUT = int(os.environ.get('SUMMARY_CACHE_LOCK_TIMEOUT', '120'))
+
+# Term weighting of the extractive (NLTK) summarizer: 'frequency' ranks
+# sentences by the document frequency of their words, 'tfidf' additionally
+# discounts words that occur in many sentences.
+EXTRACTIVE_WEIGHTING = os.environ.get('EXTRACTIVE_WEIGHTING', 'frequency')
+
+# The TextRank engine links sentences whose cosine similarity is at least
+# TEXTRANK_THRESHOLD, ignoring terms found in more than TEXTRANK_MAX_POSTINGS
+# sentences, and stops iterating once sentence scores change by less than
+# TEXTRANK_TOLERANCE (L1 norm) between iterations.
+TEXTRANK_THRESHOLD = float(os.environ.get('TEXTRANK_THRESHOLD', '0.1'))
+TEXTRANK_MAX_POSTINGS = int(os.environ.get('TEXTRANK_MAX_POSTINGS', '200'))
+TEXTRANK_TOLERANCE = float(os.environ.get('TEXTRANK_TOLERANCE', '1e-6'))
+
+# Admission control for the model. Each guest IP may submit up to
+# RATE_LIMIT_GUEST_TOKENS (users RATE_LIMIT_USER_TOKENS) estimated input
+# tokens per RATE_LIMIT_WINDOW seconds, refilled continuously. A worker runs
+# at most SUMMARIZER_MAX_CONCURRENCY generations at once; a request waits up
+# to SUMMARIZER_ADMISSION_WAIT_MS for a free slot and is then answered with
+# the extractive engine (SUMMARIZER_DEGRADE) or rejected with 429. A guest
+# IP is also limited to RATE_LIMIT_GUEST_REQUESTS model requests per
+# GUEST_USAGE_WINDOW, counted in memory by each worker (0 turns it off).
+RATE_LIMIT_GUEST_TOKENS = int(os.environ.get('RATE_LIMIT_GUEST_TOKENS', '2000'))
+RATE_LIMIT_USER_TOKENS = int(os.environ.get('RATE_LIMIT_USER_TOKENS', '8000'))
+RATE_LIMIT_WINDOW = int(os.environ.get('RATE_LIMIT_WINDOW', '60'))
+RATE_LIMIT_GUEST_REQUESTS = int(os.environ.get('RATE_LIMIT_GUEST_REQUESTS', '200'))
+SUMMARIZER_MAX_CONCURRENCY = int(os.environ.get('SUMMARIZER_MAX_CONCURRENCY', '4'))
+SUMMARIZER_ADMISSION_WAIT_MS = int(os.environ.get('SUMMARIZER_ADMISSION_WAIT_MS', '100'))
+SUMMARIZER_DEGRADE = os.environ.get('SUMMARIZER_DEGRADE', 'True') == 'True'
+
+# Original texts of at least SUMMARIZER_COMPRESS_MIN_CHARS characters are
+# stored compressed ('zlib', or 'zstd' with the zstandard package) in a
+# table shared by identical texts, leaving the summary rows small.
+# `python manage.py compress_texts` compresses the rows saved while it was
+# off and deletes the texts no summary uses any more.
+SUMMARIZER_COMPRESS_TEXT = os.environ.get('SUMMARIZER_COMPRESS_TEXT', 'True') == 'True'
+SUMMARIZER_COMPRESS_MIN_CHARS = int(os.environ.get('SUMMARIZER_COMPRESS_MIN_CHARS', '1024'))
+SUMMARIZER_TEXT_CODEC = os.environ.get('SUMMARIZER_TEXT_CODEC', 'zlib')
+
+# Summaries shown per page of the history, and per infinite scroll request
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '20'))
+
+# Guest requests are buffered in memory and written to GuestUsage in one
+# batch once GUEST_USAGE_BUFFER_SIZE of them are waiting, at least every
+# GUEST_USAGE_FLUSH_SECONDS and when the worker exits. Each worker also
+# counts requests per IP over a sliding GUEST_USAGE_WINDOW (seconds), which
+# RATE_LIMIT_GUEST_REQUESTS reads.
+GUEST_USAGE_BUFFER_SIZE = int(os.environ.get('GUEST_USAGE_BUFFER_SIZE', '100'))
+GUEST_USAGE_FLUSH_SECONDS = float(os.environ.get('GUEST_USAGE_FLUSH_SECONDS', '5'))
+GUEST_USAGE_WINDOW = int(os.environ.get('GUEST_USAGE_WINDOW', '3600'))
+
+# `python manage.py compact_guest_usage` rolls GuestUsage rows older than
+# GUEST_USAGE_RETENTION_DAYS up into per-IP daily counts and deletes them
+GUEST_USAGE_RETENTION_DAYS = int(os.environ.get('GUEST_USAGE_RETENTION_DAYS', '30'))
+
+# Per-stage timers, counters and histograms of the summarize path, served
+# in the Prometheus text format at /metrics/ and per request in the
+# Server-Timing header. /metrics/ needs "Authorization: Bearer <METRICS_TOKEN>"
+# when a token is set, and a staff login otherwise.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Errors on the summarize path are logged with their traceback
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 